@@ -0,0 +1,474 @@
+"""
+Offline bulk import for backfilling invoice archives.
+
+Runs the worker pipeline (MIME detection -> text extraction -> LLM ->
+validation) over a local directory, .zip or .tar(.gz) archive without
+touching Google Drive or the job queue. Text extraction runs in a process
+pool (one process per core by default) and LLM calls run concurrently in a
+thread pool. Configuration (LLM providers, callback secret) is read from
+the same .env as the worker.
+
+Each stage's output is checkpointed by file content hash (next to the
+output file by default), so re-running an interrupted import only redoes
+the remaining work.
+
+Usage:
+    python -m app.bulk_import ./archive.zip --output results.jsonl
+    python -m app.bulk_import ./invoices --output results.parquet --workers 8 --llm-concurrency 16
+    python -m app.bulk_import ./invoices --output results.jsonl --post-callbacks --job-map jobs.json
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.config import Config, load_config
+from app.extractors.llm_extractor import LLMExtractor
+from app.models.invoice import InvoiceData
+from app.pipeline import extract_document_text, InvalidDocumentError
+from app.services.callback_service import CallbackService
+from app.utils.checkpoint import (
+    CheckpointJournal,
+    get_process_journal,
+    STAGE_CALLBACK,
+    STAGE_TEXT,
+    STAGE_LLM,
+    STAGE_VALIDATION
+)
+from app.utils.consistency import score_invoice_consistency
+from app.utils.validator import validate_invoice_data
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg"}
+
+# Columns written to Parquet; nested values are stored as JSON strings
+RECORD_FIELDS = [
+    "file", "sha256", "sizeBytes", "mimeType", "status", "reason",
+    "result", "extraction", "confidence", "processedAt"
+]
+
+# FAILED is usually transient, so only these outcomes are checkpointed as final
+FINAL_STATUSES = ("COMPLETED", "INVALID")
+
+
+# ─── Source discovery ──────────────────────────────────────────────
+
+def _unpack_archive(source: str, workdir: str) -> str:
+    """Extract a .zip or .tar(.gz) archive into workdir and return the root."""
+    target = os.path.join(workdir, "archive")
+    os.makedirs(target, exist_ok=True)
+
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            archive.extractall(target)
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            archive.extractall(target, filter="data")
+    else:
+        raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+    return target
+
+
+def iter_source_files(source: str, workdir: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (relative name, absolute path) for every supported file in the source.
+    Archives are unpacked into workdir first.
+    """
+    root = source if os.path.isdir(source) else _unpack_archive(source, workdir)
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            path = os.path.join(dirpath, filename)
+            yield os.path.relpath(path, root), path
+
+
+# ─── Pipeline stages ───────────────────────────────────────────────
+
+def extract_stage(name: str, path: str, checkpoint_path: Optional[str] = None,
+                  table_format: Optional[str] = None) -> dict:
+    """
+    Read a file and extract its text. Runs in a worker process.
+    Stages already recorded in the checkpoint journal are reused instead of recomputed.
+    Never raises: failures are returned as INVALID/FAILED records.
+    """
+    record = {"file": name, "status": "EXTRACTED"}
+
+    try:
+        with open(path, "rb") as f:
+            file_data = f.read()
+
+        record["sha256"] = hashlib.sha256(file_data).hexdigest()
+        record["sizeBytes"] = len(file_data)
+
+        if checkpoint_path:
+            stages = get_process_journal(checkpoint_path).get_stages(record["sha256"])
+
+            if STAGE_VALIDATION in stages:
+                record.update(stages[STAGE_VALIDATION], resumed=True)
+                if STAGE_CALLBACK in stages:
+                    record["postedJobId"] = stages[STAGE_CALLBACK]["jobId"]
+                return record
+
+            if STAGE_TEXT in stages:
+                record.update(stages[STAGE_TEXT], textResumed=True)
+                if STAGE_LLM in stages:
+                    record["cachedLlm"] = stages[STAGE_LLM]
+                return record
+
+        # The extension plays the role of the Drive MIME type in the worker
+        expected_mime, _ = mimetypes.guess_type(name)
+        detected_mime, pipeline, raw_text = extract_document_text(file_data, expected_mime, table_format)
+
+        record["mimeType"] = detected_mime
+        record["text"] = raw_text
+
+    except InvalidDocumentError as e:
+        record.update(status="INVALID", reason=str(e))
+    except Exception as e:
+        record.update(status="FAILED", reason=str(e))
+
+    return record
+
+
+def llm_stage(llm_extractor: LLMExtractor, record: dict, journal: Optional[CheckpointJournal] = None) -> dict:
+    """Run LLM extraction and validation on an extracted record. Runs in a thread."""
+    raw_text = record.pop("text")
+    cached = record.pop("cachedLlm", None)
+
+    try:
+        if cached:
+            invoice_data = InvoiceData(**cached["invoice"])
+            record["extraction"] = cached["extraction"]
+        else:
+            extraction = llm_extractor.extract_invoice_with_metadata(raw_text)
+            invoice_data = extraction.invoice
+            record["extraction"] = extraction.metadata()
+            if journal:
+                journal.put(record["sha256"], STAGE_LLM, {
+                    "invoice": invoice_data.model_dump(),
+                    "extraction": record["extraction"]
+                })
+
+        is_valid, error_msg = validate_invoice_data(invoice_data)
+        if not is_valid:
+            record.update(status="FAILED", reason=f"Validation failed: {error_msg}")
+            return record
+
+        record.update(
+            status="COMPLETED",
+            result=invoice_data.model_dump(),
+            confidence=score_invoice_consistency(invoice_data).to_dict()
+        )
+
+    except Exception as e:
+        record.update(status="FAILED", reason=str(e))
+
+    return record
+
+
+def post_callback(callback_service: CallbackService, callback_data: dict) -> bool:
+    """Send one callback from a thread; returns False instead of raising."""
+    try:
+        return asyncio.run(callback_service.send_callback(callback_data))
+    except Exception as e:
+        logger.error(f"Callback for job {callback_data['jobId']} failed: {e}")
+        return False
+
+
+def to_callback(record: dict, job_id: str, worker_id: str) -> dict:
+    """Build the same callback payload the worker would send for this record."""
+    callback = {
+        "jobId": job_id,
+        "status": record["status"],
+        "workerId": worker_id,
+        "processedAt": record["processedAt"]
+    }
+    if record["status"] == "COMPLETED":
+        callback["result"] = record["result"]
+        callback["extraction"] = record["extraction"]
+        callback["confidence"] = record["confidence"]
+    else:
+        callback["reason"] = record.get("reason")
+    return callback
+
+
+# ─── Output ────────────────────────────────────────────────────────
+
+class ResultWriter:
+    """Streams result records to JSONL or Parquet."""
+
+    def __init__(self, path: str, output_format: str, batch_size: int = 1000):
+        self.path = path
+        self.output_format = output_format
+        self.batch_size = batch_size
+        self._batch: List[dict] = []
+        self._file = None
+        self._parquet_writer = None
+
+        if output_format == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+            self._pa = pa
+            self._schema = pa.schema(
+                [(name, pa.int64() if name == "sizeBytes" else pa.string()) for name in RECORD_FIELDS]
+            )
+            self._parquet_writer = pq.ParquetWriter(path, self._schema)
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, record: dict):
+        if self._file:
+            self._file.write(json.dumps(record) + "\n")
+            return
+
+        self._batch.append({
+            name: json.dumps(record[name]) if isinstance(record.get(name), dict) else record.get(name)
+            for name in RECORD_FIELDS
+        })
+        if len(self._batch) >= self.batch_size:
+            self._flush_parquet()
+
+    def _flush_parquet(self):
+        if self._batch:
+            table = self._pa.Table.from_pylist(self._batch, schema=self._schema)
+            self._parquet_writer.write_table(table)
+            self._batch = []
+
+    def close(self):
+        if self._file:
+            self._file.close()
+        if self._parquet_writer:
+            self._flush_parquet()
+            self._parquet_writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ─── Runner ────────────────────────────────────────────────────────
+
+def run_bulk_import(
+    config: Config,
+    source: str,
+    output: str,
+    output_format: str = "jsonl",
+    workers: Optional[int] = None,
+    llm_concurrency: int = 8,
+    job_map: Optional[Dict[str, str]] = None,
+    post_callbacks: bool = False,
+    checkpoint_path: Optional[str] = None
+) -> Counter:
+    """
+    Process every invoice in source and write one record per file to output.
+    Args:
+        config: Worker configuration (LLM providers, callback settings)
+        source: Directory, .zip or .tar(.gz) archive
+        output: Output file path
+        output_format: "jsonl" or "parquet"
+        workers: Text extraction processes (defaults to CPU count)
+        llm_concurrency: Concurrent LLM requests
+        job_map: Relative file name -> existing job id, used for callbacks
+        post_callbacks: Send results to the backend for files in job_map
+        checkpoint_path: SQLite checkpoint journal; None disables resuming
+    Returns:
+        Counter of record statuses, resumed ones included (plus posted,
+        post_failed and already_posted when posting)
+    """
+    workers = workers or os.cpu_count() or 1
+    job_map = job_map or {}
+    worker_id = f"{config.worker_id}-bulk"
+    table_format = config.pdf_table_format or None
+    llm_extractor = LLMExtractor.from_config(config, max_jobs=llm_concurrency)
+    callback_service = CallbackService(config.backend_url, config.callback_secret) if post_callbacks else None
+
+    journal = CheckpointJournal(checkpoint_path) if checkpoint_path else None
+    if journal:
+        logger.info(
+            f"Checkpoint journal {checkpoint_path}: "
+            f"{journal.count(STAGE_VALIDATION)} files already finished"
+        )
+
+    counts = Counter()
+    resumed = 0
+    started = time.monotonic()
+
+    # Backpressure: keep enough work queued to saturate each pool, but no more
+    max_extracting = workers * 4
+    max_llm_backlog = llm_concurrency * 4
+
+    with tempfile.TemporaryDirectory() as workdir, \
+            ResultWriter(output, output_format) as writer, \
+            ProcessPoolExecutor(max_workers=workers) as cpu_pool, \
+            ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="bulk-llm") as llm_pool, \
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="bulk-callback") as callback_pool:
+
+        files = iter_source_files(source, workdir)
+        pending = {}
+        # Callback future -> (sha256, job id) to checkpoint once it is delivered
+        posting = {}
+        stage_counts = Counter()
+        exhausted = False
+
+        def submit_more():
+            nonlocal exhausted
+            while not exhausted and stage_counts["extract"] < max_extracting \
+                    and stage_counts["llm"] < max_llm_backlog:
+                item = next(files, None)
+                if item is None:
+                    exhausted = True
+                    return
+                pending[cpu_pool.submit(extract_stage, *item, checkpoint_path, table_format)] = "extract"
+                stage_counts["extract"] += 1
+
+        submit_more()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                stage = pending.pop(future)
+                stage_counts[stage] -= 1
+
+                if stage == "callback":
+                    posted = future.result()
+                    counts["posted" if posted else "post_failed"] += 1
+                    target = posting.pop(future, None)
+                    if posted and target:
+                        sha256, job_id = target
+                        journal.put(sha256, STAGE_CALLBACK, {
+                            "jobId": job_id,
+                            "postedAt": datetime.now(timezone.utc).isoformat()
+                        })
+                    continue
+
+                record = future.result()
+
+                if stage == "extract" and record["status"] == "EXTRACTED":
+                    if journal and not record.pop("textResumed", False):
+                        journal.put(record["sha256"], STAGE_TEXT, {
+                            "mimeType": record["mimeType"],
+                            "text": record["text"]
+                        })
+                    pending[llm_pool.submit(llm_stage, llm_extractor, record, journal)] = "llm"
+                    stage_counts["llm"] += 1
+                    continue
+
+                record.pop("text", None)
+                posted_job_id = record.pop("postedJobId", None)
+                if record.pop("resumed", False):
+                    resumed += 1
+                else:
+                    record["processedAt"] = datetime.now(timezone.utc).isoformat()
+                    if journal and "sha256" in record and record["status"] in FINAL_STATUSES:
+                        journal.put(record["sha256"], STAGE_VALIDATION, {
+                            name: record[name]
+                            for name in ("status", "reason", "mimeType", "result", "extraction",
+                                         "confidence", "processedAt")
+                            if name in record
+                        })
+
+                writer.write(record)
+                counts[record["status"]] += 1
+
+                job_id = job_map.get(record["file"])
+                if callback_service and job_id:
+                    if job_id == posted_job_id:
+                        # Delivered by an earlier run
+                        counts["already_posted"] += 1
+                    else:
+                        callback = to_callback(record, job_id, worker_id)
+                        future = callback_pool.submit(post_callback, callback_service, callback)
+                        pending[future] = "callback"
+                        stage_counts["callback"] += 1
+                        if journal and "sha256" in record and record["status"] in FINAL_STATUSES:
+                            posting[future] = (record["sha256"], job_id)
+
+                processed = sum(counts[s] for s in ("COMPLETED", "INVALID", "FAILED"))
+                if processed % 100 == 0:
+                    rate = processed / max(time.monotonic() - started, 1e-9)
+                    logger.info(f"Processed {processed} files ({rate:.1f} files/s)")
+
+            submit_more()
+
+    if journal:
+        journal.close()
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Bulk import finished in {elapsed:.1f}s: {dict(counts)} ({resumed} reused from the checkpoint)")
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.bulk_import",
+        description="Extract invoices from a local directory or archive without Google Drive."
+    )
+    parser.add_argument("source", help="Directory, .zip or .tar(.gz) archive of invoices")
+    parser.add_argument("--output", "-o", required=True, help="Output file (.jsonl or .parquet)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="Output format (default: from extension)")
+    parser.add_argument("--workers", type=int, help="Text extraction processes (default: CPU count)")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Concurrent LLM requests (default: 8)")
+    parser.add_argument("--post-callbacks", action="store_true", help="Post results to the backend callback API")
+    parser.add_argument("--job-map", help="JSON file mapping relative file names to existing job ids")
+    parser.add_argument("--checkpoint", help="Checkpoint journal path (default: <output>.checkpoint.sqlite)")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Do not resume from or write a checkpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    output_format = args.format or ("parquet" if args.output.endswith(".parquet") else "jsonl")
+
+    job_map = None
+    if args.job_map:
+        with open(args.job_map, encoding="utf-8") as f:
+            job_map = json.load(f)
+    elif args.post_callbacks:
+        parser.error("--post-callbacks requires --job-map (the backend only accepts callbacks for known jobs)")
+
+    checkpoint_path = None
+    if not args.no_checkpoint:
+        checkpoint_path = args.checkpoint or f"{args.output}.checkpoint.sqlite"
+
+    counts = run_bulk_import(
+        load_config(),
+        args.source,
+        args.output,
+        output_format=output_format,
+        workers=args.workers,
+        llm_concurrency=args.llm_concurrency,
+        job_map=job_map,
+        post_callbacks=args.post_callbacks,
+        checkpoint_path=checkpoint_path
+    )
+
+    return 0 if counts["FAILED"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
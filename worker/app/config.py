@@ -1,5 +1,50 @@
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+
+class LLMProviderSettings(BaseModel):
+    """A single chat-completions backend the LLM router can send requests to."""
+
+    name: str = Field(..., description="Unique provider name used in logs and metrics")
+    kind: str = Field(default="openai", description="'groq' (Groq SDK) or 'openai' (any OpenAI-compatible endpoint)")
+    tier: str = Field(default="large", description="Cascade tier: 'small' (tried first) or 'large'")
+    model: str = Field(..., description="Model identifier sent with each request")
+    base_url: Optional[str] = Field(default=None, description="API base URL, e.g. http://localhost:8080/v1")
+    api_key: Optional[str] = Field(default=None, description="API key (falls back to GROQ_API_KEY for groq providers)")
+    min_input_chars: int = Field(default=0, description="Smallest input text this provider should receive")
+    max_input_chars: Optional[int] = Field(default=None, description="Largest input text this provider should receive")
+    expected_latency: float = Field(default=5.0, description="Latency estimate in seconds used before any samples exist")
+    timeout: float = Field(default=120.0, description="Per-request timeout in seconds")
+    max_retries: int = Field(default=1, description="Client-level retries before failing over")
+
+
+class LaneSettings(BaseModel):
+    """A scheduling lane: the jobs it takes and how many may run at once."""
+
+    name: str = Field(..., description="Lane name used in logs and metrics")
+    mime_types: List[str] = Field(
+        default_factory=list,
+        description="Payload mimeType patterns ('*' wildcard, e.g. image/*); empty takes any type"
+    )
+    min_file_size: int = Field(default=0, description="Smallest payload fileSize in bytes")
+    max_file_size: Optional[int] = Field(default=None, description="Largest payload fileSize in bytes")
+    slots: int = Field(default=1, description="Jobs from this lane allowed in flight at once")
+    shortest_first: bool = Field(default=False, description="Claim the smallest (aged) file first instead of the oldest")
+    deadline_seconds: Optional[float] = Field(default=None, description="Overall job deadline (default: job_deadline_seconds)")
+    stage_budgets: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Per-stage budgets in seconds overriding stage_budgets, e.g. {\"extract\": 30}"
+    )
+
+
+def default_lanes() -> List[LaneSettings]:
+    """Small text PDFs, images, then everything else (large or scanned documents)."""
+    return [
+        LaneSettings(name="small", mime_types=["application/pdf"], max_file_size=2 * 1024 * 1024, slots=4),
+        LaneSettings(name="image", mime_types=["image/*"], slots=2),
+        LaneSettings(name="large", slots=1)
+    ]
 
 
 class Config(BaseSettings):
@@ -21,6 +66,42 @@ class Config(BaseSettings):
     drive_download_timeout: int = Field(default=300, description="Download timeout in seconds")
     drive_chunk_size: int = Field(default=1048576, description="Download chunk size (1MB)")
     drive_max_retries: int = Field(default=3, description="Max download retry attempts")
+    drive_sniff_bytes: int = Field(
+        default=65536,
+        description="Bytes fetched first for MIME and header checks before the full download (0 disables)"
+    )
+    max_image_pixels: int = Field(default=100_000_000, description="Reject images with more pixels than this")
+    pdf_table_format: str = Field(
+        default="tsv",
+        description="Ruled PDF tables sent to the LLM as 'tsv' or 'markdown' rows; empty for plain page text"
+    )
+
+    # Result Index Configuration (reuse results for unchanged file content)
+    result_index_enabled: bool = Field(
+        default=True,
+        description="Look up Drive md5Checksum before downloading and reuse the prior result"
+    )
+    result_index_path: str = Field(default="data/result_index.sqlite", description="SQLite file of prior results")
+
+    # Near-Duplicate Configuration (re-scans and re-photos of the same invoice)
+    near_duplicate_enabled: bool = Field(default=True, description="Check extracted text against earlier invoices")
+    near_duplicate_action: str = Field(
+        default="flag",
+        description=(
+            "On a match: only 'flag' the callback, or 'reuse' the earlier extraction (no LLM call) "
+            "when its invoice number and date appear in the new text"
+        )
+    )
+    near_duplicate_path: str = Field(
+        default="data/near_duplicates.sqlite",
+        description="SQLite file of MinHash signatures"
+    )
+    near_duplicate_threshold: float = Field(default=0.85, description="Minimum estimated Jaccard similarity of text")
+    near_duplicate_number_threshold: float = Field(
+        default=0.8,
+        description="Minimum Jaccard similarity of numeric tokens (invoice number, dates, amounts)"
+    )
+    near_duplicate_max_entries: int = Field(default=100_000, description="Signatures kept, oldest evicted first")
 
     # Groq LLM Configuration
     groq_api_key: str = Field(..., description="Groq API key")
@@ -29,10 +110,132 @@ class Config(BaseSettings):
         description="Groq model identifier"
     )
 
+    # LLM Routing Configuration
+    llm_providers: List[LLMProviderSettings] = Field(
+        default_factory=list,
+        description="JSON list of LLM providers; defaults to a single Groq provider using groq_model"
+    )
+    llm_hedge_enabled: bool = Field(default=False, description="Fire a second provider when the first exceeds its p95 latency")
+    llm_hedge_min_delay: float = Field(default=2.0, description="Minimum seconds to wait before sending a hedged request")
+    llm_ewma_alpha: float = Field(default=0.2, description="Smoothing factor for provider latency/error EWMAs")
+    llm_error_penalty: float = Field(default=4.0, description="Latency multiplier applied per unit of EWMA error rate")
+
+    # LLM Cascade Configuration
+    llm_cascade_enabled: bool = Field(default=True, description="Try the small model tier before the large one")
+    llm_small_model: str = Field(default="llama-3.1-8b-instant", description="Groq model for the small tier")
+    llm_cascade_threshold: float = Field(default=0.8, description="Minimum small-tier score to skip the large tier")
+
+    # Long Document Configuration
+    llm_chunk_chars: int = Field(
+        default=24000,
+        description="Extract texts longer than this (about six dense pages) in page/row-aligned chunks, "
+                    "concurrently (0 disables)"
+    )
+    llm_chunk_concurrency: int = Field(default=4, description="Concurrent chunk requests per worker")
+
+    # Failure Handling Configuration
+    circuit_failure_threshold: int = Field(
+        default=5,
+        description="Consecutive upstream failures (Drive or LLM) that open its circuit and pause claiming"
+    )
+    circuit_open_seconds: float = Field(default=30.0, description="Pause before a probe job is let through")
+    circuit_max_open_seconds: float = Field(default=300.0, description="Upper bound for the pause after failed probes")
+
+    # Deadline Configuration (bounded worst-case job time)
+    job_deadline_seconds: float = Field(
+        default=360.0,
+        description="Overall time a job may take from claim to result, callback excluded (0 disables)"
+    )
+    stage_budgets: Dict[str, float] = Field(
+        default_factory=lambda: {"download": 90.0, "extract": 120.0, "llm": 180.0, "callback": 30.0},
+        description="Seconds each stage (download, extract, llm, callback) may use; lanes can override them"
+    )
+    extraction_processes: Optional[int] = Field(
+        default=None,
+        description=(
+            "Worker processes for page counting and text extraction, killed on timeout "
+            "(default: one per lane slot, up to concurrency_max; 0 uses threads)"
+        )
+    )
+
     # Worker Configuration
     worker_id: str = Field(default="worker-1", description="Unique worker identifier")
     poll_interval: int = Field(default=5, description="Job polling interval in seconds")
     max_retries: int = Field(default=3, description="Maximum retry attempts")
+    startup_budget_seconds: float = Field(default=15.0, description="Warn when process start to ready exceeds this")
+
+    # Concurrency Configuration (AIMD controller over in-flight jobs)
+    concurrency_adaptive: bool = Field(default=True, description="Adjust in-flight jobs from observed load signals")
+    concurrency_min: int = Field(default=1, description="Fewest jobs kept in flight")
+    concurrency_max: int = Field(default=8, description="Most jobs kept in flight")
+    concurrency_initial: int = Field(default=1, description="Starting limit (fixed limit when not adaptive)")
+    concurrency_adjust_interval: float = Field(default=10.0, description="Seconds between limit adjustments")
+    concurrency_decrease_factor: float = Field(default=0.7, description="Multiplier applied to the limit on overload")
+    concurrency_latency_tolerance: float = Field(
+        default=2.0,
+        description="Overload when median LLM latency exceeds the baseline by this factor"
+    )
+    concurrency_max_rate_limited: float = Field(default=0.05, description="Overload above this share of HTTP 429s")
+    concurrency_cpu_target: float = Field(default=0.9, description="Overload above this process CPU utilisation (0-1)")
+    concurrency_max_loop_lag: float = Field(default=0.5, description="Overload above this event-loop lag in seconds")
+
+    # Memory Admission Configuration
+    memory_budget_mb: Optional[int] = Field(
+        default=None,
+        description="RSS budget for admitting jobs (default: memory_budget_fraction of the container limit)"
+    )
+    memory_budget_fraction: float = Field(default=0.8, description="Share of the memory limit used as the budget")
+    memory_job_overhead_mb: int = Field(default=50, description="Fixed peak memory estimate per job")
+    memory_pdf_factor: float = Field(default=6.0, description="Peak memory per byte of PDF file")
+    memory_image_factor: float = Field(default=12.0, description="Peak memory per byte of image file (decoded + OCR)")
+    memory_per_page_mb: int = Field(default=4, description="Extra peak memory per PDF page once the count is known")
+    memory_oversize_mb: int = Field(default=512, description="Jobs estimated above this run in the oversize lane")
+    memory_oversize_concurrency: int = Field(default=1, description="Oversize jobs allowed in flight at once")
+
+    # Scheduling Lane Configuration
+    lanes: List[LaneSettings] = Field(
+        default_factory=default_lanes,
+        description="JSON list of scheduling lanes, tried in order; a job runs in the first lane that claims it"
+    )
+    lane_sjf_bytes_per_second: float = Field(
+        default=100_000.0,
+        description="Shortest-first aging: file bytes offset by each second a job has waited"
+    )
+
+    # Job Claiming Configuration
+    claim_fair_share: bool = Field(default=True, description="Claim by priority and weighted fair share across uploaders")
+    claim_uploader_weights: Dict[str, float] = Field(
+        default_factory=dict,
+        description='Fair-share weight per uploader id, JSON e.g. {"vendor-a": 0.25} (default 1.0)'
+    )
+    claim_max_uploaders: int = Field(default=256, description="Most distinct uploaders considered per claim")
+    claim_create_uploader_index: bool = Field(
+        default=False,
+        description="Build ix_job_queues_pending_uploader (CONCURRENTLY) on connect, if the backend has not"
+    )
+
+    # Backlog Configuration (autoscaling signal)
+    backlog_cache_ttl_seconds: float = Field(default=5.0, description="How long a backlog query result is reused")
+    backlog_throughput_window_seconds: float = Field(default=300.0, description="Window for this worker's recent throughput")
+    backlog_drain_target_seconds: float = Field(default=600.0, description="Drain time used to compute desired_workers")
+
+    # Tracing Configuration (OpenTelemetry, optional)
+    otel_enabled: bool = Field(default=False, description="Emit OpenTelemetry spans for each job")
+    otel_exporter: str = Field(default="otlp", description="Span exporter: otlp, console or file")
+    otel_endpoint: str = Field(default="http://localhost:4318/v1/traces", description="OTLP/HTTP traces endpoint")
+    otel_file_path: str = Field(default="otel_spans.jsonl", description="Output file for the file exporter")
+    otel_service_name: str = Field(default="invoice-worker", description="service.name resource attribute")
+
+    # Profiler Configuration (admin endpoints, off in production unless needed)
+    profiler_enabled: bool = Field(default=False, description="Expose /admin/profile endpoints")
+    profiler_max_seconds: float = Field(default=60.0, description="Longest profile a request may ask for")
+
+    @property
+    def extraction_pool_size(self) -> int:
+        """Extraction processes: as configured, or one for every job that can be in flight."""
+        if self.extraction_processes is not None:
+            return self.extraction_processes
+        return min(sum(lane.slots for lane in self.lanes), self.concurrency_max)
 
     @property
     def db_connection_string(self) -> str:
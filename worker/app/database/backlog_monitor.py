@@ -0,0 +1,159 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+
+class ThroughputTracker:
+    """Jobs finished by this worker over a sliding time window."""
+
+    def __init__(self, window_seconds: float = 300.0):
+        self.window_seconds = window_seconds
+        self._finished = deque()
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, count: int = 1):
+        now = time.monotonic()
+        with self._lock:
+            self._finished.extend([now] * count)
+            self._trim(now)
+
+    def _trim(self, now: float):
+        while self._finished and now - self._finished[0] > self.window_seconds:
+            self._finished.popleft()
+
+    def rate(self) -> float:
+        """
+        Jobs per second over the window, or since start if younger than the
+        window (at least a minute, so the first job does not read as a burst).
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            span = max(min(self.window_seconds, now - self._started), min(60.0, self.window_seconds))
+            return len(self._finished) / span
+
+
+@dataclass
+class BacklogSnapshot:
+    """Queue backlog as seen at `measured_at` (epoch seconds)."""
+    pending: int
+    ready: int
+    processing: int
+    oldest_pending_age_seconds: float
+    oldest_ready_age_seconds: float
+    worker_throughput_per_second: float
+    estimated_drain_seconds: Optional[float]
+    desired_workers: Optional[int]
+    measured_at: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class BacklogMonitor:
+    """
+    Reads job_queues backlog figures on its own read-only connection
+    (the claimer's connection is owned by the polling loop) and caches
+    them for a short TTL, so frequent polling by autoscalers and many
+    replicas costs at most one query per TTL per worker.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        throughput: ThroughputTracker,
+        ttl_seconds: float = 5.0,
+        drain_target_seconds: float = 600.0
+    ):
+        self.connection_string = connection_string
+        self.throughput = throughput
+        self.ttl_seconds = ttl_seconds
+        self.drain_target_seconds = drain_target_seconds
+        self.connection = None
+        self._cached: Optional[BacklogSnapshot] = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self.connection = psycopg2.connect(self.connection_string)
+        self.connection.set_session(readonly=True, autocommit=True)
+
+    def _query(self) -> dict:
+        """One pass over the PENDING/PROCESSING rows via the Status indexes."""
+        if self.connection is None or self.connection.closed:
+            self._connect()
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT
+                    count(*) FILTER (WHERE "Status" = 'PENDING'),
+                    count(*) FILTER (
+                        WHERE "Status" = 'PENDING'
+                          AND ("NextRetryAt" IS NULL OR "NextRetryAt" <= NOW() AT TIME ZONE 'UTC')
+                    ),
+                    count(*) FILTER (WHERE "Status" = 'PROCESSING'),
+                    EXTRACT(EPOCH FROM (
+                        NOW() AT TIME ZONE 'UTC' - min("CreatedAt") FILTER (WHERE "Status" = 'PENDING')
+                    )),
+                    EXTRACT(EPOCH FROM (
+                        NOW() AT TIME ZONE 'UTC' - min(COALESCE("NextRetryAt", "CreatedAt")) FILTER (
+                            WHERE "Status" = 'PENDING'
+                              AND ("NextRetryAt" IS NULL OR "NextRetryAt" <= NOW() AT TIME ZONE 'UTC')
+                        )
+                    ))
+                FROM "job_queues"
+                WHERE "Status" IN ('PENDING', 'PROCESSING')
+            """)
+            pending, ready, processing, oldest_pending, oldest_ready = cursor.fetchone()
+        except Exception:
+            # Reconnect on the next refresh
+            self.connection.close()
+            raise
+        finally:
+            cursor.close()
+
+        return {
+            "pending": pending,
+            "ready": ready,
+            "processing": processing,
+            "oldest_pending_age_seconds": round(max(0.0, float(oldest_pending or 0)), 1),
+            "oldest_ready_age_seconds": round(max(0.0, float(oldest_ready or 0)), 1)
+        }
+
+    def get(self) -> BacklogSnapshot:
+        """Cached backlog snapshot, refreshed at most once per TTL (single flight)."""
+        with self._lock:
+            if self._cached and time.time() - self._cached.measured_at < self.ttl_seconds:
+                return self._cached
+
+            counts = self._query()
+            rate = self.throughput.rate()
+
+            drain = None
+            desired = None
+            if rate > 0:
+                drain = counts["pending"] / rate
+                # Workers like this one needed to clear the backlog within the target
+                desired = max(1, math.ceil(counts["pending"] / (rate * self.drain_target_seconds)))
+
+            self._cached = BacklogSnapshot(
+                **counts,
+                worker_throughput_per_second=round(rate, 4),
+                estimated_drain_seconds=round(drain, 1) if drain is not None else None,
+                desired_workers=desired,
+                measured_at=time.time()
+            )
+            return self._cached
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
@@ -2,17 +2,188 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 import json
 import logging
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, List, Optional
 from app.models.job import Job, JobPayload
 
 logger = logging.getLogger(__name__)
 
+MAX_FILE_SIZE = 2 ** 62
+
+JOB_COLUMNS = """
+    j."Id"::text AS "Id",
+    j."JobType",
+    j."Status",
+    j."PayloadJson"::text AS "PayloadJson",
+    j."RetryCount",
+    j."NextRetryAt",
+    j."CreatedAt",
+    j."UpdatedAt"
+"""
+
+UPLOADER_EXPR = """COALESCE({t}"PayloadJson"->>'uploader', '')"""
+PRIORITY_EXPR = """(CASE WHEN jsonb_typeof({t}"PayloadJson"->'priority') = 'number'
+                   THEN ({t}"PayloadJson"->>'priority')::numeric ELSE 0 END)"""
+FILE_SIZE_EXPR = """(CASE WHEN jsonb_typeof({t}"PayloadJson"->'fileSize') = 'number'
+                    THEN ({t}"PayloadJson"->>'fileSize')::numeric ELSE 0 END)"""
+
+# Not waiting out a retry backoff
+READY_FILTER = """({t}"NextRetryAt" IS NULL OR {t}"NextRetryAt" <= NOW() AT TIME ZONE 'UTC')"""
+
+# Restricts a claim to one scheduling lane: the fileSize range admission
+# control allows and the lane's MIME patterns (NULL matches any type)
+LANE_FILTER = """{size} BETWEEN %(min_file_size)s AND %(max_file_size)s
+              AND (%(mime_patterns)s::text[] IS NULL
+                   OR {t}"PayloadJson"->>'mimeType' LIKE ANY(%(mime_patterns)s::text[]))"""
+
+# Shortest expected job first, aged: every second waited offsets
+# sjf_bytes_per_second bytes of file size, so large files still get their turn
+SJF_ORDER = """{size} / %(sjf_bytes_per_second)s
+                - EXTRACT(EPOCH FROM (NOW() AT TIME ZONE 'UTC' - {t}"CreatedAt")) ASC, {t}"CreatedAt" ASC"""
+FIFO_ORDER = """{t}"CreatedAt" ASC"""
+
+
+def _lane_filter(t: str) -> str:
+    return LANE_FILTER.format(size=FILE_SIZE_EXPR.format(t=t), t=t)
+
+
+def _job_order(t: str, shortest_first: bool) -> str:
+    if shortest_first:
+        return SJF_ORDER.format(size=FILE_SIZE_EXPR.format(t=t), t=t)
+    return FIFO_ORDER.format(t=t)
+
+# Pending jobs by uploader in claim order, so the fair-share claim can
+# skip-scan the distinct uploaders and read each one's next job without
+# touching the rest of its backlog. The table belongs to the backend, which
+# should create this index in a migration; the worker only builds it when
+# CLAIM_CREATE_UPLOADER_INDEX is set, and CONCURRENTLY so writes go on.
+UPLOADER_INDEX_SQL = f"""
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_job_queues_pending_uploader
+    ON "job_queues" (({UPLOADER_EXPR.format(t="")}), {PRIORITY_EXPR.format(t="")} DESC, "CreatedAt")
+    WHERE "Status" = 'PENDING'
+"""
+
+FIFO_CLAIM_SQL = f"""
+    SELECT {JOB_COLUMNS}
+    FROM "job_queues" j
+    WHERE j."Status" = 'PENDING'
+      AND {READY_FILTER.format(t="j.")}
+      AND {_lane_filter("j.")}
+    ORDER BY {PRIORITY_EXPR.format(t="j.")} DESC, {{job_order}}
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+"""
+
+# 1. uploaders: loose index scan over ix_job_queues_pending_uploader, one
+#    probe per distinct uploader with a ready job in the lane (capped at
+#    max_uploaders, so uploaders with nothing claimable do not use it up).
+# 2. heads: each uploader's next ready job in the lane, highest priority
+#    then oldest (or shortest expected, which reads the uploader's pending
+#    rows in the lane instead of just the first index entry).
+# 3. Pick by priority, then the uploader's virtual pass (stride scheduling:
+#    a pass advances by 1/weight per claim, idle uploaders start at the
+#    current virtual time), then age. A head another worker is claiming is
+#    skipped, so concurrent claims spread across uploaders.
+FAIR_CLAIM_SQL = f"""
+    WITH RECURSIVE uploaders(uploader, depth) AS (
+        (
+            SELECT {UPLOADER_EXPR.format(t="q.")}, 1
+            FROM "job_queues" q
+            WHERE q."Status" = 'PENDING'
+              AND {READY_FILTER.format(t="q.")}
+              AND {_lane_filter("q.")}
+            ORDER BY 1
+            LIMIT 1
+        )
+        UNION ALL
+        SELECT (
+            SELECT {UPLOADER_EXPR.format(t="q.")}
+            FROM "job_queues" q
+            WHERE q."Status" = 'PENDING'
+              AND {UPLOADER_EXPR.format(t="q.")} > u.uploader
+              AND {READY_FILTER.format(t="q.")}
+              AND {_lane_filter("q.")}
+            ORDER BY 1
+            LIMIT 1
+        ), u.depth + 1
+        FROM uploaders u
+        WHERE u.uploader IS NOT NULL AND u.depth < %(max_uploaders)s
+    ),
+    heads AS (
+        SELECT u.uploader, h."Id", h.priority, h."CreatedAt"
+        FROM uploaders u
+        CROSS JOIN LATERAL (
+            SELECT q."Id", q."CreatedAt", {PRIORITY_EXPR.format(t="q.")} AS priority
+            FROM "job_queues" q
+            WHERE q."Status" = 'PENDING'
+              AND {UPLOADER_EXPR.format(t="q.")} = u.uploader
+              AND {READY_FILTER.format(t="q.")}
+              AND {_lane_filter("q.")}
+            ORDER BY {PRIORITY_EXPR.format(t="q.")} DESC, {{job_order}}
+            LIMIT 1
+        ) h
+        WHERE u.uploader IS NOT NULL
+    ),
+    passes AS (
+        SELECT key AS uploader, value::float8 AS pass
+        FROM jsonb_each_text(%(passes)s::jsonb)
+    )
+    SELECT {JOB_COLUMNS}
+    FROM heads
+    JOIN "job_queues" j ON j."Id" = heads."Id"
+    LEFT JOIN passes ON passes.uploader = heads.uploader
+    WHERE j."Status" = 'PENDING'
+    ORDER BY
+        heads.priority DESC,
+        GREATEST(COALESCE(passes.pass, %(virtual_time)s), %(virtual_time)s) ASC,
+        heads."CreatedAt" ASC
+    LIMIT 1
+    FOR UPDATE OF j SKIP LOCKED
+"""
+
+
+@lru_cache(maxsize=None)
+def claim_sql(fair_share: bool, shortest_first: bool) -> str:
+    """Claim query for the given scheduling options."""
+    if fair_share:
+        return FAIR_CLAIM_SQL.format(job_order=_job_order("q.", shortest_first))
+    return FIFO_CLAIM_SQL.format(job_order=_job_order("j.", shortest_first))
+
+
 class JobClaimer:
     """Handles atomic job claiming from PostgreSQL."""
 
-    def __init__(self, connection_string: str):
+    def __init__(
+        self,
+        connection_string: str,
+        fair_share: bool = False,
+        uploader_weights: Optional[Dict[str, float]] = None,
+        max_uploaders: int = 256,
+        sjf_bytes_per_second: float = 100_000.0,
+        create_uploader_index: bool = False
+    ):
+        """
+        Args:
+            connection_string: libpq connection string
+            fair_share: Claim by priority and weighted fair share across
+                JobPayload.uploader instead of strictly by CreatedAt
+            uploader_weights: Share weight per uploader id (default 1.0)
+            max_uploaders: Most distinct uploaders considered per claim
+            sjf_bytes_per_second: Aging rate for shortest-expected-job-first
+                claims (file bytes offset by each second waited)
+            create_uploader_index: Build ix_job_queues_pending_uploader on
+                connect, for deployments without the backend migration
+        """
         self.connection_string = connection_string
         self.connection = None
+        self.fair_share = fair_share
+        self.uploader_weights = uploader_weights or {}
+        self.max_uploaders = max_uploaders
+        self.sjf_bytes_per_second = sjf_bytes_per_second
+        self.create_uploader_index = create_uploader_index
+        # Stride-scheduling state, local to this worker
+        self.virtual_time = 0.0
+        self.passes: Dict[str, float] = {}
 
     def connect(self):
         """Establish database connection."""
@@ -23,36 +194,81 @@ class JobClaimer:
             logger.error(f"Failed to connect to database: {e}")
             raise
 
+        if self.fair_share and self.create_uploader_index:
+            self.ensure_uploader_index()
+
+    def ensure_uploader_index(self) -> bool:
+        """
+        Create the partial index the fair-share claim relies on, if missing.
+        Built CONCURRENTLY, which cannot run inside a transaction.
+        """
+        self.connection.autocommit = True
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(UPLOADER_INDEX_SQL)
+            return True
+        except Exception as e:
+            # Claims still work without it, just with a scan of the pending rows
+            logger.warning(f"Could not create ix_job_queues_pending_uploader: {e}")
+            return False
+        finally:
+            cursor.close()
+            self.connection.autocommit = False
+
+    def charge(self, uploader: Optional[str]):
+        """Advance an uploader's pass after one of its jobs was claimed."""
+        uploader = uploader or ""
+        start = max(self.passes.get(uploader, self.virtual_time), self.virtual_time)
+        self.virtual_time = start
+        self.passes[uploader] = start + 1.0 / self.uploader_weights.get(uploader, 1.0)
+        # Uploaders at or behind virtual time are indistinguishable from new ones
+        self.passes = {u: p for u, p in self.passes.items() if p > self.virtual_time}
+
     def disconnect(self):
         """Close database connection."""
         if self.connection:
             self.connection.close()
             logger.info("Database connection closed")
 
-    def claim_job(self, worker_id: str) -> Optional[Job]:
-        """Atomically claim a pending job using PostgreSQL row locks."""
+    def claim_job(
+        self,
+        worker_id: str,
+        min_file_size: int = 0,
+        max_file_size: Optional[int] = None,
+        mime_patterns: Optional[List[str]] = None,
+        shortest_first: bool = False
+    ) -> Optional[Job]:
+        """
+        Atomically claim a pending job using PostgreSQL row locks.
+        Args:
+            worker_id: Recorded in LockedBy
+            min_file_size, max_file_size: Payload fileSize range to consider
+                (admission control; no upper bound when max_file_size is None)
+            mime_patterns: SQL LIKE patterns for the payload mimeType (None: any)
+            shortest_first: Prefer small files (aged) over strict age order
+        """
         if not self.connection:
             raise RuntimeError("Database not connected")
 
         cursor = self.connection.cursor(cursor_factory=RealDictCursor)
+        lane = {
+            "min_file_size": min_file_size,
+            "max_file_size": max_file_size if max_file_size is not None else MAX_FILE_SIZE,
+            "mime_patterns": mime_patterns,
+            "sjf_bytes_per_second": self.sjf_bytes_per_second
+        }
+        sql = claim_sql(self.fair_share, shortest_first)
 
         try:
-            cursor.execute("""
-                SELECT
-                    "Id"::text,
-                    "JobType",
-                    "Status",
-                    "PayloadJson"::text,
-                    "RetryCount",
-                    "CreatedAt",
-                    "UpdatedAt"
-                FROM "job_queues"
-                WHERE "Status" = 'PENDING'
-                  AND ("NextRetryAt" IS NULL OR "NextRetryAt" <= NOW() AT TIME ZONE 'UTC')
-                ORDER BY "CreatedAt" ASC
-                LIMIT 1
-                FOR UPDATE SKIP LOCKED
-            """)
+            if self.fair_share:
+                cursor.execute(sql, {
+                    "max_uploaders": self.max_uploaders,
+                    "passes": json.dumps(self.passes),
+                    "virtual_time": self.virtual_time,
+                    **lane
+                })
+            else:
+                cursor.execute(sql, lane)
 
             row = cursor.fetchone()
             if not row:
@@ -74,6 +290,8 @@ class JobClaimer:
 
             payload_dict = json.loads(row['PayloadJson'])
             payload = JobPayload(**payload_dict)
+            if self.fair_share:
+                self.charge(payload.uploader)
 
             return Job(
                 id=job_id,
@@ -81,6 +299,7 @@ class JobClaimer:
                 status=row['Status'],
                 payload=payload,
                 retryCount=row['RetryCount'],
+                nextRetryAt=row['NextRetryAt'],
                 createdAt=row['CreatedAt'],
                 updatedAt=row['UpdatedAt']
             )
@@ -113,6 +332,33 @@ class JobClaimer:
         finally:
             cursor.close()
 
+    def requeue_job(self, job_id: str) -> bool:
+        """
+        Return a job to PENDING as it was claimed (same RetryCount, no new
+        NextRetryAt), so it keeps its place in the queue.
+        """
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                UPDATE "job_queues"
+                SET "Status" = 'PENDING',
+                    "LockedBy" = NULL,
+                    "LockedAt" = NULL,
+                    "UpdatedAt" = NOW() AT TIME ZONE 'UTC'
+                WHERE "Id" = %s::uuid AND "Status" = 'PROCESSING'
+            """, (job_id,))
+            self.connection.commit()
+            return cursor.rowcount > 0
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to requeue job: {e}")
+            return False
+        finally:
+            cursor.close()
+
     def release_all_locks(self, worker_id: str) -> int:
         """Release all locks held by worker."""
         if not self.connection:
@@ -2,6 +2,7 @@ import pytesseract
 from PIL import Image
 import io
 import logging
+from app.utils.metrics import OCR_CHARACTERS
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,7 @@ def extract_text_from_image(image_data: bytes) -> str:
         text = pytesseract.image_to_string(image, lang='eng')
 
         logger.debug(f"OCR extracted {len(text)} characters")
+        OCR_CHARACTERS.inc(len(text))
 
         return text.strip()
 
@@ -1,17 +1,161 @@
 import json
 import logging
-from groq import Groq
-from app.models.invoice import InvoiceData
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.config import Config, LLMProviderSettings
+from app.models.invoice import InvoiceData, LineItem
+from app.services.llm_router import LLMRouter, GroqProvider, RoutedCompletion, build_llm_router
+from app.utils.validator import score_invoice_extraction
+from app.utils.metrics import LLM_TIER
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class ExtractionResult:
+    """Extracted invoice plus which model tier produced it."""
+    invoice: InvoiceData
+    tier: str
+    provider: str
+    model: str
+    score: float
+    escalated: bool = False
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    chunks: int = 1
+
+    def metadata(self) -> dict:
+        """Compact description for callbacks and logs."""
+        metadata = {
+            "tier": self.tier,
+            "provider": self.provider,
+            "model": self.model,
+            "score": round(self.score, 4),
+            "escalated": self.escalated
+        }
+        if self.chunks > 1:
+            metadata["chunks"] = self.chunks
+        return metadata
+
+
+def _is_table_row(line: str) -> bool:
+    return "\t" in line or line.startswith("|")
+
+
+def _split_lines(block: str, max_chars: int) -> List[str]:
+    """
+    Split one oversized page between lines. A part that starts inside a
+    [Table] repeats the table's header row so its columns stay labelled.
+    """
+    parts, current, size = [], [], 0
+    table_header = None
+    previous = None
+    for line in block.split("\n"):
+        if size + len(line) + 1 > max_chars and current:
+            parts.append("\n".join(current))
+            current, size = [], 0
+            if table_header is not None and _is_table_row(line):
+                current = ["[Table]", table_header]
+                size = len(table_header) + 8
+
+        if previous == "[Table]":
+            table_header = line
+        elif not _is_table_row(line):
+            table_header = None
+        previous = line
+
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        parts.append("\n".join(current))
+    return parts
+
+
+def split_text(raw_text: str, max_chars: int) -> List[str]:
+    """
+    Split document text into chunks of about max_chars, at page boundaries
+    (blank lines) where possible and otherwise between lines, so a line
+    item row is never cut in half.
+    """
+    blocks = []
+    for block in raw_text.split("\n\n"):
+        blocks.extend(_split_lines(block, max_chars) if len(block) > max_chars else [block])
+
+    chunks, current = [], ""
+    for block in blocks:
+        if current and len(current) + len(block) + 2 > max_chars:
+            chunks.append(current)
+            current = block
+        else:
+            current = f"{current}\n\n{block}" if current else block
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def merge_line_items(parts: List[List[LineItem]]) -> List[LineItem]:
+    """
+    Concatenate per-chunk line items in document order. Only a chunk's first
+    row that repeats the previous chunk's last row verbatim (a table row
+    carried over a page break) is dropped; any other repeated row is a real
+    line on the invoice and is kept.
+    """
+    merged, last_key = [], None
+    for items in parts:
+        if not items:
+            continue
+        if json.dumps(items[0].model_dump(), sort_keys=True) == last_key:
+            items = items[1:]
+        merged.extend(items)
+        if merged:
+            last_key = json.dumps(merged[-1].model_dump(), sort_keys=True)
+    return merged
+
+
 class LLMExtractor:
-    """Groq Llama-3 based invoice data extractor."""
+    """
+    Llama based invoice data extractor, routed across one or more LLM providers.
+
+    With a small-tier router configured, extraction runs as a cascade: the small
+    model answers first and the large model is only called when the small
+    model's result scores below the confidence threshold.
+    """
 
-    def __init__(self, api_key: str, model: str = "llama-3.3-70b-versatile"):
-        self.client = Groq(api_key=api_key)
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "llama-3.3-70b-versatile",
+        router: Optional[LLMRouter] = None,
+        small_router: Optional[LLMRouter] = None,
+        cascade_threshold: float = 0.8,
+        chunk_chars: int = 0,
+        chunk_concurrency: int = 4
+    ):
+        if router is None:
+            router = LLMRouter([
+                GroqProvider(LLMProviderSettings(name="groq", kind="groq", model=model, api_key=api_key))
+            ])
+
+        self.router = router
+        self.small_router = small_router
+        self.cascade_threshold = cascade_threshold
         self.model = model
-        logger.info(f"Initialized LLM extractor with model: {model}")
+        # Texts longer than chunk_chars are extracted in parts (0 disables)
+        self.chunk_chars = chunk_chars
+        self._chunk_pool = ThreadPoolExecutor(max_workers=max(1, chunk_concurrency), thread_name_prefix="llm-chunk")
+        self.tier_counts: Dict[str, int] = {"small": 0, "large": 0}
+        self.escalations = 0
+        logger.info(
+            "Initialized LLM extractor with providers: "
+            + ", ".join(f"{p.name}={p.model}" for p in router.providers)
+        )
+        if small_router is not None:
+            logger.info(
+                f"LLM cascade enabled (threshold {cascade_threshold}), small tier: "
+                + ", ".join(f"{p.name}={p.model}" for p in small_router.providers)
+            )
 
         self.system_prompt = """You are an expert invoice data extraction system.
 
@@ -71,11 +215,27 @@ Rules:
 7. InvoiceNumber, VendorName, and TotalAmount are REQUIRED
 8. LineItems array must have at least one item
 9. Each LineItem must have ProductName, ProductId, Quantity, UnitRate, and Amount
-10. Currency defaults to "USD" if not specified"""
+10. Currency defaults to "USD" if not specified
+11. Tables appear after a [Table] line, one row per line with tab- or |-separated cells; the first row is the header"""
+
+    @classmethod
+    def from_config(cls, config: Config, max_jobs: Optional[int] = None) -> "LLMExtractor":
+        """
+        Create an extractor with the routers and cascade described by configuration.
+        max_jobs: documents extracted at once (default: the worker's concurrency_max)
+        """
+        return cls(
+            model=config.groq_model,
+            router=build_llm_router(config, "large", max_jobs),
+            small_router=build_llm_router(config, "small", max_jobs),
+            cascade_threshold=config.llm_cascade_threshold,
+            chunk_chars=config.llm_chunk_chars,
+            chunk_concurrency=config.llm_chunk_concurrency
+        )
 
     def extract_invoice(self, raw_text: str) -> InvoiceData:
         """
-        Extract structured invoice data from raw text using Groq Llama.
+        Extract structured invoice data from raw text using the routed Llama providers.
         Args:
             raw_text: Extracted text from OCR or PDF
         Returns:
@@ -83,6 +243,177 @@ Rules:
         Raises:
             Exception: If LLM fails or returns invalid data
         """
+        return self.extract_invoice_with_metadata(raw_text).invoice
+
+    def extract_invoice_with_metadata(self, raw_text: str) -> ExtractionResult:
+        """
+        Extract invoice data, cascading from the small tier to the large tier.
+        Args:
+            raw_text: Extracted text from OCR or PDF
+        Returns:
+            ExtractionResult with the invoice and the tier that served it
+        Raises:
+            Exception: If LLM fails or returns invalid data
+        """
+        chunks = split_text(raw_text, self.chunk_chars) if 0 < self.chunk_chars < len(raw_text) else [raw_text]
+        if len(chunks) > 1:
+            logger.info(f"Splitting {len(raw_text)} characters into {len(chunks)} chunks")
+
+        small_result = None
+        small_tokens = (0, 0)
+
+        if self.small_router is not None:
+            try:
+                invoice_data, completion = self._extract(self.small_router, chunks)
+                score = score_invoice_extraction(invoice_data)
+                small_result = self._result("small", invoice_data, completion, score, chunks=len(chunks))
+                small_tokens = (completion.prompt_tokens, completion.completion_tokens)
+
+                if score >= self.cascade_threshold:
+                    self._count_tier("small")
+                    logger.info(f"Small tier accepted (score {score:.2f})")
+                    return small_result
+
+                logger.info(
+                    f"Small tier score {score:.2f} below {self.cascade_threshold}, escalating to large tier"
+                )
+            except Exception as e:
+                logger.warning(f"Small tier extraction failed, escalating to large tier: {e}")
+
+            self.escalations += 1
+
+        try:
+            invoice_data, completion = self._extract(self.router, chunks)
+        except Exception:
+            if small_result is not None and small_result.score > 0:
+                # Large tier is unavailable; a low-confidence but valid answer beats failing the job
+                logger.warning("Large tier failed, falling back to small tier result")
+                self._count_tier("small")
+                return small_result
+            raise
+
+        self._count_tier("large")
+        result = self._result(
+            "large",
+            invoice_data,
+            completion,
+            score_invoice_extraction(invoice_data),
+            escalated=self.small_router is not None,
+            chunks=len(chunks)
+        )
+        # The escalated job paid for both tiers
+        result.prompt_tokens += small_tokens[0]
+        result.completion_tokens += small_tokens[1]
+        return result
+
+    def _count_tier(self, tier: str):
+        self.tier_counts[tier] += 1
+        LLM_TIER.labels(tier).inc()
+
+    def _result(
+        self,
+        tier: str,
+        invoice_data: InvoiceData,
+        completion: RoutedCompletion,
+        score: float,
+        escalated: bool = False,
+        chunks: int = 1
+    ) -> ExtractionResult:
+        return ExtractionResult(
+            invoice=invoice_data,
+            tier=tier,
+            provider=completion.provider,
+            model=completion.model,
+            score=score,
+            escalated=escalated,
+            prompt_tokens=completion.prompt_tokens,
+            completion_tokens=completion.completion_tokens,
+            chunks=chunks
+        )
+
+    def _extract(self, router: LLMRouter, chunks: List[str]) -> Tuple[InvoiceData, RoutedCompletion]:
+        """Whole-text extraction, or map-reduce over chunks when there are several."""
+        if len(chunks) == 1:
+            return self._request_invoice(router, chunks[0])
+        return self._request_chunked(router, chunks)
+
+    def _request_chunked(self, router: LLMRouter, chunks: List[str]) -> Tuple[InvoiceData, RoutedCompletion]:
+        """
+        Header fields from the first and last chunk (vendor and customer at
+        the top, totals at the bottom), line items from every chunk, all
+        requested concurrently and merged in document order.
+        """
+        started = time.perf_counter()
+        header_text = f"{chunks[0]}\n\n[...]\n\n{chunks[-1]}"
+        header_future = self._chunk_pool.submit(
+            self._request_json, router, header_text,
+            "This is the beginning and the end of a long invoice. Fill in every field except "
+            "LineItems, which must be an empty list."
+        )
+        item_futures = [
+            self._chunk_pool.submit(
+                self._request_json, router, chunk,
+                f"This is part {index} of {len(chunks)} of a long invoice. Return only the line items in "
+                f"this part as {{\"LineItems\": [...]}}; other fields may be null."
+            )
+            for index, chunk in enumerate(chunks, 1)
+        ]
+
+        try:
+            header, header_completion = header_future.result()
+            parts, completions = [], [header_completion]
+            for future in item_futures:
+                response, completion = future.result()
+                parts.append([LineItem(**item) for item in response.get("LineItems") or []])
+                completions.append(completion)
+
+            header["LineItems"] = [item.model_dump() for item in merge_line_items(parts)]
+            invoice_data = InvoiceData(**header)
+        except Exception as e:
+            for future in [header_future, *item_futures]:
+                future.cancel()
+            logger.error(f"Chunked extraction failed: {e}")
+            raise Exception(f"LLM extraction failed: {str(e)}")
+
+        logger.info(
+            f"Extracted invoice {invoice_data.InvoiceNumber} from {len(chunks)} chunks, "
+            f"{len(invoice_data.LineItems)} line items"
+        )
+        return invoice_data, RoutedCompletion(
+            content="",
+            provider=header_completion.provider,
+            model=header_completion.model,
+            latency=time.perf_counter() - started,
+            prompt_tokens=sum(c.prompt_tokens for c in completions),
+            completion_tokens=sum(c.completion_tokens for c in completions)
+        )
+
+    def _request_json(self, router: LLMRouter, raw_text: str, instruction: str) -> Tuple[dict, RoutedCompletion]:
+        """One chunk request; returns the parsed JSON object without model validation."""
+        user_prompt = f"""Extract invoice data from this text:
+
+{raw_text}
+
+Return only valid JSON matching the required structure.
+{instruction}"""
+
+        completion = router.complete(
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            text_length=len(raw_text),
+            temperature=0.1,
+            max_tokens=4096,
+            response_format={"type": "json_object"}
+        )
+        try:
+            return json.loads(completion.content), completion
+        except json.JSONDecodeError as e:
+            raise Exception(f"LLM returned invalid JSON: {str(e)}")
+
+    def _request_invoice(self, router: LLMRouter, raw_text: str) -> Tuple[InvoiceData, RoutedCompletion]:
+        """Send one extraction request through a router and parse the response."""
         user_prompt = f"""Extract invoice data from this text:
 
 {raw_text}
@@ -91,23 +422,27 @@ Return only valid JSON matching the required structure.
 IMPORTANT: VendorName is the SELLER/COMPANY issuing the invoice (like "SuperStore", "Amazon", etc.)"""
 
         try:
-            logger.info(f"Calling Groq Llama API with {len(raw_text)} characters")
+            logger.info(f"Calling LLM router with {len(raw_text)} characters")
 
-            # Call Groq API
-            chat_completion = self.client.chat.completions.create(
+            # Route to the fastest healthy provider (with failover/hedging)
+            completion = router.complete(
                 messages=[
                     {"role": "system", "content": self.system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                model=self.model,
+                text_length=len(raw_text),
                 temperature=0.1,  # Low temperature for consistent extraction
                 max_tokens=4096,
                 response_format={"type": "json_object"}  # Force JSON response
             )
 
             # Extract response
-            response_text = chat_completion.choices[0].message.content
-            logger.debug(f"Llama response: {len(response_text)} characters")
+            response_text = completion.content
+            logger.debug(
+                f"Llama response from {completion.provider} ({completion.model}): "
+                f"{len(response_text)} characters in {completion.latency:.2f}s"
+                + (" [hedged]" if completion.hedged else "")
+            )
 
             # Parse JSON
             invoice_dict = json.loads(response_text)
@@ -117,7 +452,7 @@ IMPORTANT: VendorName is the SELLER/COMPANY issuing the invoice (like "SuperStor
 
             logger.info(f"Successfully extracted invoice {invoice_data.InvoiceNumber}")
 
-            return invoice_data
+            return invoice_data, completion
 
         except json.JSONDecodeError as e:
             logger.error(f"Llama returned invalid JSON: {e}")
@@ -125,3 +460,21 @@ IMPORTANT: VendorName is the SELLER/COMPANY issuing the invoice (like "SuperStor
         except Exception as e:
             logger.error(f"Llama extraction failed: {e}", exc_info=True)
             raise Exception(f"LLM extraction failed: {str(e)}")
+
+    def add_observer(self, observer):
+        """Receive (latency, outcome) for every provider request of both tiers."""
+        for router in (self.router, self.small_router):
+            if router is not None:
+                router.observers.append(observer)
+
+    def snapshot(self) -> dict:
+        """Tier usage and per-provider routing statistics."""
+        snapshot = {
+            "cascade_enabled": self.small_router is not None,
+            "tiers_served": dict(self.tier_counts),
+            "escalations": self.escalations,
+            "large": self.router.snapshot()
+        }
+        if self.small_router is not None:
+            snapshot["small"] = self.small_router.snapshot()
+        return snapshot
@@ -1,21 +1,33 @@
 import pdfplumber
 import io
 import logging
+from typing import List, Optional
+from pdfminer.pdfdocument import PDFPasswordIncorrect
+from app.utils.metrics import PDF_PAGES
 
 logger = logging.getLogger(__name__)
 
 
-def extract_text_from_pdf(pdf_data: bytes) -> str:
+TABLE_FORMATS = ("tsv", "markdown")
+
+
+def extract_text_from_pdf(pdf_data: bytes, table_format: Optional[str] = None) -> str:
     """
     Extract text from PDF using pdfplumber.
     Preserves layout and structure better than PyPDF2.
     Args:
         pdf_data: Raw PDF bytes
+        table_format: "tsv" or "markdown" to emit detected tables as compact
+            rows in reading order; None keeps the flattened page text
     Returns:
         Extracted text string
     Raises:
+        PDFPasswordIncorrect: If the PDF needs a user password to open
         Exception: If PDF extraction fails
     """
+    if table_format is not None and table_format not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format {table_format!r}, expected one of {TABLE_FORMATS}")
+
     try:
         logger.debug(f"Opening PDF ({len(pdf_data)} bytes)")
 
@@ -23,10 +35,14 @@ def extract_text_from_pdf(pdf_data: bytes) -> str:
 
         with pdfplumber.open(io.BytesIO(pdf_data)) as pdf:
             logger.debug(f"PDF has {len(pdf.pages)} pages")
+            PDF_PAGES.inc(len(pdf.pages))
 
             for page_num, page in enumerate(pdf.pages, 1):
-                # Extract text with layout preservation
-                page_text = page.extract_text()
+                if table_format:
+                    page_text = _extract_page_with_tables(page, table_format)
+                else:
+                    # Extract text with layout preservation
+                    page_text = page.extract_text()
 
                 if page_text:
                     text_parts.append(page_text)
@@ -39,11 +55,82 @@ def extract_text_from_pdf(pdf_data: bytes) -> str:
 
         return full_text
 
+    except PDFPasswordIncorrect:
+        # Encrypted with a user password (owner-only passwords open with "")
+        raise
     except Exception as e:
         logger.error(f"PDF extraction failed: {e}", exc_info=True)
         raise Exception(f"PDF extraction failed: {str(e)}")
 
 
+def _extract_page_with_tables(page, table_format: str) -> str:
+    """
+    Page text with each ruled table rendered as rows, in reading order.
+    Text outside the tables (header, addresses, totals) is kept line by line;
+    the characters inside a table only appear in its rows.
+    """
+    tables = [table for table in page.find_tables() if table.bbox]
+    if not tables:
+        return page.extract_text()
+
+    def outside_tables(obj) -> bool:
+        if obj.get("object_type") != "char":
+            return True
+        x = (obj["x0"] + obj["x1"]) / 2
+        y = (obj["top"] + obj["bottom"]) / 2
+        return not any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in (t.bbox for t in tables))
+
+    blocks = [(line["top"], line["text"]) for line in page.filter(outside_tables).extract_text_lines()]
+    for table in tables:
+        rendered = format_table(table.extract(), table_format)
+        if rendered:
+            blocks.append((table.bbox[1], f"[Table]\n{rendered}"))
+
+    blocks.sort(key=lambda block: block[0])
+    return "\n".join(text for _, text in blocks)
+
+
+def format_table(rows: List[List[Optional[str]]], table_format: str) -> str:
+    """
+    Render table rows as TSV or a markdown table. Cell line breaks become
+    spaces; empty rows and columns are dropped. The first row is the header.
+    """
+    cleaned = [[" ".join((cell or "").split()) for cell in row] for row in rows]
+    cleaned = [row for row in cleaned if any(row)]
+    if not cleaned:
+        return ""
+
+    width = max(len(row) for row in cleaned)
+    cleaned = [row + [""] * (width - len(row)) for row in cleaned]
+    keep = [col for col in range(width) if any(row[col] for row in cleaned)]
+    cleaned = [[row[col] for col in keep] for row in cleaned]
+
+    if table_format == "tsv":
+        return "\n".join("\t".join(row) for row in cleaned)
+
+    lines = ["| " + " | ".join(cell.replace("|", "\\|") for cell in row) + " |" for row in cleaned]
+    lines.insert(1, "|" + "---|" * len(keep))
+    return "\n".join(lines)
+
+
+def count_pdf_pages(pdf_data: bytes) -> Optional[int]:
+    """
+    Count PDF pages without extracting text (PyMuPDF only reads the page tree).
+    Args:
+        pdf_data: Raw PDF bytes
+    Returns:
+        Number of pages, or None if the PDF cannot be opened
+    """
+    import fitz  # PyMuPDF
+
+    try:
+        with fitz.open(stream=pdf_data, filetype="pdf") as doc:
+            return doc.page_count
+    except Exception as e:
+        logger.debug(f"Could not count PDF pages: {e}")
+        return None
+
+
 def extract_text_from_pdf_pymupdf(pdf_data: bytes) -> str:
     """
     Alternative: Extract text using PyMuPDF (faster for large PDFs).
@@ -59,6 +146,7 @@ def extract_text_from_pdf_pymupdf(pdf_data: bytes) -> str:
         text_parts = []
 
         logger.debug(f"PDF has {len(doc)} pages (PyMuPDF)")
+        PDF_PAGES.inc(len(doc))
 
         for page_num, page in enumerate(doc, 1):
             page_text = page.get_text()
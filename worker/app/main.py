@@ -3,13 +3,16 @@ import threading
 import logging
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response, Query
 from typing import Dict
 
 from app.config import load_config
 from app.worker import InvoiceWorker
 from app.utils.hmac import compute_hmac
 from app.utils.file_logger import setup_file_logging
+from app.utils.metrics import render_metrics, record_backlog
+from app.utils.tracing import init_tracing, shutdown_tracing
+from app.utils.profiler import profile_cpu, profile_memory, ProfilerBusyError
 
 # Configure logging
 logging.basicConfig(
@@ -34,11 +37,13 @@ async def lifespan(app: FastAPI):
     # Startup: Initialize and start worker in background thread
     try:
         config = load_config()
+        init_tracing(config)
         worker = InvoiceWorker(config)
 
         # Run worker in separate thread
         worker_thread = threading.Thread(
             target=lambda: asyncio.run(worker.start()),
+            name="invoice-worker",
             daemon=True
         )
         worker_thread.start()
@@ -51,6 +56,7 @@ async def lifespan(app: FastAPI):
         # Shutdown: Stop worker gracefully
         if worker:
             worker.is_running = False
+        shutdown_tracing()
         logger.info("FastAPI app stopped")
 
 
@@ -75,9 +81,11 @@ def root():
 
 @app.get("/health")
 def health():
-    """Health check endpoint for monitoring."""
+    """Liveness: the process is up and startup has not failed (services may still be connecting)."""
     if not worker:
         raise HTTPException(status_code=503, detail="Worker not initialized")
+    if worker.startup_error:
+        raise HTTPException(status_code=503, detail=f"Worker startup failed: {worker.startup_error}")
 
     uptime = (datetime.now(timezone.utc) - worker.stats["start_time"]).total_seconds()
 
@@ -89,9 +97,59 @@ def health():
     }
 
 
+@app.get("/ready")
+def ready():
+    """Readiness: services are connected and the polling loop is running."""
+    if not worker or not worker.ready or not worker.is_running:
+        raise HTTPException(status_code=503, detail={
+            "ready": False,
+            "startup": worker.startup if worker else {},
+            "error": worker.startup_error if worker else None
+        })
+
+    return {
+        "ready": True,
+        "worker_id": worker.config.worker_id,
+        "startup_seconds": worker.startup,
+        "startup_budget_seconds": worker.config.startup_budget_seconds
+    }
+
+
 @app.get("/metrics")
 def metrics():
-    """Worker metrics and statistics."""
+    """Prometheus metrics: per-stage latency histograms, sizes, tokens, in-flight and backlog gauges."""
+    if worker:
+        try:
+            record_backlog(worker.backlog_monitor.get())
+        except Exception as e:
+            logger.warning(f"Backlog query failed, serving previous backlog values: {e}")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/backlog")
+def backlog():
+    """
+    Queue backlog for autoscaling: pending and ready-now counts, oldest
+    pending age, and drain time / desired workers from recent throughput.
+    Cached for BACKLOG_CACHE_TTL_SECONDS.
+    """
+    if not worker:
+        raise HTTPException(status_code=503, detail="Worker not initialized")
+
+    try:
+        snapshot = worker.backlog_monitor.get()
+    except Exception as e:
+        logger.error(f"Backlog query failed: {e}")
+        raise HTTPException(status_code=503, detail="Backlog unavailable")
+
+    record_backlog(snapshot)
+    return snapshot.to_dict()
+
+
+@app.get("/stats")
+def stats():
+    """Worker statistics as JSON."""
     if not worker:
         raise HTTPException(status_code=503, detail="Worker not initialized")
 
@@ -107,17 +165,66 @@ def metrics():
         if total_jobs > 0 else 0
     )
 
+    # Controller, memory, lane and circuit state come from the worker; the
+    # summary fields below keep their established names and units
     return {
+        **worker.get_stats(),
         "jobs_completed": worker.stats["jobs_processed"],
         "jobs_failed": worker.stats["jobs_failed"],
         "jobs_invalid": worker.stats["jobs_invalid"],
         "total_jobs": total_jobs,
         "success_rate": round(success_rate, 4),
         "uptime_seconds": round(uptime, 2),
-        "worker_id": worker.config.worker_id
+        "worker_id": worker.config.worker_id,
+        "llm": worker.llm_extractor.snapshot() if worker.llm_extractor else None
     }
 
 
+def _check_profiler(seconds: float):
+    if not worker:
+        raise HTTPException(status_code=503, detail="Worker not initialized")
+    if not worker.config.profiler_enabled:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (set PROFILER_ENABLED=true)")
+    if seconds > worker.config.profiler_max_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be <= {worker.config.profiler_max_seconds}"
+        )
+
+
+@app.get("/admin/profile")
+def admin_profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(10.0, ge=1),
+    threads: str = Query(None, description="Thread name prefix, e.g. invoice-worker or llm-router")
+):
+    """
+    Sample thread stacks for a bounded time.
+    Returns collapsed stacks (flamegraph.pl / speedscope input).
+    Extraction pool processes are not sampled (see app.utils.profiler).
+    """
+    _check_profiler(seconds)
+    try:
+        collapsed = profile_cpu(seconds, interval_ms / 1000, threads)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(content=collapsed, media_type="text/plain")
+
+
+@app.get("/admin/profile/memory")
+def admin_profile_memory(
+    seconds: float = Query(10.0, gt=0),
+    top: int = Query(25, ge=1, le=500)
+):
+    """Allocation growth over a bounded window (tracemalloc snapshot diff)."""
+    _check_profiler(seconds)
+    try:
+        growth = profile_memory(seconds, top)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"seconds": seconds, "top": growth}
+
+
 @app.post("/test/callback")
 async def test_callback(payload: Dict):
     """
@@ -20,6 +20,7 @@ class JobPayload(BaseModel):
     mimeType: str = Field(..., description="Expected MIME type")
     fileSize: int = Field(..., description="File size in bytes")
     uploader: Optional[str] = Field(None, description="User who uploaded file")
+    priority: int = Field(default=0, description="Claim priority, higher first (fair-share claiming only)")
     schemaVersion: str = Field(default="1.0")
     idempotencyKey: str = Field(..., description="Unique key for deduplication")
     detectedAt: str = Field(..., description="ISO timestamp of detection")
@@ -0,0 +1,174 @@
+"""
+Document stages shared by the polling worker and the bulk importer:
+MIME detection, routing, and text extraction.
+Extractor modules (pdfplumber/PyMuPDF, Tesseract/PIL) are imported on
+first use by their pipeline, so startup does not pay for them.
+"""
+import logging
+from typing import Optional, Tuple
+
+from app.services.mime_detector import (
+    detect_mime_type,
+    validate_mime_type,
+    get_pipeline_for_mime,
+    ProcessingPipeline
+)
+from app.services.header_sniffer import image_dimensions, pdf_declared_pages
+from app.utils.text_cleaner import preprocess_ocr_text
+
+logger = logging.getLogger(__name__)
+
+# Anything shorter cannot contain the required invoice fields
+MIN_TEXT_LENGTH = 18
+
+
+class InvalidDocumentError(Exception):
+    """The file can never be processed (reported as INVALID, not retried)."""
+
+
+class DocumentParseError(Exception):
+    """
+    The extractor could not parse the file (corrupt or malformed).
+    Raised in place of the parser's own error, which does not survive the
+    trip back from an extraction process, so the failure is still known to
+    be the document's.
+    """
+
+
+def _parse_error_types(pipeline: ProcessingPipeline) -> tuple:
+    """Exceptions the pipeline's parsers raise for a malformed file."""
+    if pipeline == ProcessingPipeline.IMAGE:
+        from PIL import UnidentifiedImageError
+        return (UnidentifiedImageError,)
+    from fitz import FileDataError
+    from pdfminer.psparser import PSException
+    return (PSException, FileDataError)
+
+
+def resolve_pipeline(file_data: bytes, expected_mime: Optional[str] = None) -> Tuple[str, ProcessingPipeline]:
+    """
+    Detect the MIME type and pick the extraction pipeline.
+    Args:
+        file_data: Raw file bytes
+        expected_mime: MIME type from Drive metadata, or None to trust detection
+    Returns:
+        Tuple of (detected_mime, pipeline)
+    Raises:
+        InvalidDocumentError: On MIME mismatch or unsupported type
+    """
+    detected_mime = detect_mime_type(file_data)
+
+    if expected_mime and not validate_mime_type(detected_mime, expected_mime):
+        raise InvalidDocumentError(f"MIME type mismatch: expected {expected_mime}, got {detected_mime}")
+
+    pipeline = get_pipeline_for_mime(detected_mime)
+    if pipeline == ProcessingPipeline.UNSUPPORTED:
+        raise InvalidDocumentError(f"Unsupported MIME type: {detected_mime}")
+
+    return detected_mime, pipeline
+
+
+def sniff_document(
+    prefix: bytes,
+    expected_mime: Optional[str] = None,
+    max_image_pixels: Optional[int] = None
+) -> Tuple[str, ProcessingPipeline]:
+    """
+    MIME detection and header sanity checks on the start of a file, before
+    it is downloaded in full. Encryption is not checked here: PDFs with only
+    an owner password extract normally, and whether a user password is
+    needed only shows when the PDF is opened (see extract_text).
+    Returns:
+        Tuple of (detected_mime, pipeline)
+    Raises:
+        InvalidDocumentError: On MIME mismatch, unsupported type, empty PDF,
+            or image dimensions that are zero or too large
+    """
+    detected_mime, pipeline = resolve_pipeline(prefix, expected_mime)
+
+    if pipeline == ProcessingPipeline.PDF:
+        if pdf_declared_pages(prefix) == 0:
+            raise InvalidDocumentError("PDF has no pages")
+
+    elif pipeline == ProcessingPipeline.IMAGE:
+        dimensions = image_dimensions(prefix)
+        if dimensions is not None:
+            width, height = dimensions
+            if width == 0 or height == 0:
+                raise InvalidDocumentError(f"Image has no pixels ({width}x{height})")
+            if max_image_pixels and width * height > max_image_pixels:
+                raise InvalidDocumentError(
+                    f"Image too large ({width}x{height}, limit {max_image_pixels} pixels)"
+                )
+
+    return detected_mime, pipeline
+
+
+def extract_text(file_data: bytes, pipeline: ProcessingPipeline, table_format: Optional[str] = None) -> str:
+    """
+    Run the text extractor for a pipeline.
+    PDF tables are emitted as "tsv" or "markdown" rows when table_format is set.
+    Raises:
+        InvalidDocumentError: If too little text was extracted, or the PDF
+            needs a password to open
+        DocumentParseError: If the parser rejected the file as malformed
+    """
+    try:
+        if pipeline == ProcessingPipeline.IMAGE:
+            from app.extractors.image_extractor import extract_text_from_image
+            raw_text = extract_text_from_image(file_data)
+            raw_text = preprocess_ocr_text(raw_text)
+        elif pipeline == ProcessingPipeline.PDF:
+            from app.extractors.pdf_extractor import extract_text_from_pdf
+            from pdfminer.pdfdocument import PDFPasswordIncorrect
+            try:
+                raw_text = extract_text_from_pdf(file_data, table_format)
+            except PDFPasswordIncorrect:
+                raise InvalidDocumentError("PDF is encrypted with a user password")
+        else:
+            raise InvalidDocumentError(f"No extractor for pipeline {pipeline.value}")
+    except InvalidDocumentError:
+        raise
+    except Exception as e:
+        # The extractors wrap the parser's error; look through the wrapping
+        parse_errors = _parse_error_types(pipeline)
+        cause = e
+        while cause is not None and not isinstance(cause, parse_errors):
+            cause = cause.__cause__ or cause.__context__
+        if cause is not None:
+            raise DocumentParseError(str(e)) from e
+        raise
+
+    if not raw_text or len(raw_text) < MIN_TEXT_LENGTH:
+        raise InvalidDocumentError(
+            f"Insufficient text extracted ({len(raw_text) if raw_text else 0} chars, "
+            f"minimum {MIN_TEXT_LENGTH} required)"
+        )
+
+    return raw_text
+
+
+def count_pages(file_data: bytes, pipeline: ProcessingPipeline) -> Optional[int]:
+    """Page count for a document (1 for images), or None if it cannot be read."""
+    if pipeline == ProcessingPipeline.IMAGE:
+        return 1
+    if pipeline == ProcessingPipeline.PDF:
+        from app.extractors.pdf_extractor import count_pdf_pages
+        return count_pdf_pages(file_data)
+    return None
+
+
+def extract_document_text(
+    file_data: bytes,
+    expected_mime: Optional[str] = None,
+    table_format: Optional[str] = None
+) -> Tuple[str, ProcessingPipeline, str]:
+    """
+    MIME detection, routing and text extraction in one call (process-pool friendly).
+    Returns:
+        Tuple of (detected_mime, pipeline, raw_text)
+    Raises:
+        InvalidDocumentError: If the file cannot be processed
+    """
+    detected_mime, pipeline = resolve_pipeline(file_data, expected_mime)
+    return detected_mime, pipeline, extract_text(file_data, pipeline, table_format)
@@ -1,9 +1,9 @@
-import httpx
 import json
 import logging
 import hmac
 import hashlib
 import base64
+from app.utils.tracing import inject_trace_headers
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +47,8 @@ class CallbackService:
         Raises:
             Exception: If callback fails or times out
         """
+        import httpx
+
         url = f"{self.backend_url}/api/callback"
 
         # Serialize callback data
@@ -59,6 +61,8 @@ class CallbackService:
             "Content-Type": "application/json",
             "X-Callback-HMAC": hmac_signature
         }
+        # Let the backend continue the job's trace (no-op when tracing is off)
+        inject_trace_headers(headers)
 
         self.logger.info(f"Sending callback for job {callback_data['jobId']} to {url}")
         self.logger.debug(f"HMAC signature: {hmac_signature[:20]}...")
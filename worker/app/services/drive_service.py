@@ -1,48 +1,152 @@
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-from google.oauth2 import service_account
-from googleapiclient.errors import HttpError
 import io
 import logging
 import time
 import socket
+import threading
+from functools import lru_cache
+from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=None)
+def _discovery_document(api: str, version: str) -> str:
+    """
+    Discovery document for a Google API, loaded once per process.
+    Uses the copy bundled with google-api-python-client (no network fetch);
+    build_from_document then skips re-reading and re-parsing it on reconnects.
+    """
+    from googleapiclient.discovery_cache import get_static_doc
+
+    document = get_static_doc(api, version)
+    if document is None:
+        raise RuntimeError(f"No bundled discovery document for {api} {version}")
+    return document
+
 class DriveService:
-    """Google Drive file operations."""
+    """
+    Google Drive file operations.
+    Jobs call these from several worker threads at once, and the httplib2
+    connection under a Drive service object is not thread-safe, so each
+    thread gets its own service (sharing the credentials).
+    """
 
     def __init__(self, service_account_key_path: str):
         self.service_account_key_path = service_account_key_path
-        self.service = None
+        self.credentials = None
+        self._local = threading.local()
+
+    @property
+    def service(self):
+        """This thread's Drive API service, built on first use (None before connect)."""
+        if self.credentials is None:
+            return None
+        service = getattr(self._local, "service", None)
+        if service is None:
+            from googleapiclient.discovery import build_from_document
+
+            service = build_from_document(_discovery_document('drive', 'v3'), credentials=self.credentials)
+            self._local.service = service
+        return service
 
     def connect(self):
         """Initialize Google Drive API service."""
+        # Imported here: the Google client libraries add noticeably to startup
+        from google.oauth2 import service_account
+
         try:
-            credentials = service_account.Credentials.from_service_account_file(
+            self.credentials = service_account.Credentials.from_service_account_file(
                 self.service_account_key_path,
                 scopes=['https://www.googleapis.com/auth/drive.readonly']
             )
-
-            self.service = build('drive', 'v3', credentials=credentials)
+            # Build the calling thread's service now so configuration errors surface here
+            self._local.service = None
+            _ = self.service
             logger.info("Google Drive service initialized")
 
         except Exception as e:
+            self.credentials = None
             logger.error(f"Failed to initialize Drive service: {e}")
             raise
 
-    def download_file(self, file_id: str) -> bytes:
-        """
-        Download file from Google Drive by file ID.
-        Includes retry logic for transient network errors (WinError 10053).
-        """
-        if not self.service:
+    def _ensure_connected(self):
+        if self.credentials is None:
             # Auto-connect if not connected
             try:
                 self.connect()
             except Exception:
                 raise RuntimeError("Drive service not initialized and failed to connect")
 
+    def get_metadata(self, file_id: str) -> dict:
+        """File metadata: md5Checksum (binary files only), size, mimeType, name, modifiedTime."""
+        self._ensure_connected()
+        return self.service.files().get(
+            fileId=file_id,
+            fields="md5Checksum,size,mimeType,name,modifiedTime"
+        ).execute()
+
+    def _get_range(self, file_id: str, byte_range: str) -> Tuple[bytes, Optional[int]]:
+        """
+        GET a byte range of a file's content (HTTP Range syntax, e.g. "0-65535" or "-2048").
+        Returns:
+            Tuple of (content, total file size from Content-Range, if reported)
+        """
+        from googleapiclient.errors import HttpError
+
+        self._ensure_connected()
+        request = self.service.files().get_media(fileId=file_id)
+        resp, content = request.http.request(request.uri, method="GET", headers={"range": f"bytes={byte_range}"})
+
+        if resp.status == 416:
+            # Range past the end: only happens for empty files
+            return b"", 0
+        if resp.status not in (200, 206):
+            raise HttpError(resp, content, uri=request.uri)
+
+        total_size = None
+        if "content-range" in resp:
+            total_size = int(resp["content-range"].rsplit("/", 1)[1])
+        elif resp.status == 200:
+            # Server ignored the range and sent the whole file
+            total_size = len(content)
+        return content, total_size
+
+    def download_prefix(self, file_id: str, size: int) -> Tuple[bytes, Optional[int]]:
+        """
+        Fetch the first `size` bytes of a file, for header checks before a full download.
+        Returns:
+            Tuple of (prefix, total file size or None if unknown)
+        """
+        return self._get_range(file_id, f"0-{size - 1}")
+
+    def _download_rest(self, file_id: str, prefix: bytes, total_size: int) -> bytes:
+        """Fetch the bytes after an already fetched prefix with one open-ended range request."""
+        content, _ = self._get_range(file_id, f"{len(prefix)}-")
+        if len(prefix) + len(content) < total_size:
+            raise ConnectionError(f"Short range response: {len(prefix) + len(content)} of {total_size} bytes")
+        return prefix + content
+
+    def download_file(
+        self,
+        file_id: str,
+        prefix: bytes = b"",
+        total_size: Optional[int] = None
+    ) -> bytes:
+        """
+        Download file from Google Drive by file ID.
+        Includes retry logic for transient network errors (WinError 10053).
+        Args:
+            file_id: Drive file ID
+            prefix, total_size: Result of download_prefix; only the remainder is fetched
+        """
+        from googleapiclient.errors import HttpError
+        from googleapiclient.http import MediaIoBaseDownload
+
+        self._ensure_connected()
+
+        if prefix and total_size is not None and len(prefix) >= total_size:
+            return prefix
+
         # RETRY LOGIC for Transient Errors
         max_retries = 3
 
@@ -50,6 +154,11 @@ class DriveService:
             try:
                 logger.info(f"Downloading file {file_id} (Attempt {attempt + 1}/{max_retries})")
 
+                if prefix and total_size is not None:
+                    file_data = self._download_rest(file_id, prefix, total_size)
+                    logger.info(f"Downloaded {len(file_data) - len(prefix)} bytes after a {len(prefix)} byte prefix")
+                    return file_data
+
                 # Request file download
                 request = self.service.files().get_media(fileId=file_id)
 
@@ -0,0 +1,58 @@
+"""
+Sanity checks that only need the first (and last) few KB of a file.
+Used on a byte-range prefix before the full download, so empty documents
+and broken or absurdly large images are rejected without transferring the
+rest of the file.
+"""
+import re
+import struct
+from typing import Optional, Tuple
+
+_LINEARIZED = re.compile(rb"/Linearized\b.{0,200}?/N\s+(\d+)", re.DOTALL)
+
+
+def pdf_declared_pages(prefix: bytes) -> Optional[int]:
+    """Page count from the linearization dictionary (/N), if the PDF is linearized."""
+    match = _LINEARIZED.search(prefix[:4096])
+    return int(match.group(1)) if match else None
+
+
+def image_dimensions(prefix: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a PNG, JPEG or GIF header, or None if not found in the prefix."""
+    if prefix.startswith(b"\x89PNG\r\n\x1a\n") and len(prefix) >= 24:
+        return struct.unpack(">II", prefix[16:24])
+
+    if prefix[:6] in (b"GIF87a", b"GIF89a") and len(prefix) >= 10:
+        return struct.unpack("<HH", prefix[6:10])
+
+    if prefix.startswith(b"\xff\xd8"):
+        return _jpeg_dimensions(prefix)
+
+    return None
+
+
+def _jpeg_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Walk JPEG segments to the first start-of-frame marker."""
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            # Markers without a length field
+            offset += 2
+            continue
+
+        (length,) = struct.unpack(">H", data[offset + 2:offset + 4])
+        # SOF0-SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+    return None
@@ -0,0 +1,417 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import Config, LLMProviderSettings
+from app.utils.metrics import LLM_REQUEST_DURATION, LLM_TOKENS, LLM_HEDGES
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """Rolling latency and error statistics for a single provider."""
+
+    def __init__(self, expected_latency: float, alpha: float = 0.2, window: int = 200):
+        self.alpha = alpha
+        self.ewma_latency = expected_latency
+        self.ewma_error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(latency)
+            self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+            self.ewma_error_rate = (1 - self.alpha) * self.ewma_error_rate
+
+    def record_failure(self, latency: float):
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            # Slow failures (timeouts) should also make the provider look slow
+            self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+            self.ewma_error_rate = self.alpha + (1 - self.alpha) * self.ewma_error_rate
+
+    def p95(self) -> Optional[float]:
+        """95th percentile of recent successful latencies, or None without samples."""
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def snapshot(self) -> dict:
+        p95 = self.p95()
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "ewma_latency_seconds": round(self.ewma_latency, 4),
+            "ewma_error_rate": round(self.ewma_error_rate, 4),
+            "p95_latency_seconds": round(p95, 4) if p95 is not None else None
+        }
+
+
+class ProviderHTTPError(Exception):
+    """Non-200 answer from an OpenAI-compatible endpoint."""
+
+    def __init__(self, provider: str, status_code: int, body: str):
+        super().__init__(f"{provider} returned HTTP {status_code}: {body[:200]}")
+        self.status_code = status_code
+
+
+class LLMUnavailableError(Exception):
+    """Every eligible provider failed (or none accepts the input size)."""
+
+    def __init__(self, errors: List[Tuple[str, Exception]]):
+        super().__init__(f"All LLM providers failed: {'; '.join(f'{name}: {e}' for name, e in errors)}")
+        # HTTP status per failed attempt (None for transport errors and timeouts)
+        self.status_codes = [getattr(e, "status_code", None) for _, e in errors]
+
+
+def request_outcome(error: Optional[Exception]) -> str:
+    """success, rate_limited (HTTP 429 from either provider kind) or error."""
+    if error is None:
+        return "success"
+    return "rate_limited" if getattr(error, "status_code", None) == 429 else "error"
+
+
+@dataclass
+class ChatResponse:
+    """Message content and token usage returned by a provider."""
+    content: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class LLMProvider:
+    """Base class for a chat-completions backend."""
+
+    def __init__(self, settings: LLMProviderSettings, alpha: float = 0.2):
+        self.name = settings.name
+        self.model = settings.model
+        self.min_input_chars = settings.min_input_chars
+        self.max_input_chars = settings.max_input_chars
+        self.stats = ProviderStats(settings.expected_latency, alpha=alpha)
+
+    def accepts(self, text_length: int) -> bool:
+        """Whether this provider is configured for inputs of the given size."""
+        if text_length < self.min_input_chars:
+            return False
+        if self.max_input_chars is not None and text_length > self.max_input_chars:
+            return False
+        return True
+
+    def complete(self, messages: List[dict], **params) -> ChatResponse:
+        """Send a chat completion request and return the message content."""
+        raise NotImplementedError
+
+
+class GroqProvider(LLMProvider):
+    """Provider backed by the Groq SDK."""
+
+    def __init__(self, settings: LLMProviderSettings, alpha: float = 0.2):
+        super().__init__(settings, alpha)
+        from groq import Groq  # Heavy SDK import, only needed for groq providers
+
+        client_kwargs = {
+            "api_key": settings.api_key,
+            "timeout": settings.timeout,
+            "max_retries": settings.max_retries
+        }
+        if settings.base_url:
+            client_kwargs["base_url"] = settings.base_url
+        self.client = Groq(**client_kwargs)
+
+    def complete(self, messages: List[dict], **params) -> ChatResponse:
+        chat_completion = self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            **params
+        )
+        usage = chat_completion.usage
+        return ChatResponse(
+            content=chat_completion.choices[0].message.content,
+            prompt_tokens=(usage.prompt_tokens or 0) if usage else 0,
+            completion_tokens=(usage.completion_tokens or 0) if usage else 0
+        )
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Provider for any endpoint implementing POST {base_url}/chat/completions."""
+
+    def __init__(self, settings: LLMProviderSettings, alpha: float = 0.2):
+        super().__init__(settings, alpha)
+        if not settings.base_url:
+            raise ValueError(f"LLM provider '{settings.name}' requires base_url")
+
+        headers = {"Content-Type": "application/json"}
+        if settings.api_key:
+            headers["Authorization"] = f"Bearer {settings.api_key}"
+
+        self.url = f"{settings.base_url.rstrip('/')}/chat/completions"
+        self.max_retries = settings.max_retries
+        self.client = httpx.Client(timeout=settings.timeout, headers=headers)
+
+    def complete(self, messages: List[dict], **params) -> ChatResponse:
+        body = {"model": self.model, "messages": messages, **params}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.post(self.url, json=body)
+            except httpx.TransportError:
+                if attempt < self.max_retries:
+                    continue
+                raise
+
+            if response.status_code >= 500 and attempt < self.max_retries:
+                continue
+            if response.status_code != 200:
+                raise ProviderHTTPError(self.name, response.status_code, response.text)
+
+            data = response.json()
+            usage = data.get("usage") or {}
+            return ChatResponse(
+                content=data["choices"][0]["message"]["content"],
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0)
+            )
+
+
+@dataclass
+class RoutedCompletion:
+    """Result of a routed chat completion."""
+    content: str
+    provider: str
+    model: str
+    latency: float
+    hedged: bool = False
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class LLMRouter:
+    """
+    Routes chat completions across several providers.
+
+    Providers eligible for the input size are ranked by EWMA latency inflated
+    by their EWMA error rate. Failures fall through to the next provider. With
+    hedging enabled, a second provider is started when the first has not
+    answered within its own p95 latency, and the first answer wins.
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        hedge_enabled: bool = False,
+        hedge_min_delay: float = 2.0,
+        error_penalty: float = 4.0,
+        max_in_flight: int = 1
+    ):
+        if not providers:
+            raise ValueError("LLMRouter requires at least one provider")
+
+        self.providers = providers
+        self.hedge_enabled = hedge_enabled and len(providers) > 1
+        self.hedge_min_delay = hedge_min_delay
+        self.error_penalty = error_penalty
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        # Called with (latency, outcome) after every provider request
+        self.observers: List[Callable[[float, str], None]] = []
+        # Hedged calls run here: a primary and a hedge for every concurrent complete(),
+        # so losing hedges that are still running never delay the next primary
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(2, max_in_flight * 2),
+            thread_name_prefix="llm-router"
+        )
+
+    def rank(self, text_length: int) -> List[LLMProvider]:
+        """Order providers by expected cost for an input of the given size."""
+        eligible = [p for p in self.providers if p.accepts(text_length)]
+        if not eligible:
+            logger.warning(f"No LLM provider configured for {text_length} chars, using all providers")
+            eligible = list(self.providers)
+
+        return sorted(eligible, key=self._score)
+
+    def _score(self, provider: LLMProvider) -> float:
+        stats = provider.stats
+        return stats.ewma_latency * (1 + self.error_penalty * stats.ewma_error_rate)
+
+    def _hedge_delay(self, provider: LLMProvider) -> float:
+        p95 = provider.stats.p95()
+        if p95 is None:
+            p95 = provider.stats.ewma_latency
+        return max(self.hedge_min_delay, p95)
+
+    def _call(self, provider: LLMProvider, messages: List[dict], params: dict) -> RoutedCompletion:
+        started = time.monotonic()
+        try:
+            response = provider.complete(messages, **params)
+        except Exception as e:
+            latency = time.monotonic() - started
+            provider.stats.record_failure(latency)
+            LLM_REQUEST_DURATION.labels(provider.name, "error").observe(latency)
+            self._notify(latency, request_outcome(e))
+            raise
+
+        latency = time.monotonic() - started
+        provider.stats.record_success(latency)
+        self._notify(latency, "success")
+        LLM_REQUEST_DURATION.labels(provider.name, "success").observe(latency)
+        LLM_TOKENS.labels(provider.name, "prompt").inc(response.prompt_tokens)
+        LLM_TOKENS.labels(provider.name, "completion").inc(response.completion_tokens)
+
+        return RoutedCompletion(
+            content=response.content,
+            provider=provider.name,
+            model=provider.model,
+            latency=latency,
+            prompt_tokens=response.prompt_tokens,
+            completion_tokens=response.completion_tokens
+        )
+
+    def _notify(self, latency: float, outcome: str):
+        for observer in self.observers:
+            try:
+                observer(latency, outcome)
+            except Exception as e:
+                logger.debug(f"LLM observer failed: {e}")
+
+    def complete(self, messages: List[dict], text_length: int, **params) -> RoutedCompletion:
+        """
+        Send a chat completion to the best available provider.
+        Args:
+            messages: Chat messages
+            text_length: Size of the document text, used for routing
+            **params: Extra request parameters (temperature, max_tokens, ...)
+        Returns:
+            RoutedCompletion from the first provider that succeeded
+        Raises:
+            Exception: If every eligible provider failed
+        """
+        candidates = self.rank(text_length)
+        errors = []
+
+        while candidates:
+            primary = candidates.pop(0)
+
+            if not self.hedge_enabled or not candidates:
+                try:
+                    return self._call(primary, messages, params)
+                except Exception as e:
+                    logger.warning(f"LLM provider {primary.name} failed: {e}")
+                    errors.append((primary.name, e))
+                    continue
+
+            result = self._complete_hedged(primary, candidates, messages, params, errors)
+            if result is not None:
+                return result
+
+        raise LLMUnavailableError(errors)
+
+    def _complete_hedged(
+        self,
+        primary: LLMProvider,
+        candidates: List[LLMProvider],
+        messages: List[dict],
+        params: dict,
+        errors: List[Tuple[str, Exception]]
+    ) -> Optional[RoutedCompletion]:
+        """Run primary, hedging with the next candidate if it is slow. Consumes used candidates."""
+        pending = {self._executor.submit(self._call, primary, messages, params): primary}
+        done, _ = wait(pending, timeout=self._hedge_delay(primary))
+
+        if not done:
+            secondary = candidates.pop(0)
+            self.hedges_fired += 1
+            LLM_HEDGES.labels("fired").inc()
+            logger.info(f"LLM provider {primary.name} exceeded p95 deadline, hedging with {secondary.name}")
+            pending[self._executor.submit(self._call, secondary, messages, params)] = secondary
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"LLM provider {provider.name} failed: {e}")
+                    errors.append((provider.name, e))
+                    continue
+
+                if provider is not primary:
+                    self.hedges_won += 1
+                    LLM_HEDGES.labels("won").inc()
+                    result.hedged = True
+                # The losing request keeps running in the background; its stats are still recorded
+                return result
+
+        return None
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Per-provider routing statistics."""
+        return {
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "providers": {
+                p.name: {"model": p.model, **p.stats.snapshot()} for p in self.providers
+            }
+        }
+
+
+def create_provider(settings: LLMProviderSettings, alpha: float = 0.2) -> LLMProvider:
+    """Instantiate a provider from its settings."""
+    if settings.kind == "groq":
+        return GroqProvider(settings, alpha)
+    if settings.kind == "openai":
+        return OpenAICompatibleProvider(settings, alpha)
+    raise ValueError(f"Unknown LLM provider kind '{settings.kind}' for '{settings.name}'")
+
+
+def build_llm_router(config: Config, tier: str = "large", max_jobs: Optional[int] = None) -> Optional[LLMRouter]:
+    """
+    Build the router for one cascade tier from configuration.
+    max_jobs is how many documents may be extracted at once (default:
+    concurrency_max); chunk requests of long documents come on top.
+    Without LLM_PROVIDERS, the large tier is a single Groq provider using
+    groq_model and the small tier (if the cascade is enabled) uses llm_small_model.
+    Returns None when no provider is configured for the tier.
+    """
+    if config.llm_providers:
+        provider_settings = [s for s in config.llm_providers if s.tier == tier]
+    elif tier == "large":
+        provider_settings = [LLMProviderSettings(name="groq", kind="groq", model=config.groq_model)]
+    else:
+        provider_settings = [
+            LLMProviderSettings(name="groq-small", kind="groq", tier="small", model=config.llm_small_model)
+        ]
+
+    if tier == "small" and not config.llm_cascade_enabled:
+        return None
+    if not provider_settings:
+        return None
+
+    providers = []
+    for settings in provider_settings:
+        if settings.kind == "groq" and not settings.api_key:
+            settings = settings.model_copy(update={"api_key": config.groq_api_key})
+        providers.append(create_provider(settings, config.llm_ewma_alpha))
+        logger.info(f"Registered {tier}-tier LLM provider {settings.name} ({settings.kind}, model={settings.model})")
+
+    return LLMRouter(
+        providers,
+        hedge_enabled=config.llm_hedge_enabled,
+        hedge_min_delay=config.llm_hedge_min_delay,
+        error_penalty=config.llm_error_penalty,
+        max_in_flight=(max_jobs or config.concurrency_max) + config.llm_chunk_concurrency
+    )
@@ -0,0 +1,194 @@
+"""
+Memory-budget admission control.
+Jobs reserve an estimate of their peak memory before they are claimed,
+so a burst of large scanned PDFs cannot push the worker past its RSS
+budget (counting the extraction processes). The estimate comes from JobPayload.fileSize and mimeType at claim
+time and is refined once the page count is known. Documents whose
+estimate exceeds the oversize threshold run in their own lane with a
+lower concurrency; everything else shares the normal lane.
+"""
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.metrics import MEMORY_BUDGET, MEMORY_RESERVED
+from app.utils.process_tree import child_pids, rss_bytes
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+NORMAL_LANE = "normal"
+OVERSIZE_LANE = "oversize"
+
+
+def current_rss() -> int:
+    """
+    Resident set size of this process and its children (the extraction pool)
+    in bytes (0 where /proc is unavailable).
+    """
+    return rss_bytes() + sum(rss_bytes(pid) for pid in child_pids())
+
+
+def memory_limit() -> Optional[int]:
+    """Container memory limit (cgroup v2, then v1), else physical memory, in bytes."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as limit_file:
+                value = limit_file.read().strip()
+            # cgroup v1 reports "unlimited" as a huge page-aligned number
+            if value != "max" and int(value) < 1 << 60:
+                return int(value)
+        except (OSError, ValueError):
+            continue
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError):
+        return None
+
+
+class MemoryAdmission:
+    """Reservations of estimated peak memory against an RSS budget."""
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        job_overhead_bytes: int = 50 * MB,
+        pdf_factor: float = 6.0,
+        image_factor: float = 12.0,
+        per_page_bytes: int = 4 * MB,
+        oversize_bytes: int = 512 * MB,
+        oversize_concurrency: int = 1
+    ):
+        self.budget_bytes = budget_bytes
+        self.job_overhead_bytes = job_overhead_bytes
+        self.pdf_factor = pdf_factor
+        self.image_factor = image_factor
+        self.per_page_bytes = per_page_bytes
+        self.oversize_bytes = oversize_bytes
+        self.oversize_concurrency = oversize_concurrency
+        # RSS of the idle process; reservations are counted on top of it
+        self.baseline_rss = current_rss()
+
+        self._reservations: Dict[str, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+
+        MEMORY_BUDGET.set(budget_bytes)
+
+    @classmethod
+    def from_config(cls, config) -> "MemoryAdmission":
+        budget = config.memory_budget_mb * MB if config.memory_budget_mb else None
+        if budget is None:
+            limit = memory_limit()
+            budget = int(limit * config.memory_budget_fraction) if limit else 1 << 62
+        return cls(
+            budget,
+            job_overhead_bytes=config.memory_job_overhead_mb * MB,
+            pdf_factor=config.memory_pdf_factor,
+            image_factor=config.memory_image_factor,
+            per_page_bytes=config.memory_per_page_mb * MB,
+            oversize_bytes=config.memory_oversize_mb * MB,
+            oversize_concurrency=config.memory_oversize_concurrency
+        )
+
+    # ─── Estimates ───
+
+    def estimate(self, file_size: int, mime_type: str, pages: Optional[int] = None) -> int:
+        """Expected peak memory in bytes for one document."""
+        factor = self.image_factor if (mime_type or "").startswith("image/") else self.pdf_factor
+        estimate = self.job_overhead_bytes + int(max(file_size, 0) * factor)
+        if pages:
+            estimate += pages * self.per_page_bytes
+        return estimate
+
+    def _max_factor(self) -> float:
+        return max(self.pdf_factor, self.image_factor)
+
+    def max_file_size(self, free_bytes: int) -> int:
+        """Largest fileSize of any MIME type whose estimate fits in free_bytes (-1 if none)."""
+        if free_bytes < self.job_overhead_bytes:
+            return -1
+        return int((free_bytes - self.job_overhead_bytes) / self._max_factor())
+
+    @property
+    def oversize_file_size(self) -> int:
+        """Smallest fileSize that may be estimated above the oversize threshold."""
+        return self.max_file_size(self.oversize_bytes) + 1
+
+    # ─── Reservations ───
+
+    @property
+    def reserved_bytes(self) -> int:
+        with self._lock:
+            return sum(size for _, size in self._reservations.values())
+
+    def free_bytes(self) -> int:
+        """Budget left after reservations, or after actual RSS if that is higher."""
+        used = max(self.baseline_rss + self.reserved_bytes, current_rss())
+        return self.budget_bytes - used
+
+    def lane_count(self, lane: str) -> int:
+        with self._lock:
+            return sum(1 for job_lane, _ in self._reservations.values() if job_lane == lane)
+
+    def claim_lanes(self) -> List[Tuple[str, int, Optional[int]]]:
+        """
+        Lanes that may claim now, in preference order, with the fileSize
+        range each may take: (lane, min_file_size, max_file_size or None).
+        The oversize lane comes first when it has a free slot and at least
+        the oversize threshold is free; the normal lane takes whatever fits.
+        With nothing reserved, one job of any size is always admitted: RSS
+        the allocator kept after a large job must not stop the worker for good.
+        """
+        free = self.free_bytes()
+        lanes = []
+        if self.lane_count(OVERSIZE_LANE) < self.oversize_concurrency and free >= self.oversize_bytes:
+            lanes.append((OVERSIZE_LANE, self.oversize_file_size, None))
+
+        max_size = min(self.max_file_size(free), self.oversize_file_size - 1)
+        if max_size >= 0:
+            lanes.append((NORMAL_LANE, 0, max_size))
+
+        if not lanes and not self.reserved_bytes:
+            # Smaller jobs first, since memory is short
+            lanes.append((NORMAL_LANE, 0, self.oversize_file_size - 1))
+            if self.oversize_concurrency > 0:
+                lanes.append((OVERSIZE_LANE, self.oversize_file_size, None))
+        return lanes
+
+    def reserve(self, job_id: str, file_size: int, mime_type: str, lane: Optional[str] = None) -> str:
+        """Reserve memory for a claimed job in the lane it was claimed for; returns the lane."""
+        size = self.estimate(file_size, mime_type)
+        if lane is None:
+            lane = OVERSIZE_LANE if size > self.oversize_bytes else NORMAL_LANE
+        with self._lock:
+            self._reservations[job_id] = (lane, size)
+        self._publish()
+        return lane
+
+    def update(self, job_id: str, file_size: int, mime_type: str, pages: Optional[int]):
+        """Refine a reservation once the page count is known (may exceed the budget)."""
+        with self._lock:
+            if job_id not in self._reservations:
+                return
+            lane, _ = self._reservations[job_id]
+            self._reservations[job_id] = (lane, self.estimate(file_size, mime_type, pages))
+        self._publish()
+
+    def release(self, job_id: str):
+        with self._lock:
+            self._reservations.pop(job_id, None)
+        self._publish()
+
+    def _publish(self):
+        MEMORY_RESERVED.set(self.reserved_bytes)
+
+    def snapshot(self) -> dict:
+        return {
+            "budget_mb": round(self.budget_bytes / MB, 1),
+            "reserved_mb": round(self.reserved_bytes / MB, 1),
+            "free_mb": round(self.free_bytes() / MB, 1),
+            "rss_mb": round(current_rss() / MB, 1),
+            "oversize_in_flight": self.lane_count(OVERSIZE_LANE)
+        }
@@ -0,0 +1,114 @@
+"""
+Checkpoint journal for long extraction runs.
+Stage outputs are stored per file content hash so a restarted run can skip
+every stage (and every file) that already finished. Backed by SQLite: the
+(content_hash, stage) primary key gives an indexed lookup that stays flat
+for hundreds of thousands of files, and WAL mode lets extraction processes
+read while the coordinating process writes.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages, in order
+STAGE_TEXT = "text"
+STAGE_LLM = "llm"
+STAGE_VALIDATION = "validation"
+# Bulk import: the callback for a final outcome reached the backend
+STAGE_CALLBACK = "callback"
+# Final callback of the polling worker, keyed by Drive md5Checksum
+STAGE_RESULT = "result"
+
+
+class CheckpointJournal:
+    """Persistent per-file, per-stage results keyed by content hash."""
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.Lock()
+
+        if read_only:
+            self.connection = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    content_hash TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (content_hash, stage)
+                ) WITHOUT ROWID
+            """)
+            self.connection.commit()
+
+    def get(self, content_hash: str, stage: str) -> Optional[dict]:
+        """Return the stored output of one stage, or None."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT payload FROM checkpoints WHERE content_hash = ? AND stage = ?",
+                (content_hash, stage)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_stages(self, content_hash: str) -> Dict[str, dict]:
+        """Return every stored stage output for a file."""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT stage, payload FROM checkpoints WHERE content_hash = ?",
+                (content_hash,)
+            ).fetchall()
+        return {stage: json.loads(payload) for stage, payload in rows}
+
+    def put(self, content_hash: str, stage: str, payload: dict):
+        """Store (or replace) the output of one stage and commit it."""
+        if self.read_only:
+            raise RuntimeError("Checkpoint journal opened read-only")
+
+        with self._lock:
+            self.connection.execute(
+                """
+                INSERT INTO checkpoints (content_hash, stage, payload, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (content_hash, stage) DO UPDATE
+                SET payload = excluded.payload, updated_at = excluded.updated_at
+                """,
+                (content_hash, stage, json.dumps(payload), datetime.now(timezone.utc).isoformat())
+            )
+            self.connection.commit()
+
+    def count(self, stage: str) -> int:
+        """Number of files that completed a stage."""
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM checkpoints WHERE stage = ?", (stage,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+# Read-only journals opened lazily inside extraction processes
+_process_journals: Dict[tuple, CheckpointJournal] = {}
+
+
+def get_process_journal(path: str) -> CheckpointJournal:
+    """Read-only journal for the current process (connections must not cross a fork)."""
+    key = (os.getpid(), path)
+    if key not in _process_journals:
+        _process_journals[key] = CheckpointJournal(path, read_only=True)
+    return _process_journals[key]
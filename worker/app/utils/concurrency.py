@@ -0,0 +1,206 @@
+"""
+Adaptive concurrency for the polling loop.
+An AIMD controller decides how many jobs a worker keeps in flight. Every
+adjustment interval it looks at what the last interval looked like:
+
+- LLM request latency (median against the lowest median seen recently)
+- share of LLM requests answered with HTTP 429
+- CPU utilisation of the worker and its extraction processes, across the
+  cores available to it
+- event-loop lag (how late a short sleep wakes up)
+
+Any overload signal cuts the limit multiplicatively; otherwise, if the
+worker actually used all of its slots, the limit grows by one. The limit
+stays within the configured bounds and every decision is counted in
+Prometheus.
+"""
+import asyncio
+import logging
+import math
+import os
+import statistics
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.utils.metrics import CONCURRENCY_DECISIONS, CONCURRENCY_LIMIT, CONCURRENCY_SIGNAL
+from app.utils.process_tree import child_pids, cpu_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight jobs, fed by LLM outcomes, CPU and event-loop lag."""
+
+    def __init__(
+        self,
+        min_limit: int = 1,
+        max_limit: int = 8,
+        initial_limit: int = 1,
+        decrease_factor: float = 0.7,
+        latency_tolerance: float = 2.0,
+        max_rate_limited_ratio: float = 0.05,
+        cpu_target: float = 0.9,
+        max_loop_lag: float = 0.5,
+        min_llm_samples: int = 3
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial_limit)))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.max_rate_limited_ratio = max_rate_limited_ratio
+        self.cpu_target = cpu_target
+        self.max_loop_lag = max_loop_lag
+        self.min_llm_samples = min_llm_samples
+
+        self.latency_baseline: Optional[float] = None
+        self.last_decision = "hold"
+        self.last_signals: Dict[str, float] = {}
+
+        # Observations for the current interval
+        self._lock = threading.Lock()
+        self._llm_latencies: List[float] = []
+        self._llm_requests = 0
+        self._llm_rate_limited = 0
+        self._peak_in_flight = 0
+        self._loop_lag = 0.0
+        self._cpu_mark = (time.monotonic(), time.process_time(), self._children_cpu())
+        self._cores = _available_cores()
+
+        CONCURRENCY_LIMIT.set(self.limit)
+
+    @property
+    def limit(self) -> int:
+        """Current number of job slots."""
+        return int(self._limit)
+
+    # ─── Observations ───
+
+    def observe_llm(self, latency: float, outcome: str):
+        """Record one LLM provider request (outcome: success, rate_limited or error)."""
+        with self._lock:
+            self._llm_requests += 1
+            if outcome == "success":
+                self._llm_latencies.append(latency)
+            elif outcome == "rate_limited":
+                self._llm_rate_limited += 1
+
+    def observe_in_flight(self, in_flight: int):
+        """Record how many slots were busy (saturation check for increases)."""
+        with self._lock:
+            self._peak_in_flight = max(self._peak_in_flight, in_flight)
+
+    def observe_loop_lag(self, lag: float):
+        with self._lock:
+            self._loop_lag = max(self._loop_lag, lag)
+
+    async def monitor_loop_lag(self, interval: float = 0.5):
+        """Measure how late the event loop wakes from a short sleep, until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.observe_loop_lag(max(0.0, loop.time() - expected))
+
+    # ─── Decisions ───
+
+    @staticmethod
+    def _children_cpu() -> Dict[int, float]:
+        return {pid: cpu_seconds(pid) for pid in child_pids()}
+
+    def _cpu_utilisation(self) -> float:
+        """
+        CPU time of this process and its children (the extraction pool) over
+        wall time since the last call, per available core.
+        """
+        wall, cpu, children = time.monotonic(), time.process_time(), self._children_cpu()
+        last_wall, last_cpu, last_children = self._cpu_mark
+        self._cpu_mark = (wall, cpu, children)
+        elapsed = wall - last_wall
+        # A child started since the last call counts from zero
+        used = cpu - last_cpu + sum(
+            max(0.0, seconds - last_children.get(pid, 0.0)) for pid, seconds in children.items()
+        )
+        return used / (elapsed * self._cores) if elapsed > 0 else 0.0
+
+    def _collect(self) -> dict:
+        with self._lock:
+            latencies, self._llm_latencies = self._llm_latencies, []
+            requests, self._llm_requests = self._llm_requests, 0
+            rate_limited, self._llm_rate_limited = self._llm_rate_limited, 0
+            peak, self._peak_in_flight = self._peak_in_flight, 0
+            lag, self._loop_lag = self._loop_lag, 0.0
+
+        return {
+            "llm_latency_median": statistics.median(latencies) if len(latencies) >= self.min_llm_samples else None,
+            "llm_rate_limited_ratio": rate_limited / requests if requests else 0.0,
+            "cpu_utilisation": self._cpu_utilisation(),
+            "loop_lag_seconds": lag,
+            "peak_in_flight": peak
+        }
+
+    def _overload_reason(self, signals: dict) -> Optional[str]:
+        if signals["llm_rate_limited_ratio"] > self.max_rate_limited_ratio:
+            return "rate_limited"
+        if signals["cpu_utilisation"] > self.cpu_target:
+            return "cpu"
+        if signals["loop_lag_seconds"] > self.max_loop_lag:
+            return "loop_lag"
+
+        median = signals["llm_latency_median"]
+        if median is not None:
+            baseline = self.latency_baseline
+            if baseline is None or median < baseline:
+                self.latency_baseline = median
+            else:
+                # Let the baseline follow a lasting shift (e.g. a different model) slowly
+                self.latency_baseline = baseline + 0.05 * (median - baseline)
+                if median > baseline * self.latency_tolerance:
+                    return "llm_latency"
+        return None
+
+    def adjust(self) -> str:
+        """Apply one AIMD step from the observations since the last call; returns the decision."""
+        signals = self._collect()
+        reason = self._overload_reason(signals)
+        previous = self.limit
+
+        if reason:
+            self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+            decision = "decrease"
+        elif signals["peak_in_flight"] >= self.limit and self.limit < self.max_limit:
+            self._limit = min(float(self.max_limit), math.floor(self._limit) + 1.0)
+            decision = "increase"
+        else:
+            reason = "unsaturated" if signals["peak_in_flight"] < self.limit else "at_max"
+            decision = "hold"
+
+        self.last_decision = f"{decision}:{reason}" if reason else decision
+        self.last_signals = signals
+        CONCURRENCY_DECISIONS.labels(decision, reason or "saturated").inc()
+        CONCURRENCY_LIMIT.set(self.limit)
+        for name, value in signals.items():
+            if value is not None:
+                CONCURRENCY_SIGNAL.labels(name).set(value)
+
+        if self.limit != previous:
+            logger.info(f"Concurrency limit {previous} -> {self.limit} ({self.last_decision})")
+        return decision
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "min": self.min_limit,
+            "max": self.max_limit,
+            "last_decision": self.last_decision,
+            "latency_baseline_seconds": round(self.latency_baseline, 3) if self.latency_baseline else None,
+            "signals": {k: round(v, 4) for k, v in self.last_signals.items() if v is not None}
+        }
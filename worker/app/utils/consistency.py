@@ -0,0 +1,154 @@
+"""
+Arithmetic cross-checks for extracted invoices.
+Produces a cheap confidence signal: an extraction whose numbers add up is
+very unlikely to be a hallucination, so the score can gate fast paths.
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.models.invoice import InvoiceData
+
+# Relative weight of each check family in the overall score
+LINE_ITEMS_WEIGHT = 0.4
+SUBTOTAL_WEIGHT = 0.3
+TOTAL_WEIGHT = 0.3
+
+# InvoiceData has no tax field: a total above Subtotal - Discount + Shipping
+# by at most this share of that amount is read as tax (VAT/GST/sales tax)
+MAX_IMPLIED_TAX_RATE = 0.3
+
+
+@dataclass
+class ConsistencyReport:
+    """Outcome of the arithmetic cross-checks."""
+    score: float
+    flags: Dict[str, str] = field(default_factory=dict)
+    checks_run: int = 0
+    implied_tax: float = 0.0
+
+    @property
+    def is_consistent(self) -> bool:
+        return not self.flags
+
+    def to_dict(self) -> dict:
+        report = {
+            "score": round(self.score, 4),
+            "flags": self.flags,
+            "checksRun": self.checks_run
+        }
+        if self.implied_tax:
+            report["impliedTax"] = round(self.implied_tax, 2)
+        return report
+
+
+def _close(actual: float, expected: float, abs_tolerance: float, rel_tolerance: float) -> bool:
+    return abs(actual - expected) <= max(abs_tolerance, rel_tolerance * abs(expected))
+
+
+def _discount_amount(invoice: InvoiceData, subtotal: float) -> float:
+    if not invoice.Discount:
+        return 0.0
+    if invoice.Discount.Amount is not None:
+        return invoice.Discount.Amount
+    if invoice.Discount.Percentage is not None:
+        return subtotal * invoice.Discount.Percentage / 100
+    return 0.0
+
+
+def score_invoice_consistency(
+    invoice: InvoiceData,
+    abs_tolerance: float = 0.02,
+    rel_tolerance: float = 0.005,
+    max_tax_rate: float = MAX_IMPLIED_TAX_RATE
+) -> ConsistencyReport:
+    """
+    Cross-check the numbers of an extracted invoice.
+    Checks, each with absolute/relative tolerance for rounding:
+    - Quantity x UnitRate == Amount for every line item
+    - sum(line Amounts) == Subtotal (when Subtotal is present)
+    - Subtotal - Discount + ShippingCost == TotalAmount, where a higher total
+      within max_tax_rate counts as tax (reported as implied_tax)
+
+    Args:
+        invoice: InvoiceData object to check
+        abs_tolerance: Absolute difference always allowed (currency rounding)
+        rel_tolerance: Relative difference allowed for larger amounts
+        max_tax_rate: Largest tax rate a total above the expected one may imply
+    Returns:
+        ConsistencyReport with a 0.0-1.0 score and per-field flags
+    """
+    flags: Dict[str, str] = {}
+    weighted: List[tuple] = []  # (weight, pass fraction)
+
+    # Line items, checked column-wise
+    quantities = [item.Quantity for item in invoice.LineItems]
+    rates = [item.UnitRate for item in invoice.LineItems]
+    amounts = [item.Amount for item in invoice.LineItems]
+    expected_amounts = [q * r for q, r in zip(quantities, rates)]
+    line_ok = [
+        _close(a, e, abs_tolerance, rel_tolerance)
+        for a, e in zip(amounts, expected_amounts)
+    ]
+
+    for idx, ok in enumerate(line_ok):
+        if not ok:
+            flags[f"LineItems[{idx}].Amount"] = (
+                f"{quantities[idx]} x {rates[idx]} = {expected_amounts[idx]:.2f}, got {amounts[idx]:.2f}"
+            )
+    if line_ok:
+        weighted.append((LINE_ITEMS_WEIGHT, sum(line_ok) / len(line_ok)))
+    checks_run = len(line_ok)
+
+    line_total = math.fsum(amounts)
+
+    # Sum of lines vs Subtotal
+    subtotal: Optional[float] = invoice.Subtotal
+    if subtotal is not None:
+        # Line rounding accumulates, so the tolerance scales with the number of lines
+        ok = _close(line_total, subtotal, abs_tolerance * max(len(amounts), 1), rel_tolerance)
+        if not ok:
+            flags["Subtotal"] = f"line items sum to {line_total:.2f}, got {subtotal:.2f}"
+        weighted.append((SUBTOTAL_WEIGHT, 1.0 if ok else 0.0))
+        checks_run += 1
+    else:
+        subtotal = line_total
+
+    # Subtotal - Discount + Shipping vs TotalAmount
+    discount = _discount_amount(invoice, subtotal)
+    shipping = invoice.ShippingCost or 0.0
+    expected_total = subtotal - discount + shipping
+    implied_tax = 0.0
+    ok = _close(invoice.TotalAmount, expected_total, abs_tolerance, rel_tolerance)
+    if not ok and expected_total < invoice.TotalAmount <= expected_total * (1 + max_tax_rate):
+        ok = True
+        implied_tax = invoice.TotalAmount - expected_total
+    if not ok:
+        flags["TotalAmount"] = (
+            f"{subtotal:.2f} - {discount:.2f} + {shipping:.2f} = {expected_total:.2f}, "
+            f"got {invoice.TotalAmount:.2f}"
+        )
+    weighted.append((TOTAL_WEIGHT, 1.0 if ok else 0.0))
+    checks_run += 1
+
+    # Percentage and amount both given: they must agree
+    if invoice.Discount and invoice.Discount.Amount is not None and invoice.Discount.Percentage is not None:
+        expected_discount = subtotal * invoice.Discount.Percentage / 100
+        checks_run += 1
+        if not _close(invoice.Discount.Amount, expected_discount, abs_tolerance, rel_tolerance):
+            flags["Discount"] = (
+                f"{invoice.Discount.Percentage}% of {subtotal:.2f} = {expected_discount:.2f}, "
+                f"got {invoice.Discount.Amount:.2f}"
+            )
+
+    total_weight = sum(weight for weight, _ in weighted)
+    score = sum(weight * passed for weight, passed in weighted) / total_weight
+    if "Discount" in flags:
+        score *= 0.9
+
+    return ConsistencyReport(
+        score=score,
+        flags=flags,
+        checks_run=checks_run,
+        implied_tax=implied_tax
+    )
@@ -0,0 +1,90 @@
+"""
+Per-job deadline with per-stage budgets.
+Every job gets an overall deadline, and each pipeline stage (download,
+extract, llm, callback) a budget of its own; a stage may use whichever is
+smaller of its remaining budget and the job's remaining time. Budgets come
+from configuration and can be overridden per scheduling lane. The callback
+is the exception: it only has its own budget, so a job that ran out of time
+can still report that it did.
+"""
+import asyncio
+import math
+import time
+from collections import defaultdict
+from typing import Awaitable, Dict, Optional
+
+from app.utils.metrics import STAGE_TIMEOUTS
+
+DOWNLOAD = "download"
+EXTRACT = "extract"
+LLM = "llm"
+CALLBACK = "callback"
+
+
+class StageTimeoutError(Exception):
+    """A pipeline stage ran out of budget (or the job out of time)."""
+
+    def __init__(self, stage: str, budget_seconds: float):
+        super().__init__(f"{stage} stage exceeded its {budget_seconds:.1f}s budget")
+        self.stage = stage
+        self.budget_seconds = budget_seconds
+
+
+class JobDeadline:
+    """Overall and per-stage time budgets for one job."""
+
+    def __init__(self, total_seconds: Optional[float] = None, stage_budgets: Optional[Dict[str, float]] = None):
+        self.total_seconds = total_seconds
+        self.stage_budgets = dict(stage_budgets or {})
+        self.started = time.monotonic()
+        self.spent: Dict[str, float] = defaultdict(float)
+
+    @classmethod
+    def from_config(cls, config, lane=None) -> "JobDeadline":
+        """Deadline from config.job_deadline_seconds and config.stage_budgets, with lane overrides."""
+        total = config.job_deadline_seconds
+        budgets = dict(config.stage_budgets)
+        if lane is not None:
+            if lane.deadline_seconds is not None:
+                total = lane.deadline_seconds
+            budgets.update(lane.stage_budgets)
+        return cls(total or None, budgets)
+
+    def remaining(self) -> float:
+        """Seconds left of the overall deadline (inf without one)."""
+        if not self.total_seconds:
+            return math.inf
+        return self.total_seconds - (time.monotonic() - self.started)
+
+    def budget(self, stage: str, within_deadline: bool = True) -> float:
+        """Seconds the stage may still use."""
+        stage_left = self.stage_budgets.get(stage, math.inf) - self.spent[stage]
+        return min(stage_left, self.remaining()) if within_deadline else stage_left
+
+    async def run(self, stage: str, awaitable: Awaitable, within_deadline: bool = True):
+        """
+        Await a stage step within its budget; time used is charged to the stage.
+        On timeout the step is cancelled and StageTimeoutError raised.
+        """
+        budget = self.budget(stage, within_deadline)
+        if budget <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            STAGE_TIMEOUTS.labels(stage).inc()
+            raise StageTimeoutError(stage, self.stage_budgets.get(stage, self.total_seconds or 0))
+
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(awaitable, None if math.isinf(budget) else budget)
+        except asyncio.TimeoutError:
+            STAGE_TIMEOUTS.labels(stage).inc()
+            raise StageTimeoutError(stage, budget) from None
+        finally:
+            self.spent[stage] += time.monotonic() - started
+
+    def snapshot(self) -> dict:
+        return {
+            "elapsedSeconds": round(time.monotonic() - self.started, 3),
+            "deadlineSeconds": self.total_seconds,
+            "spentSeconds": {stage: round(seconds, 3) for stage, seconds in self.spent.items()}
+        }
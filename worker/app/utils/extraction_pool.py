@@ -0,0 +1,138 @@
+"""
+Process pool for CPU-bound document stages that can be cancelled.
+pdfplumber, PyMuPDF and Tesseract have no timeouts of their own, and a
+thread cannot be stopped, so a pathological file would keep burning a core
+after its job gave up. Here a cancelled call kills the process running it:
+the pool is replaced, and calls that were running in the old pool are
+submitted again to the new one.
+
+Callers wait in slot() for a free process before starting the call, so a
+job's extract budget is only charged once its call is actually running.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from app.utils.metrics import EXTRACTION_POOL_RESTARTS
+
+logger = logging.getLogger(__name__)
+
+# Times a call killed to stop other jobs' calls is submitted again
+_COLLATERAL_RETRIES = 2
+
+
+class ExtractionQueueTimeoutError(Exception):
+    """No extraction process became free before the job ran out of time."""
+
+    def __init__(self, waited_seconds: float):
+        super().__init__(f"No extraction process free within {waited_seconds:.1f}s")
+        self.waited_seconds = waited_seconds
+
+
+class ExtractionInterruptedError(Exception):
+    """A call was killed repeatedly while the pool was restarted to stop other jobs' calls."""
+
+
+class ExtractionPool:
+    """Runs functions in worker processes; max_workers=0 runs them in threads (not cancellable)."""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.restarts = 0
+        self._executor = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        # One process per caller: created for the event loop that uses it
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+
+    @property
+    def out_of_process(self) -> bool:
+        return self.max_workers > 0
+
+    def _current(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: the worker process has threads (API server, LLM pools), fork is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor, self._generation
+
+    def _restart(self, generation: int):
+        """Kill every process of the pool generation, unless it was already replaced."""
+        with self._lock:
+            if generation != self._generation or self._executor is None:
+                return
+            executor, self._executor = self._executor, None
+            self._generation += 1
+            self.restarts += 1
+        EXTRACTION_POOL_RESTARTS.inc()
+
+        # ProcessPoolExecutor cannot cancel a running call; killing its processes is the only way
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        # Calls still queued fail with BrokenProcessPool and are resubmitted by run()
+        executor.shutdown(wait=False)
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        """
+        Hold one of the pool's processes for the calls made inside the block.
+        Raises:
+            ExtractionQueueTimeoutError: If none became free within timeout seconds
+        """
+        if not self.out_of_process:
+            yield
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots, self._slots_loop = asyncio.Semaphore(self.max_workers), loop
+        slots = self._slots
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise ExtractionQueueTimeoutError(timeout) from None
+        try:
+            yield
+        finally:
+            slots.release()
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in a worker process; cancelling the caller kills that process."""
+        if not self.out_of_process:
+            return await asyncio.to_thread(fn, *args)
+
+        for attempt in range(_COLLATERAL_RETRIES + 1):
+            executor, generation = self._current()
+            future = executor.submit(fn, *args)
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                if not future.cancel():
+                    logger.warning(f"Killing extraction processes to stop {getattr(fn, '__name__', fn)}")
+                    self._restart(generation)
+                raise
+            except BrokenProcessPool as e:
+                if generation != self._generation:
+                    # Killed to stop another job's call: run again in the new pool
+                    if attempt < _COLLATERAL_RETRIES:
+                        continue
+                    raise ExtractionInterruptedError(
+                        f"{getattr(fn, '__name__', fn)} was killed {attempt + 1} times by pool restarts"
+                    ) from e
+                # This call took its process down (crash or out of memory)
+                self._restart(generation)
+                raise
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,225 @@
+"""
+Failure classification and per-dependency circuit breakers.
+A failed job is classified by the error that caused it:
+
+- permanent: the document itself cannot be processed (a file the PDF or
+  image parser rejects as malformed, file gone from Drive, input no
+  provider accepts). Retrying cannot help, so the job is quarantined at
+  once instead of burning its retries. Any other extraction error (a
+  missing Tesseract binary, OS errors, a crashed pool process) is the
+  environment's and is transient.
+- rate_limited / transient: an upstream dependency (Google Drive or the
+  LLM providers) throttled or was unavailable. These count towards that
+  dependency's circuit breaker.
+- timeout: a stage exceeded its budget (see app.utils.deadline). Slow
+  downloads and LLM calls count against their dependency; an extraction
+  timeout is the document's fault and quarantines it like a permanent one.
+  Waiting for a free extraction process, or being killed with the pool to
+  stop another job's call, is not: those are transient.
+
+An open breaker stops the worker from claiming: jobs stay queued in their
+original order rather than being claimed, failed and pushed back by retry
+backoff during an outage. After a cool-down one job is let through as a
+probe; its outcome closes the breaker or opens it again for longer.
+"""
+import logging
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import httpx
+
+from app.pipeline import DocumentParseError
+from app.services.llm_router import LLMUnavailableError
+from app.utils.deadline import StageTimeoutError
+from app.utils.extraction_pool import ExtractionInterruptedError, ExtractionQueueTimeoutError
+from app.utils.metrics import CIRCUIT_STATE
+
+logger = logging.getLogger(__name__)
+
+PERMANENT = "permanent"
+RATE_LIMITED = "rate_limited"
+TRANSIENT = "transient"
+TIMEOUT = "timeout"
+
+DRIVE = "drive"
+LLM = "llm"
+DEPENDENCIES = (DRIVE, LLM)
+
+# Deadline stages that wait on an upstream dependency
+_STAGE_DEPENDENCIES = {"download": DRIVE, "llm": LLM}
+
+# HTTP statuses that reject this particular request rather than signal an outage
+_PERMANENT_LLM_STATUSES = {400, 413, 422}
+_PERMANENT_DRIVE_STATUSES = {400, 403, 404, 410}
+_DRIVE_RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+_CONNECTION_ERRORS = (ConnectionError, TimeoutError, socket.timeout, socket.gaierror, httpx.TransportError)
+
+
+@dataclass
+class Failure:
+    """Why a job failed. dependency is set when an upstream service was at fault."""
+    kind: str
+    dependency: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "dependency": self.dependency}
+
+
+def _chain(error: BaseException) -> Iterator[BaseException]:
+    """The error and the exceptions it was raised from or while handling."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def _classify_llm(error: LLMUnavailableError) -> Failure:
+    codes = error.status_codes
+    if not codes:
+        # No provider accepts an input of this size
+        return Failure(PERMANENT)
+    if all(code == 429 for code in codes):
+        return Failure(RATE_LIMITED, LLM)
+    if all(code in _PERMANENT_LLM_STATUSES for code in codes):
+        return Failure(PERMANENT)
+    return Failure(TRANSIENT, LLM)
+
+
+def _classify_drive(error) -> Failure:
+    status = int(getattr(error.resp, "status", 0) or 0)
+    content = getattr(error, "content", b"") or b""
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", "replace")
+    if status == 429 or (status == 403 and any(reason in content for reason in _DRIVE_RATE_LIMIT_REASONS)):
+        return Failure(RATE_LIMITED, DRIVE)
+    if status in _PERMANENT_DRIVE_STATUSES:
+        return Failure(PERMANENT)
+    return Failure(TRANSIENT, DRIVE)
+
+
+def classify_failure(error: BaseException, stage: Optional[str] = None) -> Failure:
+    """
+    Classify the error that failed a job.
+    Args:
+        error: The exception (wrapped errors are followed through __cause__/__context__)
+        stage: Pipeline stage that raised it: "drive", "extract", "llm" or None
+    Returns:
+        Failure; errors nothing is known about are transient without a
+        dependency (retried with backoff, as before)
+    """
+    from googleapiclient.errors import HttpError
+
+    for cause in _chain(error):
+        if isinstance(cause, (ExtractionQueueTimeoutError, ExtractionInterruptedError)):
+            # Another job's load, not this document
+            return Failure(TRANSIENT)
+        if isinstance(cause, DocumentParseError):
+            return Failure(PERMANENT)
+        if isinstance(cause, StageTimeoutError):
+            return Failure(TIMEOUT, _STAGE_DEPENDENCIES.get(cause.stage))
+        if isinstance(cause, LLMUnavailableError):
+            return _classify_llm(cause)
+        if isinstance(cause, HttpError):
+            return _classify_drive(cause)
+
+    if any(isinstance(cause, _CONNECTION_ERRORS) for cause in _chain(error)):
+        return Failure(TRANSIENT, stage if stage in DEPENDENCIES else None)
+    return Failure(TRANSIENT)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one upstream dependency: closed, open or half-open."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, open_seconds: float = 30.0,
+                 max_open_seconds: float = 300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.open_seconds = open_seconds
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self._lock = threading.Lock()
+        self._publish()
+
+    def allow(self) -> Optional[str]:
+        """
+        Whether a job may be claimed now: "closed", "probe" (the one job
+        let through half-open), or None while open or a probe is running.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return self.CLOSED
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return None
+                self.state = self.HALF_OPEN
+                self._publish()
+                logger.info(f"Circuit {self.name} half-open, sending a probe job")
+            if self.probe_in_flight:
+                return None
+            self.probe_in_flight = True
+            return "probe"
+
+    def probe_done(self):
+        """The probe job finished without reaching this dependency; let the next one probe."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed, {self.name} is answering again")
+                self.state = self.CLOSED
+                self.open_seconds = self.base_open_seconds
+                self.probe_in_flight = False
+                self._publish()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                # Failed probe: back off for longer
+                self.open_seconds = min(self.max_open_seconds, self.open_seconds * 2)
+                self._open()
+            elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self.times_opened += 1
+        self._publish()
+        logger.warning(
+            f"Circuit {self.name} open after {self.failures} consecutive failures, "
+            f"pausing claims for {self.open_seconds:.0f}s"
+        )
+
+    def _publish(self):
+        CIRCUIT_STATE.labels(self.name).set({self.CLOSED: 0, self.HALF_OPEN: 1, self.OPEN: 2}[self.state])
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "open_seconds": self.open_seconds,
+            "times_opened": self.times_opened
+        }
@@ -0,0 +1,64 @@
+"""
+Per-job timing and size breakdown.
+Each processed job carries a JobTrace that records how long every pipeline
+stage took and how big the document was. The trace is sent with the
+callback and written as one JSON log line per job, so slow invoices can be
+found and correlated with their size.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.utils.metrics import stage_timer
+from app.utils.tracing import span
+
+logger = logging.getLogger("app.job_trace")
+
+
+class JobTrace:
+    """Stage timings (milliseconds) and sizes for a single job attempt."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.timings: Dict[str, float] = {}
+        self.sizes: Dict[str, int] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, span_name: Optional[str] = None):
+        """
+        Time a stage for this job and for the aggregate stage histograms.
+        Also opens a tracing span (named span_name, defaulting to the stage name).
+        """
+        started = time.perf_counter()
+        try:
+            with span(span_name or name, {"job.id": self.job_id, "stage": name}), stage_timer(name):
+                yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float):
+        """Add a duration measured elsewhere (repeated stages accumulate)."""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds * 1000
+
+    def add_size(self, name: str, value: Optional[int]):
+        if value is not None:
+            self.sizes[name] = self.sizes.get(name, 0) + int(value)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "timingsMs": {name: round(ms, 1) for name, ms in self.timings.items()},
+            "totalMs": round(self.elapsed_ms, 1),
+            "sizes": dict(self.sizes)
+        }
+
+    def log(self, status: str, **fields):
+        """Write the trace as a single structured log line."""
+        entry = {"jobId": self.job_id, "status": status, **fields, **self.to_dict()}
+        logger.info(f"job_trace {json.dumps(entry, default=str)}")
@@ -0,0 +1,86 @@
+"""
+Size-aware scheduling lanes.
+Each lane takes jobs by payload MIME type and fileSize and has its own
+slots, so a single-page receipt is not queued behind a 60-page scanned
+statement: small text PDFs, images and large documents are claimed
+independently. Lanes are tried in configured order; their fileSize range
+is narrowed by memory admission before each claim.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.config import LaneSettings
+from app.utils.metrics import LANE_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ClaimPlan:
+    """One claim attempt: a lane and the payload range it may take now."""
+    lane: LaneSettings
+    memory_lane: str
+    min_file_size: int
+    max_file_size: Optional[int]
+
+    @property
+    def mime_patterns(self) -> Optional[List[str]]:
+        """LIKE patterns for the claim query (None: any MIME type)."""
+        if not self.lane.mime_types:
+            return None
+        return [mime.replace("%", r"\%").replace("_", r"\_").replace("*", "%") for mime in self.lane.mime_types]
+
+
+class LaneScheduler:
+    """Per-lane slot accounting for in-flight jobs."""
+
+    def __init__(self, lanes: List[LaneSettings]):
+        if not lanes:
+            raise ValueError("At least one scheduling lane is required")
+        self.lanes = lanes
+        self._running: Dict[str, str] = {}
+        self._publish()
+
+    def in_flight(self, lane_name: str) -> int:
+        return sum(1 for name in self._running.values() if name == lane_name)
+
+    def plans(self, memory_ranges: List[Tuple[str, int, Optional[int]]]) -> Iterator[ClaimPlan]:
+        """
+        Claim attempts in preference order: every lane with a free slot,
+        intersected with each fileSize range memory admission allows.
+        """
+        for lane in self.lanes:
+            if self.in_flight(lane.name) >= lane.slots:
+                continue
+            for memory_lane, min_size, max_size in memory_ranges:
+                low = max(lane.min_file_size, min_size)
+                high = _min_optional(lane.max_file_size, max_size)
+                if high is None or low <= high:
+                    yield ClaimPlan(lane, memory_lane, low, high)
+
+    def start(self, job_id: str, lane_name: str):
+        self._running[job_id] = lane_name
+        self._publish()
+
+    def finish(self, job_id: str):
+        self._running.pop(job_id, None)
+        self._publish()
+
+    def _publish(self):
+        for lane in self.lanes:
+            LANE_IN_FLIGHT.labels(lane.name).set(self.in_flight(lane.name))
+
+    def snapshot(self) -> dict:
+        return {
+            lane.name: {"in_flight": self.in_flight(lane.name), "slots": lane.slots}
+            for lane in self.lanes
+        }
+
+
+def _min_optional(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
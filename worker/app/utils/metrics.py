@@ -0,0 +1,206 @@
+"""
+Prometheus instrumentation for the invoice worker.
+All metrics live in the default prometheus_client registry (which also
+carries the process_* collectors) and are served in text format by the
+/metrics endpoint.
+"""
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+# Pipeline stages range from milliseconds (MIME detection) to minutes (OCR, LLM)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+STAGE_DURATION = Histogram(
+    "invoice_worker_stage_duration_seconds",
+    "Time spent in each pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+STAGE_IN_FLIGHT = Gauge(
+    "invoice_worker_stage_in_flight",
+    "Jobs currently inside each pipeline stage",
+    ["stage"]
+)
+JOBS_IN_FLIGHT = Gauge(
+    "invoice_worker_jobs_in_flight",
+    "Jobs claimed and not yet finished"
+)
+JOBS_FINISHED = Counter(
+    "invoice_worker_jobs_total",
+    "Jobs finished, by outcome (COMPLETED, INVALID, FAILED, RETRIED, REQUEUED)",
+    ["status"]
+)
+JOB_DURATION = Histogram(
+    "invoice_worker_job_duration_seconds",
+    "End-to-end processing time per job attempt",
+    buckets=STAGE_BUCKETS
+)
+QUEUE_WAIT = Histogram(
+    "invoice_worker_queue_wait_seconds",
+    "Time between a job becoming ready and being claimed",
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+)
+
+BYTES_DOWNLOADED = Counter(
+    "invoice_worker_downloaded_bytes_total",
+    "Bytes downloaded from Google Drive"
+)
+PDF_PAGES = Counter(
+    "invoice_worker_pdf_pages_total",
+    "PDF pages processed by the text extractor"
+)
+OCR_CHARACTERS = Counter(
+    "invoice_worker_ocr_characters_total",
+    "Characters produced by Tesseract OCR"
+)
+EXTRACTED_CHARACTERS = Counter(
+    "invoice_worker_extracted_characters_total",
+    "Characters of document text sent to the LLM stage"
+)
+
+RESULT_REUSE = Counter(
+    "invoice_worker_result_reuse_total",
+    "Result index lookups by Drive md5Checksum, by outcome (hit/miss/no_checksum)",
+    ["outcome"]
+)
+
+NEAR_DUPLICATES = Counter(
+    "invoice_worker_near_duplicates_total",
+    "Near-duplicate text lookups by outcome (reused/flagged/unique/too_short)",
+    ["outcome"]
+)
+
+JOB_FAILURES = Counter(
+    "invoice_worker_job_failures_total",
+    "Failed job attempts by class (permanent/rate_limited/transient/timeout) and upstream dependency",
+    ["kind", "dependency"]
+)
+
+CIRCUIT_STATE = Gauge(
+    "invoice_worker_circuit_state",
+    "Circuit breaker state per upstream dependency (0 closed, 1 half-open, 2 open)",
+    ["dependency"]
+)
+
+STAGE_TIMEOUTS = Counter(
+    "invoice_worker_stage_timeouts_total",
+    "Pipeline stages stopped for exceeding their budget or the job deadline",
+    ["stage"]
+)
+
+EXTRACTION_POOL_RESTARTS = Counter(
+    "invoice_worker_extraction_pool_restarts_total",
+    "Extraction process pools killed to stop a timed-out or crashed call"
+)
+
+BACKLOG_PENDING = Gauge(
+    "invoice_worker_backlog_pending_jobs",
+    "PENDING jobs in job_queues (including those waiting for NextRetryAt)"
+)
+BACKLOG_READY = Gauge(
+    "invoice_worker_backlog_ready_jobs",
+    "PENDING jobs claimable now"
+)
+BACKLOG_OLDEST_AGE = Gauge(
+    "invoice_worker_backlog_oldest_pending_age_seconds",
+    "Age of the oldest PENDING job"
+)
+BACKLOG_DRAIN = Gauge(
+    "invoice_worker_backlog_estimated_drain_seconds",
+    "Pending jobs divided by this worker's recent throughput (-1 when unknown)"
+)
+BACKLOG_DESIRED_WORKERS = Gauge(
+    "invoice_worker_backlog_desired_workers",
+    "Workers at this worker's throughput needed to drain within the target (-1 when unknown)"
+)
+WORKER_THROUGHPUT = Gauge(
+    "invoice_worker_throughput_jobs_per_second",
+    "Jobs finished by this worker per second over the recent window"
+)
+
+CONCURRENCY_LIMIT = Gauge(
+    "invoice_worker_concurrency_limit",
+    "Jobs this worker may have in flight, as set by the adaptive controller"
+)
+CONCURRENCY_DECISIONS = Counter(
+    "invoice_worker_concurrency_decisions_total",
+    "Adaptive concurrency adjustments, by decision (increase/decrease/hold) and reason",
+    ["decision", "reason"]
+)
+CONCURRENCY_SIGNAL = Gauge(
+    "invoice_worker_concurrency_signal",
+    "Inputs to the last concurrency adjustment (LLM latency, 429 ratio, CPU, loop lag, peak in flight)",
+    ["signal"]
+)
+
+MEMORY_BUDGET = Gauge(
+    "invoice_worker_memory_budget_bytes",
+    "RSS budget that job admission keeps within"
+)
+MEMORY_RESERVED = Gauge(
+    "invoice_worker_memory_reserved_bytes",
+    "Estimated peak memory reserved by in-flight jobs"
+)
+LANE_IN_FLIGHT = Gauge(
+    "invoice_worker_lane_in_flight",
+    "Jobs in flight per scheduling lane (see LANES)",
+    ["lane"]
+)
+
+STARTUP_DURATION = Gauge(
+    "invoice_worker_startup_seconds",
+    "Startup time by phase (llm, database, drive, services, processToReady)",
+    ["phase"]
+)
+
+LLM_REQUEST_DURATION = Histogram(
+    "invoice_worker_llm_request_duration_seconds",
+    "Latency of individual LLM provider requests",
+    ["provider", "outcome"],
+    buckets=STAGE_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "invoice_worker_llm_tokens_total",
+    "LLM tokens used, by provider and kind (prompt/completion)",
+    ["provider", "kind"]
+)
+LLM_TIER = Counter(
+    "invoice_worker_llm_tier_total",
+    "Extractions served by each cascade tier",
+    ["tier"]
+)
+LLM_HEDGES = Counter(
+    "invoice_worker_llm_hedges_total",
+    "Hedged LLM requests, by result (fired/won)",
+    ["result"]
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Record the duration of a pipeline stage and track it as in flight."""
+    in_flight = STAGE_IN_FLIGHT.labels(stage)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.labels(stage).observe(time.perf_counter() - started)
+        in_flight.dec()
+
+
+def record_backlog(snapshot):
+    """Publish a BacklogSnapshot to the backlog gauges."""
+    BACKLOG_PENDING.set(snapshot.pending)
+    BACKLOG_READY.set(snapshot.ready)
+    BACKLOG_OLDEST_AGE.set(snapshot.oldest_pending_age_seconds)
+    BACKLOG_DRAIN.set(-1 if snapshot.estimated_drain_seconds is None else snapshot.estimated_drain_seconds)
+    BACKLOG_DESIRED_WORKERS.set(-1 if snapshot.desired_workers is None else snapshot.desired_workers)
+    WORKER_THROUGHPUT.set(snapshot.worker_throughput_per_second)
+
+
+def render_metrics() -> tuple:
+    """Return (body, content type) for the Prometheus text exposition."""
+    return generate_latest(), CONTENT_TYPE_LATEST
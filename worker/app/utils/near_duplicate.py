@@ -0,0 +1,284 @@
+"""
+Near-duplicate detection over extracted invoice text.
+Re-scans and re-photos of the same paper invoice differ byte for byte, so
+the md5 result index never matches them. Their extracted text, however,
+shares most of its word shingles. Each document gets a MinHash signature
+over its word 3-shingles; locality-sensitive hashing (bands of signature
+rows) finds candidates in constant time, and a candidate counts as a
+duplicate when its estimated Jaccard similarity reaches the threshold and
+its numeric tokens (invoice number, dates, amounts) largely agree. The
+second check keeps most monthly bills from the same template apart, but
+a recurring bill with the same lines differs only in its invoice number
+and date and still passes it. Reusing an earlier extraction therefore
+also needs identifiers_match: the earlier invoice's number and date must
+appear verbatim in the new text.
+
+Lookups are scoped (by the worker, to the uploader), so one uploader's
+documents never match another's. Signatures live in memory and are
+appended to SQLite, so the index survives restarts; the oldest entries are
+evicted past max_entries. The earlier extraction a match would reuse is
+kept only with store_payloads, and then on disk (in memory only when the
+index has no SQLite file), loaded for the one match that needs it.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime for the universal hash family h(x) = (a*x + b) mod p
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_WORD = re.compile(r"[a-z0-9]+(?:[.,/-][a-z0-9]+)*")
+
+
+@dataclass
+class NearDuplicate:
+    """The closest previously indexed document."""
+    key: str
+    similarity: float
+    number_similarity: float
+    payload: Optional[dict] = None
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def identifiers_match(numbers: FrozenSet[str], *identifiers: Optional[str]) -> bool:
+    """
+    True when every identifier (e.g. an earlier invoice's number and date) has
+    numeric tokens and all of them are among a text's numeric tokens.
+    """
+    for identifier in identifiers:
+        tokens = [token for token in _WORD.findall((identifier or "").lower()) if any(c.isdigit() for c in token)]
+        if not tokens or not numbers.issuperset(tokens):
+            return False
+    return True
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index of extracted texts, persisted to SQLite."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        num_perm: int = 128,
+        bands: int = 16,
+        threshold: float = 0.85,
+        number_threshold: float = 0.8,
+        shingle_size: int = 3,
+        min_shingles: int = 20,
+        max_entries: int = 100_000,
+        store_payloads: bool = False,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.number_threshold = number_threshold
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        self.max_entries = max_entries
+        self.store_payloads = store_payloads
+
+        rng = random.Random(seed)
+        self._permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+        # key -> (minhash, numeric tokens, scope)
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, ...], FrozenSet[str], Optional[str]]]" = OrderedDict()
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [defaultdict(set) for _ in range(bands)]
+        # Payloads of an index without SQLite (store_payloads only)
+        self._payloads: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+        self.connection = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS near_duplicates (
+                    key TEXT PRIMARY KEY,
+                    num_perm INTEGER NOT NULL,
+                    signature BLOB NOT NULL,
+                    numbers TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    scope TEXT
+                )
+            """)
+            columns = {row[1] for row in self.connection.execute("PRAGMA table_info(near_duplicates)")}
+            if "scope" not in columns:
+                # Signatures from before scoping only match unscoped lookups
+                self.connection.execute("ALTER TABLE near_duplicates ADD COLUMN scope TEXT")
+            self.connection.commit()
+            self._load()
+
+    # ─── Signatures ───
+
+    def tokens(self, text: str) -> List[str]:
+        return _WORD.findall(text.lower())
+
+    def shingles(self, tokens: List[str]) -> Set[str]:
+        k = self.shingle_size
+        return {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+
+    def signature(self, text: str) -> Optional[Tuple[Tuple[int, ...], FrozenSet[str]]]:
+        """
+        (MinHash signature, numeric tokens) of a text, or None when it is too
+        short to compare meaningfully (blank scans would all match each other).
+        """
+        tokens = self.tokens(text)
+        shingles = self.shingles(tokens)
+        if len(shingles) < self.min_shingles:
+            return None
+
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little")
+            for shingle in shingles
+        ]
+        minhash = tuple(
+            min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+            for a, b in self._permutations
+        )
+        numbers = frozenset(token for token in tokens if any(char.isdigit() for char in token))
+        return minhash, numbers
+
+    def _bands(self, minhash: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, minhash[band * self.rows:(band + 1) * self.rows]
+
+    # ─── Lookup and insert ───
+
+    def query(
+        self, signature: Tuple[Tuple[int, ...], FrozenSet[str]], scope: Optional[str] = None
+    ) -> Optional[NearDuplicate]:
+        """Most similar document indexed under the same scope above both thresholds, or None."""
+        minhash, numbers = signature
+        with self._lock:
+            candidates = set()
+            for band, rows in self._bands(minhash):
+                candidates |= self._buckets[band].get(rows, set())
+
+            best = None
+            for key in candidates:
+                other_minhash, other_numbers, other_scope = self._entries[key]
+                if other_scope != scope:
+                    continue
+                similarity = sum(1 for x, y in zip(minhash, other_minhash) if x == y) / self.num_perm
+                if similarity < self.threshold:
+                    continue
+                number_similarity = _jaccard(numbers, other_numbers)
+                if number_similarity < self.number_threshold:
+                    continue
+                if best is None or similarity > best.similarity:
+                    best = NearDuplicate(key, round(similarity, 3), round(number_similarity, 3))
+            if best is not None and self.store_payloads:
+                best.payload = self._payload(best.key)
+        return best
+
+    def _payload(self, key: str) -> Optional[dict]:
+        """Stored payload of key (caller holds the lock); None if it was indexed without one."""
+        if self.connection is None:
+            return self._payloads.get(key)
+        row = self.connection.execute("SELECT payload FROM near_duplicates WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add(
+        self,
+        key: str,
+        signature: Tuple[Tuple[int, ...], FrozenSet[str]],
+        payload: Optional[dict] = None,
+        scope: Optional[str] = None
+    ):
+        """
+        Index a document under key (e.g. its job id) and scope (e.g. its
+        uploader). The payload to return on a match is kept only with store_payloads.
+        """
+        minhash, numbers = signature
+        payload = payload if self.store_payloads else None
+        with self._lock:
+            evicted = self._insert(key, minhash, numbers, scope)
+            if self.connection is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO near_duplicates "
+                    "(key, num_perm, signature, numbers, payload, created_at, scope) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        self.num_perm,
+                        struct.pack(f"<{self.num_perm}I", *minhash),
+                        json.dumps(sorted(numbers)),
+                        json.dumps(payload),
+                        datetime.now(timezone.utc).isoformat(),
+                        scope
+                    )
+                )
+                if evicted:
+                    self.connection.executemany("DELETE FROM near_duplicates WHERE key = ?", [(k,) for k in evicted])
+                self.connection.commit()
+            elif payload is not None:
+                self._payloads[key] = payload
+
+    def _insert(self, key: str, minhash: Tuple[int, ...], numbers: FrozenSet[str], scope: Optional[str]) -> List[str]:
+        """Add to memory (caller holds the lock); returns the keys evicted to stay within max_entries."""
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (minhash, numbers, scope)
+        for band, rows in self._bands(minhash):
+            self._buckets[band][rows].add(key)
+
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            evicted.append(oldest)
+        return evicted
+
+    def _remove(self, key: str):
+        minhash, _, _ = self._entries.pop(key)
+        self._payloads.pop(key, None)
+        for band, rows in self._bands(minhash):
+            bucket = self._buckets[band].get(rows)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][rows]
+
+    def _load(self):
+        """Rebuild the in-memory index from disk, oldest first (signatures of another num_perm are skipped)."""
+        rows = self.connection.execute(
+            "SELECT key, signature, numbers, scope FROM near_duplicates WHERE num_perm = ? ORDER BY created_at",
+            (self.num_perm,)
+        ).fetchall()
+        for key, blob, numbers, scope in rows[-self.max_entries:]:
+            minhash = struct.unpack(f"<{self.num_perm}I", blob)
+            self._insert(key, minhash, frozenset(json.loads(numbers)), scope)
+        if rows:
+            logger.info(f"Loaded {len(self._entries)} near-duplicate signatures from {self.path}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self):
+        if self.connection is not None:
+            with self._lock:
+                self.connection.close()
@@ -0,0 +1,60 @@
+"""
+CPU time and resident memory of this process's children, read from /proc.
+Page counting, PDF text extraction and OCR run in the extraction pool's
+spawned processes, so the worker's own process_time() and RSS miss most of
+the load they are meant to measure. Where /proc is unavailable every
+helper reports nothing (no children, zero usage).
+"""
+import os
+from typing import List
+
+try:
+    _CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _CLOCK_TICKS, _PAGE_SIZE = 100, 4096
+
+
+def _stat_fields(pid) -> List[str]:
+    """/proc/<pid>/stat fields after the command name, which may contain spaces."""
+    with open(f"/proc/{pid}/stat") as stat:
+        content = stat.read()
+    return content[content.rindex(")") + 2:].split()
+
+
+def child_pids() -> List[int]:
+    """Direct child processes of this process."""
+    parent = os.getpid()
+    pids = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return pids
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            if int(_stat_fields(entry)[1]) == parent:
+                pids.append(int(entry))
+        except (OSError, ValueError, IndexError):
+            # Exited while listing
+            continue
+    return pids
+
+
+def cpu_seconds(pid) -> float:
+    """User plus system CPU time of a process (0 if it is gone)."""
+    try:
+        fields = _stat_fields(pid)
+        return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def rss_bytes(pid="self") -> int:
+    """Resident set size of a process in bytes (0 if it is gone)."""
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
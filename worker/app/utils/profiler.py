@@ -0,0 +1,130 @@
+"""
+On-demand sampling profiler for a live worker.
+A background thread reads sys._current_frames() at a fixed interval for a
+bounded duration and aggregates the stacks into collapsed-stack lines
+("frame;frame;frame count"), which flamegraph.pl and speedscope read
+directly. Nothing is installed into the interpreter, so overhead is one
+stack walk per thread per interval and stops when the profile ends.
+
+Only threads of this process are sampled. Page counting and text
+extraction run in the ExtractionPool's spawned processes (with
+EXTRACTION_PROCESSES > 0) and do not show up; set EXTRACTION_PROCESSES=0
+to run them in threads here when they need profiling.
+"""
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List, Optional
+
+# Only one profile at a time; concurrent requests would skew each other
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusyError(Exception):
+    """Another profile is already running."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", code.co_filename)
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def _collapse(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    # Root first, as expected by flame graph tools
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(
+    duration: float,
+    interval: float = 0.01,
+    thread_prefix: Optional[str] = None
+) -> Counter:
+    """
+    Sample the stacks of the threads in this process.
+    Args:
+        duration: Seconds to sample for
+        interval: Seconds between samples
+        thread_prefix: Only sample threads whose name starts with this (None = all)
+    Returns:
+        Counter of collapsed stack -> sample count
+    """
+    stacks: Counter = Counter()
+    own_id = threading.get_ident()
+    deadline = time.monotonic() + duration
+
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            name = names.get(thread_id, f"thread-{thread_id}")
+            if thread_prefix and not name.startswith(thread_prefix):
+                continue
+            stacks[_collapse(frame, name.replace(";", "_"))] += 1
+        time.sleep(interval)
+
+    return stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """Render stacks in collapsed format, heaviest first."""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+def profile_cpu(duration: float, interval: float = 0.01, thread_prefix: Optional[str] = None) -> str:
+    """
+    Run one sampling profile and return collapsed-stack output.
+    Raises:
+        ProfilerBusyError: If a profile is already running
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+    try:
+        return format_collapsed(sample_stacks(duration, interval, thread_prefix))
+    finally:
+        _profile_lock.release()
+
+
+def profile_memory(duration: float, top: int = 25, frames: int = 5) -> List[dict]:
+    """
+    Diff two tracemalloc snapshots taken `duration` seconds apart.
+    tracemalloc is started for the window only (unless it was already on),
+    since tracing every allocation is too costly to leave enabled.
+    Returns:
+        Allocation sites with the largest growth, as dicts
+    Raises:
+        ProfilerBusyError: If a profile is already running
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+
+    started_here = not tracemalloc.is_tracing()
+    try:
+        if started_here:
+            tracemalloc.start(frames)
+        before = tracemalloc.take_snapshot()
+        time.sleep(duration)
+        after = tracemalloc.take_snapshot()
+
+        diff = after.compare_to(before, "traceback")
+        return [
+            {
+                "sizeDiffBytes": stat.size_diff,
+                "sizeBytes": stat.size,
+                "countDiff": stat.count_diff,
+                "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+            }
+            for stat in diff[:top]
+        ]
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _profile_lock.release()
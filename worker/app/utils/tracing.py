@@ -0,0 +1,101 @@
+"""
+Optional OpenTelemetry tracing for the worker pipeline.
+Each job becomes a trace with a child span per stage, and the W3C trace
+context is forwarded to the backend in callback headers. Tracing is off
+unless OTEL_ENABLED is set; when the OpenTelemetry SDK is not installed
+every helper here is a no-op.
+"""
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry import propagate
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:  # pragma: no cover - depends on the environment
+    otel_trace = None
+
+_tracer = None
+
+
+def init_tracing(config) -> bool:
+    """
+    Configure the global tracer provider from configuration.
+    Args:
+        config: Worker Config (otel_* settings)
+    Returns:
+        True if tracing was enabled
+    """
+    global _tracer
+
+    if not config.otel_enabled:
+        return False
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        logger.warning("OTEL_ENABLED is set but opentelemetry-sdk is not installed; tracing disabled")
+        return False
+
+    if config.otel_exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter(endpoint=config.otel_endpoint)
+    elif config.otel_exporter == "file":
+        spans_file = open(config.otel_file_path, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(
+            out=spans_file,
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    elif config.otel_exporter == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        raise ValueError(f"Unknown OTEL_EXPORTER '{config.otel_exporter}' (expected otlp, console or file)")
+
+    provider = TracerProvider(resource=Resource.create({
+        "service.name": config.otel_service_name,
+        "service.instance.id": config.worker_id
+    }))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    otel_trace.set_tracer_provider(provider)
+
+    _tracer = otel_trace.get_tracer("invoice-worker")
+    logger.info(f"OpenTelemetry tracing enabled ({config.otel_exporter} exporter)")
+    return True
+
+
+def shutdown_tracing():
+    """Flush pending spans."""
+    if _tracer is not None:
+        provider = otel_trace.get_tracer_provider()
+        if hasattr(provider, "shutdown"):
+            provider.shutdown()
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict] = None):
+    """Start a span as a child of the current one; yields None when tracing is off."""
+    if _tracer is None:
+        yield None
+        return
+
+    clean = {k: v for k, v in (attributes or {}).items() if v is not None}
+    with _tracer.start_as_current_span(name, attributes=clean) as current:
+        yield current
+
+
+def mark_span_error(current, message: str):
+    """Flag a span as failed without an exception (e.g. a FAILED job outcome)."""
+    if current is not None:
+        current.set_status(Status(StatusCode.ERROR, message))
+
+
+def inject_trace_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """Add traceparent/tracestate for the current span to outgoing HTTP headers."""
+    if _tracer is not None:
+        propagate.inject(headers)
+    return headers
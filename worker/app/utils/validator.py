@@ -1,12 +1,14 @@
 from typing import Tuple
 from app.models.invoice import InvoiceData
+from app.utils.consistency import score_invoice_consistency
 
 
 def validate_invoice_data(invoice: InvoiceData) -> Tuple[bool, str]:
     """
     Validate extracted invoice data for presence of primary/important fields.
     Only checks that required fields exist and have valid values.
-    Does NOT perform mathematical validation (amount calculations, subtotal checks, etc.).
+    Does NOT perform mathematical validation (amount calculations, subtotal checks, etc.);
+    see app.utils.consistency for the arithmetic cross-checks.
 
     Args:
         invoice: InvoiceData object to validate
@@ -54,3 +56,21 @@ def validate_invoice_data(invoice: InvoiceData) -> Tuple[bool, str]:
 
     # All field-presence validations passed
     return True, ""
+
+
+def score_invoice_extraction(invoice: InvoiceData) -> float:
+    """
+    Score how trustworthy an extraction looks, from 0.0 to 1.0.
+    A result that fails validate_invoice_data scores 0. Otherwise the score is
+    the arithmetic consistency score of the invoice.
+
+    Args:
+        invoice: InvoiceData object to score
+    Returns:
+        Confidence score between 0.0 and 1.0
+    """
+    is_valid, _ = validate_invoice_data(invoice)
+    if not is_valid:
+        return 0.0
+
+    return score_invoice_consistency(invoice).score
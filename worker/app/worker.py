@@ -1,34 +1,79 @@
 import asyncio
+import os
 import signal
 import logging
+import math
 import time
 from datetime import datetime, timezone, timedelta
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 from app.config import Config
 from app.database.job_claimer import JobClaimer
+from app.database.backlog_monitor import BacklogMonitor, ThroughputTracker
 from app.services.drive_service import DriveService
-from app.services.mime_detector import (
-    detect_mime_type,
-    validate_mime_type,
-    get_pipeline_for_mime,
-    ProcessingPipeline
-)
 from app.services.callback_service import CallbackService
-from app.extractors.image_extractor import extract_text_from_image
-from app.extractors.pdf_extractor import extract_text_from_pdf
-from app.extractors.llm_extractor import LLMExtractor
-from app.utils.text_cleaner import preprocess_ocr_text
+from app.pipeline import resolve_pipeline, sniff_document, extract_text, count_pages, InvalidDocumentError
+from app.services.mime_detector import ProcessingPipeline
 from app.utils.validator import validate_invoice_data
+from app.utils.consistency import score_invoice_consistency
+from app.utils.job_trace import JobTrace
+from app.utils.tracing import span, mark_span_error
+from app.utils.concurrency import AdaptiveConcurrency
+from app.utils.admission import MemoryAdmission
+from app.utils.lanes import LaneScheduler
+from app.utils.checkpoint import CheckpointJournal, STAGE_RESULT
+from app.utils.near_duplicate import NearDuplicateIndex, identifiers_match
+from app.utils.failures import CircuitBreaker, DEPENDENCIES, DRIVE, LLM, PERMANENT, TIMEOUT, classify_failure
+from app.utils.deadline import JobDeadline, StageTimeoutError, DOWNLOAD, EXTRACT, CALLBACK
+from app.utils.extraction_pool import ExtractionPool
+from app.utils.metrics import (
+    BYTES_DOWNLOADED,
+    EXTRACTED_CHARACTERS,
+    JOB_DURATION,
+    JOBS_FINISHED,
+    JOBS_IN_FLIGHT,
+    JOB_FAILURES,
+    NEAR_DUPLICATES,
+    OCR_CHARACTERS,
+    PDF_PAGES,
+    QUEUE_WAIT,
+    RESULT_REUSE,
+    STAGE_DURATION,
+    STARTUP_DURATION
+)
 from app.models.invoice import InvoiceData
 
 logger = logging.getLogger(__name__)
 
 
+def _seconds_since_process_start() -> float:
+    """Process age from /proc (Linux); falls back to time since this module was imported."""
+    try:
+        with open("/proc/self/stat") as stat, open("/proc/uptime") as uptime:
+            # Field 22 is the start time in clock ticks after boot; comm (field 2) may contain spaces
+            start_ticks = int(stat.read().rsplit(")", 1)[1].split()[19])
+            return float(uptime.read().split()[0]) - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - _MODULE_IMPORTED
+
+
+_MODULE_IMPORTED = time.monotonic()
+
+
 class InvoiceWorker:
     """Main worker that polls for jobs and processes invoices."""
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, job_claimer=None, drive_service=None, callback_service=None):
+        """
+        Cheap construction only: connections are made by initialize(), so the
+        API can answer liveness checks while services come up.
+        Args:
+            config: Worker configuration
+            job_claimer, drive_service, callback_service: Pre-built services
+                (benchmarks and load tests inject stand-ins); None builds and
+                connects the real ones from config
+        """
         self.config = config
 
         # Worker configuration
@@ -39,26 +84,61 @@ class InvoiceWorker:
         self.start_time = None
         self.logger = logger
 
-        # Initialize and connect services
-        self.logger.info("Initializing worker services...")
-
-        # Database connection
-        self.job_claimer = JobClaimer(config.db_connection_string)
-        self.job_claimer.connect()
-        self.logger.info("✓ Database connected")
-
-        # Google Drive connection
-        self.drive_service = DriveService(config.google_service_account_key)
-        self.drive_service.connect()
-        self.logger.info("✓ Google Drive connected")
+        # Services (connected in initialize)
+        self.job_claimer = job_claimer
+        self.drive_service = drive_service
+        self.llm_extractor = None
+        self.callback_service = callback_service or CallbackService(config.backend_url, config.callback_secret)
+        # Prior results by Drive md5Checksum (opened in initialize)
+        self.result_index = None
+        # MinHash signatures of extracted texts (opened in initialize)
+        self.near_duplicates = None
+
+        # Backlog reporting (own DB connection, opened on first request)
+        self.throughput = ThroughputTracker(config.backlog_throughput_window_seconds)
+        self.backlog_monitor = BacklogMonitor(
+            config.db_connection_string,
+            self.throughput,
+            ttl_seconds=config.backlog_cache_ttl_seconds,
+            drain_target_seconds=config.backlog_drain_target_seconds
+        )
 
-        # LLM extractor
-        self.llm_extractor = LLMExtractor(config.groq_api_key, config.groq_model)
-        self.logger.info("✓ LLM extractor initialized")
+        # In-flight jobs, bounded by the (adaptive) concurrency limit
+        self.concurrency = AdaptiveConcurrency(
+            min_limit=config.concurrency_min,
+            max_limit=config.concurrency_max if config.concurrency_adaptive else config.concurrency_initial,
+            initial_limit=config.concurrency_initial,
+            decrease_factor=config.concurrency_decrease_factor,
+            latency_tolerance=config.concurrency_latency_tolerance,
+            max_rate_limited_ratio=config.concurrency_max_rate_limited,
+            cpu_target=config.concurrency_cpu_target,
+            max_loop_lag=config.concurrency_max_loop_lag
+        )
+        self._tasks: set = set()
+        # Memory-budget admission (which lanes/file sizes may be claimed now)
+        self.admission = MemoryAdmission.from_config(config)
+        # Size/MIME scheduling lanes with their own slots
+        self.lanes = LaneScheduler(config.lanes)
+        # Upstream circuit breakers (claiming pauses while one is open)
+        self.breakers = {
+            name: CircuitBreaker(
+                name,
+                failure_threshold=config.circuit_failure_threshold,
+                open_seconds=config.circuit_open_seconds,
+                max_open_seconds=config.circuit_max_open_seconds
+            )
+            for name in DEPENDENCIES
+        }
+        self._probes: dict = {}
+        # Page counting and text extraction, in processes that can be killed on timeout
+        self.extraction_pool = ExtractionPool(config.extraction_pool_size)
+        # Queue updates share one psycopg2 connection: one at a time, off the event loop
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="invoice-worker-db")
 
-        # Callback service
-        self.callback_service = CallbackService(config.backend_url, config.callback_secret)
-        self.logger.info("✓ Callback service initialized")
+        # Readiness
+        self.ready = False
+        self.startup: dict = {}
+        self.startup_error = None
 
         # Statistics
         self.stats = {
@@ -66,15 +146,91 @@ class InvoiceWorker:
             "jobs_failed": 0,
             "jobs_invalid": 0,
             "jobs_retried": 0,  #  ADDED
+            "jobs_requeued": 0,
+            "jobs_quarantined": 0,
+            "jobs_timed_out": 0,
             "start_time": datetime.now(timezone.utc)
         }
 
-        self.logger.info("Worker initialization complete")
+    async def initialize(self):
+        """
+        Connect the database, Google Drive and the LLM clients concurrently.
+        Records per-service and process-to-ready durations in self.startup and
+        warns when startup exceeds config.startup_budget_seconds.
+        """
+        if self.ready:
+            return
+
+        self.logger.info("Initializing worker services...")
+        started = time.perf_counter()
+
+        async def timed(name: str, connect):
+            phase_started = time.perf_counter()
+            await asyncio.to_thread(connect)
+            self.startup[name] = round(time.perf_counter() - phase_started, 3)
+            STARTUP_DURATION.labels(name).set(self.startup[name])
+            self.logger.info(f"✓ {name} ready in {self.startup[name]:.2f}s")
+
+        phases = [timed("llm", self._build_llm_extractor)]
+        if self.job_claimer is None:
+            self.job_claimer = JobClaimer(
+                self.config.db_connection_string,
+                fair_share=self.config.claim_fair_share,
+                uploader_weights=self.config.claim_uploader_weights,
+                max_uploaders=self.config.claim_max_uploaders,
+                sjf_bytes_per_second=self.config.lane_sjf_bytes_per_second,
+                create_uploader_index=self.config.claim_create_uploader_index
+            )
+            phases.append(timed("database", self.job_claimer.connect))
+        if self.drive_service is None:
+            self.drive_service = DriveService(self.config.google_service_account_key)
+            phases.append(timed("drive", self.drive_service.connect))
+
+        await asyncio.gather(*phases)
+        if self.config.result_index_enabled and self.result_index is None:
+            self.result_index = CheckpointJournal(self.config.result_index_path)
+        if self.config.near_duplicate_enabled and self.near_duplicates is None:
+            self.near_duplicates = NearDuplicateIndex(
+                self.config.near_duplicate_path,
+                threshold=self.config.near_duplicate_threshold,
+                number_threshold=self.config.near_duplicate_number_threshold,
+                max_entries=self.config.near_duplicate_max_entries,
+                store_payloads=self.config.near_duplicate_action == "reuse"
+            )
+        self.llm_extractor.add_observer(self.concurrency.observe_llm)
+
+        self.startup["services"] = round(time.perf_counter() - started, 3)
+        self.startup["processToReady"] = round(_seconds_since_process_start(), 3)
+        for phase in ("services", "processToReady"):
+            STARTUP_DURATION.labels(phase).set(self.startup[phase])
+        self.ready = True
+
+        budget = self.config.startup_budget_seconds
+        if self.startup["processToReady"] > budget:
+            self.logger.warning(
+                f"Startup took {self.startup['processToReady']:.2f}s, over the {budget:.1f}s budget "
+                f"(services: {self.startup})"
+            )
+        else:
+            self.logger.info(f"Worker initialization complete in {self.startup['processToReady']:.2f}s")
+
+    def _build_llm_extractor(self):
+        # Imported here so the Groq/HTTP client stack loads alongside the other connections
+        from app.extractors.llm_extractor import LLMExtractor
+
+        self.llm_extractor = LLMExtractor.from_config(self.config)
 
     async def start(self):
-        """Start the worker polling loop."""
+        """Initialize services, then run the polling loop."""
         self.logger.info(f"Worker {self.worker_id} starting...")
 
+        try:
+            await self.initialize()
+        except Exception as e:
+            self.startup_error = str(e)
+            self.logger.error(f"Worker startup failed: {e}", exc_info=True)
+            return
+
         try:
             signal.signal(signal.SIGINT, self._signal_handler)
             signal.signal(signal.SIGTERM, self._signal_handler)
@@ -87,13 +243,24 @@ class InvoiceWorker:
 
         self.logger.info(
             f"Worker {self.worker_id} polling every {self.poll_interval} seconds "
-            f"(max retries: {self.max_retries})"
+            f"(max retries: {self.max_retries}, concurrency {self.concurrency.limit}"
+            f"-{self.concurrency.max_limit})"
         )
 
+        monitors = []
+        if self.config.concurrency_adaptive:
+            monitors = [
+                asyncio.create_task(self.concurrency.monitor_loop_lag()),
+                asyncio.create_task(self._adjust_concurrency())
+            ]
+
         while self.is_running:
             try:
-                await self._poll_and_process()
-                await asyncio.sleep(self.poll_interval)
+                # Claim until every slot is busy or the queue is empty, then wait
+                # for a slot to free up (or the poll interval, when idle)
+                claimed = await self._fill_slots()
+                if claimed is None or len(self._tasks) >= self.concurrency.limit:
+                    await self._wait_for_slot(self.poll_interval)
             except asyncio.CancelledError:
                 self.logger.info("Worker task cancelled")
                 break
@@ -101,26 +268,186 @@ class InvoiceWorker:
                 self.logger.error(f"Unexpected error in worker loop: {e}", exc_info=True)
                 await asyncio.sleep(self.poll_interval)
 
+        if self._tasks:
+            self.logger.info(f"Waiting for {len(self._tasks)} in-flight jobs to finish...")
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        for monitor in monitors:
+            monitor.cancel()
+
         await self._shutdown_cleanup()
         self.logger.info(f"Worker {self.worker_id} stopped")
 
-    async def _poll_and_process(self):
-        """Poll for a job and process it with retry logic."""
-        job = self.job_claimer.claim_job(self.worker_id)
+    async def _fill_slots(self):
+        """
+        Claim jobs into free slots, each processed in its own task.
+        Returns the number claimed, or None when the queue had nothing ready.
+        """
+        claimed = 0
+        while self.is_running and len(self._tasks) < self.concurrency.limit:
+            probes = self._admit_claim()
+            if probes is None:
+                return claimed or None
+
+            job = None
+            for plan in self.lanes.plans(self.admission.claim_lanes()):
+                job, claim_seconds = await self._claim(plan)
+                if job is not None:
+                    break
+            if job is None:
+                self._release_probes(probes)
+                return claimed or None
+            if probes:
+                self.logger.info(f"[{job.id}] Probing {', '.join(b.name for b in probes)} after an outage")
+                self._probes[job.id] = probes
+
+            self.admission.reserve(job.id, job.payload.fileSize, job.payload.mimeType, plan.memory_lane)
+            self.lanes.start(job.id, plan.lane.name)
+            self.logger.debug(f"[{job.id}] Admitted to {plan.lane.name} lane ({plan.memory_lane} memory)")
+
+            task = asyncio.create_task(self._run_job(job, claim_seconds, plan.lane))
+            self._tasks.add(task)
+            task.add_done_callback(self._job_done)
+            self.concurrency.observe_in_flight(len(self._tasks))
+            claimed += 1
+        return claimed
+
+    def _admit_claim(self):
+        """None while an open circuit blocks claiming, else the breakers the next job probes."""
+        probes = []
+        for breaker in self.breakers.values():
+            decision = breaker.allow()
+            if decision is None:
+                self._release_probes(probes)
+                return None
+            if decision == "probe":
+                probes.append(breaker)
+        return probes
+
+    def _release_probes(self, probes):
+        for breaker in probes:
+            breaker.probe_done()
+
+    def _job_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error(f"Unexpected error processing job: {task.exception()}", exc_info=task.exception())
+
+    async def _wait_for_slot(self, timeout: float):
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        else:
+            await asyncio.sleep(timeout)
+
+    async def _adjust_concurrency(self):
+        """Run one controller step per adjustment interval, until cancelled."""
+        while True:
+            await asyncio.sleep(self.config.concurrency_adjust_interval)
+            self.concurrency.observe_in_flight(len(self._tasks))
+            self.concurrency.adjust()
+
+    async def _db(self, fn, *args):
+        """Run a blocking job_claimer call on the database thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, fn, *args)
+
+    async def _claim(self, plan):
+        """Claim one job for a lane plan; returns (job or None, claim seconds)."""
+        claim_started = time.perf_counter()
+        job = await self._db(
+            self.job_claimer.claim_job,
+            self.worker_id,
+            plan.min_file_size,
+            plan.max_file_size,
+            plan.mime_patterns,
+            plan.lane.shortest_first
+        )
+        claim_seconds = time.perf_counter() - claim_started
+        STAGE_DURATION.labels("claim").observe(claim_seconds)
 
         if job is None:
             self.logger.debug("No pending jobs available")
-            return
+        return job, claim_seconds
 
+    async def _run_job(self, job, claim_seconds: float, lane=None):
+        """Process a claimed job with retry logic, recording claim wait and outcome."""
         job_id = job.id
         retry_count = job.retryCount
+        # The deadline runs from the claim; the lane may set its own budgets
+        deadline = JobDeadline.from_config(self.config, lane)
 
         self.logger.info(
             f"[{job_id}] Claimed job (attempt {retry_count + 1}/{self.max_retries + 1})"
         )
 
+        trace = JobTrace(job_id)
+        queue_wait = self._queue_wait_seconds(job)
+        QUEUE_WAIT.observe(queue_wait)
+        trace.record("claim_wait", queue_wait)
+        trace.record("claim", claim_seconds)
+
+        JOBS_IN_FLIGHT.inc()
+        try:
+            with span("invoice.job", {
+                "job.id": job_id,
+                "job.attempt": retry_count + 1,
+                "file.id": job.payload.fileId,
+                "file.mime_type": job.payload.mimeType,
+                "file.size": job.payload.fileSize,
+                "worker.id": self.worker_id
+            }) as job_span:
+                status = await self._handle_job(job, trace, deadline)
+                self.throughput.record()
+                if job_span is not None:
+                    job_span.set_attribute("job.status", status)
+                    if status == "FAILED":
+                        mark_span_error(job_span, "Job failed")
+        finally:
+            JOBS_IN_FLIGHT.dec()
+            self.admission.release(job_id)
+            self.lanes.finish(job_id)
+            self._release_probes(self._probes.pop(job_id, []))
+
+    async def _handle_job(self, job, trace: JobTrace, deadline: JobDeadline = None) -> str:
+        """
+        Process a claimed job, then schedule a retry or send the final callback.
+        Returns the job outcome (COMPLETED, INVALID, FAILED, RETRY_SCHEDULED or REQUEUED).
+        """
+        job_id = job.id
+        retry_count = job.retryCount
+        if deadline is None:
+            deadline = JobDeadline.from_config(self.config)
+
         # Process the job
-        callback_data = await self._process_job(job)
+        started = time.perf_counter()
+        callback_data = await self._process_job(job, trace, deadline)
+        JOB_DURATION.observe(time.perf_counter() - started)
+
+        # The callback carries every stage up to its own
+        callback_data["trace"] = trace.to_dict()
+        trace_fields = {
+            "attempt": retry_count + 1,
+            "fileName": job.payload.originalName,
+            "mimeType": job.payload.mimeType,
+            "uploader": job.payload.uploader,
+            "vendor": (callback_data.get("result") or {}).get("VendorName")
+        }
+
+        failure = callback_data.get("failure")
+        if failure and failure["kind"] == TIMEOUT:
+            self.stats["jobs_timed_out"] += 1
+        if failure and (failure["kind"] == PERMANENT or (failure["kind"] == TIMEOUT and not failure["dependency"])):
+            # Poison job: fail it now instead of repeating download, OCR and LLM
+            failure["quarantined"] = True
+            self.stats["jobs_quarantined"] += 1
+            self.logger.warning(f"[{job_id}] Quarantined after a {failure['kind']} failure, not retrying")
+
+        if failure and failure["dependency"] and self.breakers[failure["dependency"]].is_open:
+            # Upstream outage: back to the queue in its place, without spending a retry
+            await self._db(self.job_claimer.requeue_job, job_id)
+            self.stats["jobs_requeued"] += 1
+            JOBS_FINISHED.labels("REQUEUED").inc()
+            self.logger.warning(f"[{job_id}] Requeued while {failure['dependency']} is unavailable")
+            trace.log("REQUEUED", **trace_fields)
+            return "REQUEUED"
 
         #  DETERMINE IF WE SHOULD RETRY
         should_retry = self._should_retry_job(callback_data, retry_count)
@@ -129,16 +456,24 @@ class InvoiceWorker:
             #  SCHEDULE RETRY
             await self._schedule_retry(job_id, retry_count, callback_data.get("reason", "Unknown error"))
             self.stats["jobs_retried"] += 1
+            JOBS_FINISHED.labels("RETRIED").inc()
+            trace.log("RETRY_SCHEDULED", **trace_fields)
+            return "RETRY_SCHEDULED"
         else:
             #  SEND FINAL CALLBACK
             try:
                 # Release lock BEFORE callback
-                self.job_claimer.release_job_lock(job_id)
+                await self._db(self.job_claimer.release_job_lock, job_id)
                 self.logger.debug(f"[{job_id}] Released job lock before callback")
 
-                success = await self.callback_service.send_callback(callback_data)
+                with trace.stage("callback", "CallbackService.send_callback"):
+                    # Bounded by its own budget only, so a job that ran out of time can still report it
+                    success = await deadline.run(
+                        CALLBACK, self.callback_service.send_callback(callback_data), within_deadline=False
+                    )
 
                 if success:
+                    JOBS_FINISHED.labels(callback_data["status"]).inc()
                     if callback_data["status"] == "COMPLETED":
                         self.stats["jobs_processed"] += 1
                         self.logger.info(f"[{job_id}]  Job completed successfully")
@@ -154,6 +489,17 @@ class InvoiceWorker:
             except Exception as e:
                 self.logger.error(f"[{job_id}] Error sending callback: {e}", exc_info=True)
 
+            trace.log(callback_data["status"], **trace_fields)
+            return callback_data["status"]
+
+    def _queue_wait_seconds(self, job) -> float:
+        """Seconds between the job becoming claimable (created or retry due) and now."""
+        ready_times = [
+            t if t.tzinfo else t.replace(tzinfo=timezone.utc)
+            for t in (job.createdAt, job.nextRetryAt) if t is not None
+        ]
+        return max(0.0, (datetime.now(timezone.utc) - max(ready_times)).total_seconds())
+
     def _should_retry_job(self, callback_data: dict, current_retry_count: int) -> bool:
         """Determine if a job should be retried."""
         status = callback_data.get("status")
@@ -162,6 +508,10 @@ class InvoiceWorker:
         if status in ["COMPLETED", "INVALID"]:
             return False
 
+        #  NEVER RETRY: quarantined (permanent) failures
+        if (callback_data.get("failure") or {}).get("quarantined"):
+            return False
+
         #  RETRY: FAILED jobs that haven't exceeded max retries
         if status == "FAILED" and current_retry_count < self.max_retries:
             return True
@@ -178,7 +528,10 @@ class InvoiceWorker:
             f"[{job_id}] 🔄 Scheduling retry {next_retry_count}/{self.max_retries} "
             f"in {delay_minutes} minutes (at {next_retry_at.strftime('%H:%M:%S')} UTC)"
         )
+        await self._db(self._write_retry, job_id, next_retry_count, next_retry_at, error_message)
 
+    def _write_retry(self, job_id: str, next_retry_count: int, next_retry_at: datetime, error_message: str):
+        """Return a job to PENDING with its new retry count and NextRetryAt."""
         cursor = self.job_claimer.connection.cursor()
         try:
             cursor.execute("""
@@ -223,86 +576,268 @@ class InvoiceWorker:
         self.logger.debug(f"Calculated backoff for retry {retry_count}: {delay} minutes")
         return delay
 
-    async def _process_job(self, job) -> dict:
-        """Complete job processing pipeline."""
+    async def _process_job(self, job, trace: JobTrace, deadline: JobDeadline = None) -> dict:
+        """
+        Complete job processing pipeline, recording stage timings and sizes in trace.
+        Download, extraction and LLM steps each run within their stage budget of the deadline.
+        """
+        if deadline is None:
+            deadline = JobDeadline.from_config(self.config)
         job_id = job.id
         payload = job.payload
         file_id = payload.fileId
         expected_mime = payload.mimeType
+        md5 = None
+        # Which dependency a failure belongs to (see classify_failure)
+        stage = None
 
         try:
-            # Step 1: Download file from Google Drive
+            # Step 0: Unchanged content (renames, permission edits) reuses the prior result
+            if self.result_index is not None:
+                stage = DRIVE
+                with trace.stage("metadata", "DriveService.get_metadata"):
+                    metadata = await deadline.run(
+                        DOWNLOAD, asyncio.to_thread(self.drive_service.get_metadata, file_id)
+                    )
+                self.breakers[DRIVE].record_success()
+                stage = None
+                md5 = metadata.get("md5Checksum")
+                reused = self._reuse_result(job_id, md5, expected_mime)
+                if reused is not None:
+                    return reused
+
+            # Step 1: Fetch the start of the file and reject junk before the full download
+            prefix, total_size = b"", None
+            if self.config.drive_sniff_bytes > 0:
+                stage = DRIVE
+                with trace.stage("download_prefix", "DriveService.download_prefix"):
+                    prefix, total_size = await deadline.run(DOWNLOAD, asyncio.to_thread(
+                        self.drive_service.download_prefix, file_id, self.config.drive_sniff_bytes
+                    ))
+                self.breakers[DRIVE].record_success()
+                stage = None
+                BYTES_DOWNLOADED.inc(len(prefix))
+                trace.add_size("sniffedBytes", len(prefix))
+
+                with trace.stage("mime_detection", "detect_mime_type"):
+                    detected_mime, pipeline = sniff_document(prefix, expected_mime, self.config.max_image_pixels)
+
+            # Step 2: Download the rest of the file from Google Drive
             logger.info(f"[{job_id}] Downloading file {file_id}")
-            file_data = self.drive_service.download_file(file_id)
-
-            # Step 2: Detect MIME type
-            detected_mime = detect_mime_type(file_data)
+            stage = DRIVE
+            with trace.stage("download", "DriveService.download_file"):
+                file_data = await deadline.run(DOWNLOAD, asyncio.to_thread(
+                    self.drive_service.download_file, file_id, prefix, total_size
+                ))
+            self.breakers[DRIVE].record_success()
+            stage = "extract"
+            BYTES_DOWNLOADED.inc(len(file_data) - len(prefix))
+            trace.add_size("bytes", len(file_data))
+
+            # Steps 3-4: Detect, validate and route by MIME type (unless sniffed), count pages
+            with trace.stage("mime_detection", "detect_mime_type"):
+                if not prefix:
+                    detected_mime, pipeline = resolve_pipeline(file_data, expected_mime)
+                pages = await self._extract(deadline, count_pages, file_data, pipeline)
+                trace.add_size("pages", pages)
+            if pipeline == ProcessingPipeline.PDF and pages == 0:
+                raise InvalidDocumentError("PDF has no pages")
+            self.admission.update(job_id, payload.fileSize, expected_mime, pages)
             logger.info(f"[{job_id}] MIME: detected={detected_mime}, expected={expected_mime}")
 
-            # Step 3: Validate MIME type
-            if not validate_mime_type(detected_mime, expected_mime):
-                return self._create_invalid_callback(
-                    job_id,
-                    f"MIME type mismatch: expected {expected_mime}, got {detected_mime}"
-                )
-
-            # Step 4: Route to appropriate pipeline
-            pipeline = get_pipeline_for_mime(detected_mime)
-
-            if pipeline == ProcessingPipeline.UNSUPPORTED:
-                return self._create_invalid_callback(
-                    job_id,
-                    f"Unsupported MIME type: {detected_mime}"
-                )
-
-            # Step 5: Extract text
+            # Steps 5-6: Extract and validate text
             logger.info(f"[{job_id}] Extracting text using {pipeline.value} pipeline")
-
-            if pipeline == ProcessingPipeline.IMAGE:
-                raw_text = extract_text_from_image(file_data)
-                raw_text = preprocess_ocr_text(raw_text)
-            elif pipeline == ProcessingPipeline.PDF:
-                raw_text = extract_text_from_pdf(file_data)
-
-            # Step 6: Validate extracted text
-            if not raw_text or len(raw_text) < 18:
-                return self._create_invalid_callback(
-                    job_id,
-                    f"Insufficient text extracted ({len(raw_text) if raw_text else 0} chars, minimum 18 required)"
+            with trace.stage(f"extract_{pipeline.value}", f"extract_text_from_{pipeline.value}"):
+                raw_text = await self._extract(
+                    deadline, extract_text, file_data, pipeline, self.config.pdf_table_format or None
                 )
+            if self.extraction_pool.out_of_process:
+                # Metrics incremented inside pool processes are not exported
+                if pipeline == ProcessingPipeline.PDF:
+                    PDF_PAGES.inc(pages or 0)
+                else:
+                    OCR_CHARACTERS.inc(len(raw_text))
+            EXTRACTED_CHARACTERS.inc(len(raw_text))
+            trace.add_size("chars", len(raw_text))
 
+            stage = None
             logger.info(f"[{job_id}] Extracted {len(raw_text)} characters")
 
-            # Step 7: Extract invoice data using LLM
-            logger.info(f"[{job_id}] Sending to Groq LLM")
-            invoice_data = self.llm_extractor.extract_invoice(raw_text)
+            # Step 6b: A re-scan or re-photo of an invoice seen before reuses (or flags) its extraction
+            signature, near_duplicate = None, None
+            if self.near_duplicates is not None:
+                with trace.stage("near_duplicate", "NearDuplicateIndex.query"):
+                    signature = await asyncio.to_thread(self.near_duplicates.signature, raw_text)
+                    if signature is not None:
+                        near_duplicate = self.near_duplicates.query(signature, payload.uploader)
+                if near_duplicate is not None and self._reusable(near_duplicate, signature):
+                    NEAR_DUPLICATES.labels("reused").inc()
+                    return self._remember_result(
+                        md5, expected_mime, self._near_duplicate_callback(job_id, near_duplicate)
+                    )
+                NEAR_DUPLICATES.labels(
+                    "too_short" if signature is None else "flagged" if near_duplicate else "unique"
+                ).inc()
 
-            logger.info(f"[{job_id}] Successfully extracted invoice {invoice_data.InvoiceNumber}")
+            # Step 7: Extract invoice data using LLM
+            logger.info(f"[{job_id}] Sending to LLM router")
+            stage = LLM
+            with trace.stage("llm", "LLMExtractor.extract_invoice"):
+                extraction = await deadline.run(
+                    LLM, asyncio.to_thread(self.llm_extractor.extract_invoice_with_metadata, raw_text)
+                )
+            self.breakers[LLM].record_success()
+            stage = None
+            trace.add_size("promptTokens", extraction.prompt_tokens)
+            trace.add_size("completionTokens", extraction.completion_tokens)
+            invoice_data = extraction.invoice
+
+            logger.info(
+                f"[{job_id}] Successfully extracted invoice {invoice_data.InvoiceNumber} "
+                f"({extraction.tier} tier, {extraction.model})"
+            )
 
             # Step 8: Validate invoice data
-            is_valid, error_msg = validate_invoice_data(invoice_data)
+            with trace.stage("validation", "validate_invoice_data"):
+                is_valid, error_msg = validate_invoice_data(invoice_data)
+                consistency = score_invoice_consistency(invoice_data)
             if not is_valid:
                 logger.error(f"[{job_id}] Validation failed: {error_msg}")
                 return self._create_failed_callback(job_id, f"Validation failed: {error_msg}")
 
             logger.info(f"[{job_id}] All validations passed")
 
-            # Step 9: Create success callback
-            return self._create_completed_callback(job_id, invoice_data)
+            # Step 9: Arithmetic cross-checks (confidence signal, never fails the job)
+            if consistency.flags:
+                logger.warning(
+                    f"[{job_id}] Consistency score {consistency.score:.2f}, "
+                    f"flagged: {', '.join(consistency.flags)}"
+                )
 
+            # Step 10: Create success callback
+            callback = self._create_completed_callback(
+                job_id, invoice_data, extraction.metadata(), consistency.to_dict()
+            )
+            if near_duplicate is not None:
+                logger.warning(f"[{job_id}] Probable duplicate of job {near_duplicate.key}")
+                callback["nearDuplicate"] = self._near_duplicate_flag(near_duplicate, reused=False)
+            elif signature is not None:
+                self.near_duplicates.add(job_id, signature, dict(callback), scope=payload.uploader)
+            return self._remember_result(md5, expected_mime, callback)
+
+        except InvalidDocumentError as e:
+            logger.warning(f"[{job_id}] Invalid document: {e}")
+            return self._remember_result(md5, expected_mime, self._create_invalid_callback(job_id, str(e)))
         except Exception as e:
-            logger.error(f"[{job_id}] Processing failed: {e}", exc_info=True)
-            return self._create_failed_callback(job_id, str(e))
+            failure = classify_failure(e, stage)
+            JOB_FAILURES.labels(failure.kind, failure.dependency or "none").inc()
+            if failure.dependency:
+                self.breakers[failure.dependency].record_failure()
+            if isinstance(e, StageTimeoutError):
+                # Expected outcome for slow stages and pathological files, no traceback
+                logger.error(f"[{job_id}] Processing timed out: {e} ({deadline.snapshot()})")
+            else:
+                logger.error(f"[{job_id}] Processing failed ({failure.kind}): {e}", exc_info=True)
+            callback = self._create_failed_callback(job_id, str(e), failure.to_dict())
+            if isinstance(e, StageTimeoutError):
+                callback["timeout"] = {"stage": e.stage, "budgetSeconds": round(e.budget_seconds, 3)}
+            return callback
 
-    def _create_completed_callback(self, job_id: str, result: InvoiceData) -> dict:
-        """Create COMPLETED status callback."""
+    async def _extract(self, deadline: JobDeadline, fn, *args):
+        """
+        Run an extraction step in the pool. Waiting for a free process is bounded
+        by the job's deadline only; the extract budget starts once the call runs.
+        """
+        remaining = deadline.remaining()
+        async with self.extraction_pool.slot(None if math.isinf(remaining) else max(remaining, 0)):
+            return await deadline.run(EXTRACT, self.extraction_pool.run(fn, *args))
+
+    def _reuse_result(self, job_id: str, md5: str, expected_mime: str):
+        """
+        The stored final callback for this content, re-addressed to job_id, or
+        None. INVALID outcomes can depend on the expected MIME type, so a
+        result is only reused for the same one.
+        """
+        if not md5:
+            RESULT_REUSE.labels("no_checksum").inc()
+            return None
+
+        prior = self.result_index.get(f"md5:{md5}", STAGE_RESULT)
+        if prior is None or prior["mimeType"] != expected_mime:
+            RESULT_REUSE.labels("miss").inc()
+            return None
+
+        RESULT_REUSE.labels("hit").inc()
+        callback = dict(prior["callback"])
+        logger.info(f"[{job_id}] Content unchanged (md5 {md5}), reusing result of job {callback['jobId']}")
+        callback["reused"] = {"md5Checksum": md5, "fromJobId": callback["jobId"]}
+        callback.update(
+            jobId=job_id,
+            workerId=self.config.worker_id,
+            processedAt=datetime.now(timezone.utc).isoformat()
+        )
+        return callback
+
+    def _remember_result(self, md5: str, expected_mime: str, callback: dict) -> dict:
+        """Store a final (COMPLETED or INVALID) callback under the content checksum; returns it."""
+        if md5 and self.result_index is not None:
+            try:
+                self.result_index.put(f"md5:{md5}", STAGE_RESULT, {"mimeType": expected_mime, "callback": callback})
+            except Exception as e:
+                logger.warning(f"[{callback['jobId']}] Could not store result for md5 {md5}: {e}")
+        return callback
+
+    def _near_duplicate_flag(self, near_duplicate, reused: bool) -> dict:
         return {
+            "ofJobId": near_duplicate.key,
+            "similarity": near_duplicate.similarity,
+            "numberSimilarity": near_duplicate.number_similarity,
+            "reused": reused
+        }
+
+    def _reusable(self, near_duplicate, signature) -> bool:
+        """Reuse only when configured to and the earlier invoice number and date recur exactly."""
+        if self.config.near_duplicate_action != "reuse" or near_duplicate.payload is None:
+            return False
+        result = near_duplicate.payload.get("result") or {}
+        return identifiers_match(signature[1], result.get("InvoiceNumber"), result.get("InvoiceDate"))
+
+    def _near_duplicate_callback(self, job_id: str, near_duplicate) -> dict:
+        """The earlier job's COMPLETED callback, re-addressed to job_id and flagged as a duplicate."""
+        logger.info(
+            f"[{job_id}] Near duplicate of job {near_duplicate.key} "
+            f"(similarity {near_duplicate.similarity:.2f}), reusing its extraction"
+        )
+        callback = dict(near_duplicate.payload)
+        callback.pop("reused", None)
+        callback.update(
+            jobId=job_id,
+            workerId=self.config.worker_id,
+            processedAt=datetime.now(timezone.utc).isoformat(),
+            nearDuplicate=self._near_duplicate_flag(near_duplicate, reused=True)
+        )
+        return callback
+
+    def _create_completed_callback(
+        self,
+        job_id: str,
+        result: InvoiceData,
+        extraction: dict = None,
+        confidence: dict = None
+    ) -> dict:
+        """Create COMPLETED status callback."""
+        callback = {
             "jobId": job_id,
             "status": "COMPLETED",
             "result": result.model_dump(),
             "workerId": self.config.worker_id,
             "processedAt": datetime.now(timezone.utc).isoformat()
         }
+        if extraction:
+            callback["extraction"] = extraction
+        if confidence:
+            callback["confidence"] = confidence
+        return callback
 
     def _create_invalid_callback(self, job_id: str, reason: str) -> dict:
         """Create INVALID status callback."""
@@ -314,15 +849,18 @@ class InvoiceWorker:
             "processedAt": datetime.now(timezone.utc).isoformat()
         }
 
-    def _create_failed_callback(self, job_id: str, reason: str) -> dict:
+    def _create_failed_callback(self, job_id: str, reason: str, failure: dict = None) -> dict:
         """Create FAILED status callback."""
-        return {
+        callback = {
             "jobId": job_id,
             "status": "FAILED",
             "reason": reason,
             "workerId": self.config.worker_id,
             "processedAt": datetime.now(timezone.utc).isoformat()
         }
+        if failure:
+            callback["failure"] = failure
+        return callback
 
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully."""
@@ -334,7 +872,7 @@ class InvoiceWorker:
         logger.info("Performing shutdown cleanup...")
 
         try:
-            released = self.job_claimer.release_all_locks(self.worker_id)
+            released = await self._db(self.job_claimer.release_all_locks, self.worker_id)
             if released > 0:
                 logger.info(f"Released {released} job locks held by worker {self.worker_id}")
             else:
@@ -344,6 +882,13 @@ class InvoiceWorker:
 
         try:
             self.job_claimer.disconnect()
+            self.backlog_monitor.close()
+            if self.result_index is not None:
+                self.result_index.close()
+            if self.near_duplicates is not None:
+                self.near_duplicates.close()
+            self.extraction_pool.shutdown()
+            self._db_executor.shutdown(wait=False)
             logger.info("Database connection closed")
         except Exception as e:
             logger.error(f"Error closing database connection: {e}")
@@ -365,6 +910,14 @@ class InvoiceWorker:
             "jobs_failed": self.stats["jobs_failed"],
             "jobs_invalid": self.stats["jobs_invalid"],
             "jobs_retried": self.stats["jobs_retried"],
+            "jobs_requeued": self.stats["jobs_requeued"],
+            "jobs_quarantined": self.stats["jobs_quarantined"],
+            "jobs_timed_out": self.stats["jobs_timed_out"],
+            "jobs_in_flight": len(self._tasks),
+            "concurrency": self.concurrency.snapshot(),
+            "memory": self.admission.snapshot(),
+            "lanes": self.lanes.snapshot(),
+            "circuits": {name: breaker.snapshot() for name, breaker in self.breakers.items()},
             "total_jobs": total_jobs,
             "success_rate": round(
                 self.stats["jobs_processed"] / total_jobs * 100, 2
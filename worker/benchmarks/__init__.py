@@ -0,0 +1,5 @@
+"""
+Performance tooling for the invoice worker: synthetic corpus, local stand-ins
+for Drive, the backend and the LLM API, and the benchmark runner.
+Run from the worker directory, e.g. `python -m benchmarks.run`.
+"""
@@ -0,0 +1,210 @@
+"""
+Synthetic invoice corpus for benchmarks.
+Generates text PDFs, scanned (image-only) PDFs and PNG/JPEG photos from
+seeded random invoices, so every run of a given seed produces the same
+files. A manifest.json describes each file with the fields of JobPayload.
+"""
+import io
+import json
+import random
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List
+
+import fitz
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+KINDS = ("text_pdf", "scanned_pdf", "png", "jpeg")
+
+MIME_TYPES = {
+    "text_pdf": "application/pdf",
+    "scanned_pdf": "application/pdf",
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+}
+
+EXTENSIONS = {"text_pdf": "pdf", "scanned_pdf": "pdf", "png": "png", "jpeg": "jpg"}
+
+VENDORS = ["SuperStore", "Office Depot", "Northwind Traders", "Contoso Supplies", "Acme Corp"]
+CUSTOMERS = ["Claire Gute", "Darrin Van Huff", "Sean O'Donnell", "Brosina Hoffman", "Andrew Allen"]
+CITIES = [("Henderson", "Kentucky"), ("Los Angeles", "California"), ("Fort Lauderdale", "Florida"),
+          ("Concord", "North Carolina"), ("Seattle", "Washington")]
+PRODUCTS = [("Bretford CR4500 Series Table", "Furniture"), ("Hon Deluxe Stacking Chairs", "Furniture"),
+            ("Self-Adhesive Address Labels", "Office Supplies"), ("Mitel 5320 IP Phone", "Technology"),
+            ("Eldon Fold 'N Roll Cart", "Office Supplies"), ("Logitech Wireless Mouse", "Technology")]
+SHIP_MODES = ["Standard Class", "Second Class", "First Class", "Same Day"]
+
+# Line items that fit on one rendered page
+ITEMS_PER_PAGE = 30
+
+
+@dataclass
+class CorpusFile:
+    """One generated document, described like a job payload."""
+    fileId: str
+    originalName: str
+    mimeType: str
+    fileSize: int
+    kind: str
+    pages: int
+    lineItems: int
+    path: str
+
+
+def invoice_lines(rng: random.Random, index: int, line_items: int) -> List[str]:
+    """Render a random invoice as text lines (the format the mock LLM parses back)."""
+    city, state = rng.choice(CITIES)
+    lines = [
+        rng.choice(VENDORS),
+        f"INVOICE # INV-{index:05d}",
+        f"Date: {rng.randint(2021, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        f"Order ID: CA-{rng.randint(2021, 2025)}-{rng.randint(100000, 999999)}",
+        f"Bill To: {rng.choice(CUSTOMERS)}",
+        f"Ship To: {city}, {state}, United States",
+        f"Ship Mode: {rng.choice(SHIP_MODES)}",
+        "",
+        "Item | SKU | Category | Qty | Rate | Amount",
+    ]
+
+    subtotal = 0.0
+    for item in range(line_items):
+        name, category = rng.choice(PRODUCTS)
+        quantity = rng.randint(1, 9)
+        rate = round(rng.uniform(2, 900), 2)
+        amount = round(quantity * rate, 2)
+        subtotal += amount
+        lines.append(f"{name} | SKU-{index:05d}-{item:03d} | {category} | {quantity} | ${rate:,.2f} | ${amount:,.2f}")
+
+    shipping = round(rng.uniform(0, 60), 2)
+    lines += [
+        "",
+        f"Subtotal: ${subtotal:,.2f}",
+        f"Shipping: ${shipping:,.2f}",
+        f"Total: ${subtotal + shipping:,.2f}",
+        f"Balance Due: ${subtotal + shipping:,.2f}",
+    ]
+    return lines
+
+
+def _paginate(lines: List[str]) -> List[List[str]]:
+    header, rest = lines[:9], lines[9:]
+    pages = [header]
+    for line in rest:
+        if len(pages[-1]) >= ITEMS_PER_PAGE + 9:
+            pages.append([])
+        pages[-1].append(line)
+    return pages
+
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow built without FreeType
+        return ImageFont.load_default()
+
+
+def render_page_image(lines: List[str], width: int, rng: random.Random, photo: bool = False) -> Image.Image:
+    """Draw text lines on a white page; photos get a slight tilt, blur and grey background."""
+    scale = width / 1240
+    font = _font(max(10, int(22 * scale)))
+    line_height = int(34 * scale)
+    height = max(int(width * 1.414), line_height * (len(lines) + 4))
+
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(lines):
+        draw.text((int(60 * scale), int(60 * scale) + row * line_height), line, fill=0, font=font)
+
+    if photo:
+        image = image.rotate(rng.uniform(-2.5, 2.5), expand=True, fillcolor=rng.randint(170, 220))
+        image = image.filter(ImageFilter.GaussianBlur(radius=rng.uniform(0.3, 0.9)))
+    return image
+
+
+def build_text_pdf(pages: List[List[str]]) -> bytes:
+    document = fitz.open()
+    for page_lines in pages:
+        page = document.new_page()
+        page.insert_text((50, 60), "\n".join(page_lines), fontsize=9)
+    return document.tobytes()
+
+
+def build_scanned_pdf(pages: List[List[str]], rng: random.Random, dpi: int) -> bytes:
+    document = fitz.open()
+    for page_lines in pages:
+        image = render_page_image(page_lines, int(8.27 * dpi), rng)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        page = document.new_page()
+        page.insert_image(page.rect, stream=buffer.getvalue())
+    return document.tobytes()
+
+
+def build_photo(lines: List[str], rng: random.Random, width: int, fmt: str) -> bytes:
+    image = render_page_image(lines, width, rng, photo=True).convert("RGB")
+    buffer = io.BytesIO()
+    if fmt == "jpeg":
+        image.save(buffer, format="JPEG", quality=rng.randint(70, 92))
+    else:
+        image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def generate_corpus(output_dir: Path, counts: Dict[str, int], seed: int = 42,
+                    max_line_items: int = 60) -> List[CorpusFile]:
+    """
+    Generate documents and write them plus manifest.json to output_dir.
+    Args:
+        output_dir: Destination directory (created if missing)
+        counts: Number of documents per kind (keys from KINDS)
+        seed: Random seed; the same seed always yields the same corpus
+        max_line_items: Upper bound on line items (multi-page documents above ITEMS_PER_PAGE)
+    Returns:
+        The manifest entries
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    files = []
+    index = 0
+
+    for kind in KINDS:
+        for _ in range(counts.get(kind, 0)):
+            index += 1
+            # Mostly short invoices with a long tail, as in production
+            line_items = min(max_line_items, max(1, int(rng.paretovariate(1.2) * 3)))
+            if kind in ("png", "jpeg"):
+                # Photos hold a single page
+                line_items = min(line_items, ITEMS_PER_PAGE)
+            lines = invoice_lines(rng, index, line_items)
+            pages = _paginate(lines) if kind.endswith("pdf") else [lines]
+
+            if kind == "text_pdf":
+                data = build_text_pdf(pages)
+            elif kind == "scanned_pdf":
+                data = build_scanned_pdf(pages, rng, dpi=rng.choice([100, 150, 200]))
+            else:
+                data = build_photo(lines, rng, rng.choice([800, 1240, 2000]), kind)
+
+            name = f"invoice_{index:05d}_{kind}.{EXTENSIONS[kind]}"
+            path = output_dir / name
+            path.write_bytes(data)
+            files.append(CorpusFile(
+                fileId=f"bench-{seed}-{index:05d}",
+                originalName=name,
+                mimeType=MIME_TYPES[kind],
+                fileSize=len(data),
+                kind=kind,
+                pages=len(pages),
+                lineItems=line_items,
+                path=name
+            ))
+
+    manifest = {"seed": seed, "counts": counts, "files": [asdict(f) for f in files]}
+    (output_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return files
+
+
+def load_corpus(corpus_dir: Path) -> List[CorpusFile]:
+    """Read the manifest written by generate_corpus."""
+    manifest = json.loads((corpus_dir / "manifest.json").read_text())
+    return [CorpusFile(**entry) for entry in manifest["files"]]
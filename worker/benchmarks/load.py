@@ -0,0 +1,425 @@
+"""
+End-to-end load generator for the job queue.
+
+Inserts job_queues rows (PayloadJson matching JobPayload) at a configurable
+arrival rate into a local PostgreSQL database, serves the referenced files
+from a fake Drive endpoint, answers LLM requests with the mock server and
+callbacks with a stub backend that updates job_queues like the real one,
+and runs N unmodified worker polling loops in separate processes.
+
+Reports queue depth over time, claim query latency, queue wait,
+end-to-end latency percentiles, throughput and lock contention (sessions
+waiting on locks, ungranted locks) as JSON.
+
+Use a scratch database: --create-schema creates job_queues (same columns
+and indexes as the backend's EF model) if it does not exist, and rows
+inserted by the run are deleted afterwards unless --keep-rows is given.
+
+Usage (from the worker directory):
+    python -m benchmarks.load --db-name invoice_load --create-schema \\
+        --rate 2 --duration 120 --workers 4 --llm-profile production -o load.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import psycopg2
+
+from app.database.job_claimer import JobClaimer
+from benchmarks.corpus import CorpusFile, generate_corpus, load_corpus
+from benchmarks.mock_llm import PROFILES, LatencyDistribution, MockLLMServer
+from benchmarks.run import DEFAULT_COUNTS, git_revision, parse_counts, summarize
+from benchmarks.stubs import FakeDriveServer, StubBackend
+
+logger = logging.getLogger("benchmarks.load")
+
+CALLBACK_SECRET = "load-test-secret"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS "job_queues" (
+    "Id" uuid PRIMARY KEY,
+    "JobType" varchar(50) NOT NULL,
+    "PayloadJson" jsonb NOT NULL,
+    "Status" varchar(20) NOT NULL,
+    "RetryCount" integer NOT NULL DEFAULT 0,
+    "LockedBy" varchar(200),
+    "LockedAt" timestamptz,
+    "NextRetryAt" timestamptz,
+    "ErrorMessage" jsonb,
+    "CreatedAt" timestamptz NOT NULL,
+    "UpdatedAt" timestamptz NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_job_queues_status_next_retry_at ON "job_queues" ("Status", "NextRetryAt");
+CREATE INDEX IF NOT EXISTS ix_job_queues_status_locked_at ON "job_queues" ("Status", "LockedAt");
+CREATE INDEX IF NOT EXISTS ix_job_queues_created_at ON "job_queues" ("CreatedAt");
+CREATE INDEX IF NOT EXISTS ix_job_queues_status ON "job_queues" ("Status");
+"""
+
+# The backend maps worker callback statuses onto job_queues like this
+FINAL_STATUS = {"COMPLETED": "COMPLETED", "INVALID": "INVALID", "FAILED": "INVALID"}
+
+
+def connection_string(args) -> str:
+    return (
+        f"host={args.db_host} port={args.db_port} dbname={args.db_name} "
+        f"user={args.db_user} password={args.db_password}"
+    )
+
+
+# ─── Worker processes ───
+
+def _worker_process(index: int, settings: dict, stop):
+    """Run one unmodified InvoiceWorker polling loop until `stop` is set."""
+    import asyncio
+
+    from app.config import Config
+    from app.worker import InvoiceWorker
+    from benchmarks.stubs import HttpDriveClient
+
+    logging.basicConfig(level=logging.WARNING, format=f"worker-{index} %(levelname)s %(name)s: %(message)s")
+
+    config_settings = {key: value for key, value in settings.items() if key != "drive_url"}
+    config = Config(**config_settings, worker_id=f"load-worker-{index}")
+    worker = InvoiceWorker(config, drive_service=HttpDriveClient(settings["drive_url"]))
+
+    async def run():
+        async def watch_stop():
+            while not stop.is_set():
+                await asyncio.sleep(0.2)
+            worker.is_running = False
+
+        watcher = asyncio.create_task(watch_stop())
+        await worker.start()
+        watcher.cancel()
+
+    asyncio.run(run())
+
+
+# ─── Load generation ───
+
+class LoadRun:
+    """State shared by the arrival loop, the samplers and the stub backend."""
+
+    def __init__(self, dsn: str, files: List[CorpusFile], uploaders: int, seed: int):
+        self.dsn = dsn
+        self.files = files
+        self.rng = random.Random(seed)
+        self.uploaders = [str(uuid.UUID(int=self.rng.getrandbits(128))) for _ in range(uploaders)]
+        self.lock = threading.Lock()
+        self.inserted: Dict[str, float] = {}
+        self.finished: Dict[str, dict] = {}
+        self.depth: List[dict] = []
+        self.contention: List[dict] = []
+        self.started = time.monotonic()
+        self._callback_conn = psycopg2.connect(dsn)
+
+    def insert_job(self, cursor):
+        corpus_file = self.rng.choice(self.files)
+        job_id = str(uuid.uuid4())
+        now = datetime.now(timezone.utc)
+        payload = {
+            "fileId": corpus_file.fileId,
+            "originalName": corpus_file.originalName,
+            "mimeType": corpus_file.mimeType,
+            "fileSize": corpus_file.fileSize,
+            "uploader": self.rng.choice(self.uploaders),
+            "schemaVersion": "1.0",
+            "idempotencyKey": f"{corpus_file.fileId}_{job_id}",
+            "detectedAt": now.isoformat()
+        }
+        cursor.execute("""
+            INSERT INTO "job_queues" ("Id", "JobType", "PayloadJson", "Status", "RetryCount", "CreatedAt", "UpdatedAt")
+            VALUES (%s::uuid, 'INVOICE_EXTRACTION', %s::jsonb, 'PENDING', 0, %s, %s)
+        """, (job_id, json.dumps(payload), now, now))
+        with self.lock:
+            self.inserted[job_id] = time.monotonic()
+
+    def on_callback(self, payload: dict):
+        """Mirror the backend: record the outcome and move the job to its final status."""
+        job_id = payload.get("jobId")
+        received = time.monotonic()
+        with self.lock:
+            if job_id not in self.inserted:
+                return
+            self.finished[job_id] = {
+                "status": payload.get("status"),
+                "worker": payload.get("workerId"),
+                "endToEndMs": (received - self.inserted[job_id]) * 1000,
+                "trace": payload.get("trace") or {}
+            }
+            cursor = self._callback_conn.cursor()
+            try:
+                cursor.execute("""
+                    UPDATE "job_queues"
+                    SET "Status" = %s, "LockedBy" = NULL, "LockedAt" = NULL, "UpdatedAt" = NOW()
+                    WHERE "Id" = %s::uuid
+                """, (FINAL_STATUS.get(payload.get("status"), "INVALID"), job_id))
+                self._callback_conn.commit()
+            finally:
+                cursor.close()
+
+    def sample(self, cursor):
+        """Record queue depth by status and current lock contention."""
+        elapsed = round(time.monotonic() - self.started, 2)
+        with self.lock:
+            ids = list(self.inserted)
+        cursor.execute("""
+            SELECT "Status", count(*) FROM "job_queues" WHERE "Id" = ANY(%s::uuid[]) GROUP BY "Status"
+        """, (ids,))
+        counts = dict(cursor.fetchall())
+        cursor.execute("""
+            SELECT count(*) FILTER (WHERE "NextRetryAt" IS NULL OR "NextRetryAt" <= NOW())
+            FROM "job_queues" WHERE "Status" = 'PENDING' AND "Id" = ANY(%s::uuid[])
+        """, (ids,))
+        ready = cursor.fetchone()[0]
+        self.depth.append({"t": elapsed, "readyPending": ready, **counts})
+
+        cursor.execute("""
+            SELECT
+                (SELECT count(*) FROM pg_stat_activity
+                 WHERE datname = current_database() AND wait_event_type = 'Lock'),
+                (SELECT count(*) FROM pg_locks l JOIN pg_database d ON d.oid = l.database
+                 WHERE d.datname = current_database() AND NOT l.granted)
+        """)
+        waiting, ungranted = cursor.fetchone()
+        self.contention.append({"t": elapsed, "sessionsWaiting": waiting, "locksUngranted": ungranted})
+
+    def close(self):
+        self._callback_conn.close()
+
+
+def arrival_loop(run: LoadRun, rate: float, duration: float, arrival: str, stop: threading.Event):
+    """Insert jobs at `rate` per second for `duration` seconds (Poisson or evenly spaced)."""
+    conn = psycopg2.connect(run.dsn)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    deadline = time.monotonic() + duration
+    next_at = time.monotonic()
+    try:
+        while not stop.is_set() and next_at < deadline:
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            run.insert_job(cursor)
+            next_at += run.rng.expovariate(rate) if arrival == "poisson" else 1 / rate
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def sampler_loop(run: LoadRun, interval: float, stop: threading.Event):
+    conn = psycopg2.connect(run.dsn)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        while not stop.wait(interval):
+            run.sample(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def run_load(args, files: List[CorpusFile]) -> dict:
+    dsn = connection_string(args)
+    if args.create_schema:
+        with psycopg2.connect(dsn) as conn, conn.cursor() as cursor:
+            cursor.execute(SCHEMA_SQL)
+        # The fair-share index a backend migration would add
+        claimer = JobClaimer(dsn)
+        claimer.connect()
+        claimer.ensure_uploader_index()
+        claimer.disconnect()
+
+    latency, failures = LatencyDistribution("fixed", 0.5), None
+    if args.llm_profile:
+        latency, failures = PROFILES[args.llm_profile]
+    latency = args.llm_latency or latency
+
+    run = LoadRun(dsn, files, args.uploaders, args.seed)
+    llm = MockLLMServer(latency=latency, failures=failures, seed=args.seed).start()
+    drive = FakeDriveServer(args.corpus, files, args.drive_latency).start()
+    backend = StubBackend(CALLBACK_SECRET, on_callback=run.on_callback).start()
+
+    worker_settings = {
+        "db_host": args.db_host,
+        "db_port": args.db_port,
+        "db_name": args.db_name,
+        "db_user": args.db_user,
+        "db_password": args.db_password,
+        "backend_url": backend.url,
+        "callback_secret": CALLBACK_SECRET,
+        "google_service_account_key": "unused",
+        "groq_api_key": "unused",
+        "poll_interval": args.poll_interval,
+        "max_retries": args.max_retries,
+        # Corpus files repeat and share templates; every job must run the full pipeline
+        "result_index_enabled": False,
+        "near_duplicate_enabled": False,
+        "llm_providers": [
+            {"name": "mock-small", "kind": "openai", "tier": "small", "model": "mock-small", "base_url": llm.base_url},
+            {"name": "mock-large", "kind": "openai", "tier": "large", "model": "mock-large", "base_url": llm.base_url}
+        ],
+        "drive_url": drive.url
+    }
+
+    context = multiprocessing.get_context("spawn")
+    worker_stop = context.Event()
+    workers = [
+        context.Process(target=_worker_process, args=(i, worker_settings, worker_stop), name=f"load-worker-{i}")
+        for i in range(args.workers)
+    ]
+    stop = threading.Event()
+    sampler = threading.Thread(target=sampler_loop, args=(run, args.sample_interval, stop), daemon=True)
+
+    try:
+        for process in workers:
+            process.start()
+        run.started = time.monotonic()
+        sampler.start()
+
+        print(f"Inserting ~{args.rate}/s for {args.duration}s into {args.db_name} with {args.workers} workers",
+              file=sys.stderr)
+        arrival_loop(run, args.rate, args.duration, args.arrival, stop)
+        arrival_done = time.monotonic()
+
+        # Drain: wait until every inserted job has produced a final callback
+        drain_deadline = arrival_done + args.drain_timeout
+        while time.monotonic() < drain_deadline and len(run.finished) < len(run.inserted):
+            time.sleep(0.5)
+        finished_at = time.monotonic()
+    finally:
+        stop.set()
+        worker_stop.set()
+        for process in workers:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        sampler.join(timeout=5)
+        llm.stop()
+        drive.stop()
+        backend.stop()
+
+    results = list(run.finished.values())
+    timings = [r["trace"].get("timingsMs", {}) for r in results]
+    by_worker = Counter(r["worker"] for r in results)
+    elapsed = finished_at - run.started
+
+    report = {
+        "benchmark": "invoice-worker-load",
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "git": git_revision(),
+        "settings": {
+            "rate": args.rate,
+            "arrival": args.arrival,
+            "durationSeconds": args.duration,
+            "workers": args.workers,
+            "pollInterval": args.poll_interval,
+            "uploaders": args.uploaders,
+            "llmLatency": asdict(llm.latency),
+            "llmFailures": asdict(llm.failures),
+            "driveLatencySeconds": args.drive_latency
+        },
+        "jobs": {
+            "inserted": len(run.inserted),
+            "finished": len(results),
+            "unfinished": len(run.inserted) - len(results),
+            "statuses": dict(Counter(r["status"] for r in results)),
+            "byWorker": dict(sorted(by_worker.items()))
+        },
+        "elapsedSeconds": round(elapsed, 2),
+        "drainSeconds": round(finished_at - arrival_done, 2),
+        "throughputJobsPerSecond": round(len(results) / elapsed, 3) if elapsed else 0.0,
+        "endToEndMs": summarize([r["endToEndMs"] for r in results]),
+        "claimQueryMs": summarize([t["claim"] for t in timings if "claim" in t]),
+        "queueWaitMs": summarize([t["claim_wait"] for t in timings if "claim_wait" in t]),
+        "processingMs": summarize([r["trace"]["totalMs"] for r in results if "totalMs" in r["trace"]]),
+        "lockContention": {
+            "maxSessionsWaiting": max((c["sessionsWaiting"] for c in run.contention), default=0),
+            "meanSessionsWaiting": round(
+                sum(c["sessionsWaiting"] for c in run.contention) / len(run.contention), 3
+            ) if run.contention else 0.0,
+            "maxLocksUngranted": max((c["locksUngranted"] for c in run.contention), default=0),
+            "samples": run.contention
+        },
+        "queueDepth": run.depth,
+        "llmRequests": dict(llm.counts),
+        "callbacksRejected": backend.rejected
+    }
+
+    if not args.keep_rows:
+        with psycopg2.connect(dsn) as conn, conn.cursor() as cursor:
+            cursor.execute('DELETE FROM "job_queues" WHERE "Id" = ANY(%s::uuid[])', (list(run.inserted),))
+    run.close()
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Drive the real job queue with N workers and report queue behaviour.")
+    parser.add_argument("--db-host", default=os.environ.get("DB_HOST", "localhost"))
+    parser.add_argument("--db-port", type=int, default=int(os.environ.get("DB_PORT", 5432)))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "invoice_load"))
+    parser.add_argument("--db-user", default=os.environ.get("DB_USER", "postgres"))
+    parser.add_argument("--db-password", default=os.environ.get("DB_PASSWORD", "postgres"))
+    parser.add_argument("--create-schema", action="store_true", help="Create job_queues if it does not exist")
+    parser.add_argument("--keep-rows", action="store_true", help="Do not delete the inserted rows afterwards")
+    parser.add_argument("--corpus", type=Path, default=Path("benchmark_corpus"),
+                        help="Corpus directory (generated if it has no manifest.json)")
+    parser.add_argument("--counts", type=parse_counts, default=DEFAULT_COUNTS, help="Documents per kind")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rate", type=float, default=1.0, help="Job arrivals per second")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to keep inserting jobs")
+    parser.add_argument("--drain-timeout", type=float, default=300.0, help="Seconds to wait for the queue to drain")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes")
+    parser.add_argument("--poll-interval", type=int, default=1, help="Worker POLL_INTERVAL in seconds")
+    parser.add_argument("--max-retries", type=int, default=0, help="Worker MAX_RETRIES (retries back off minutes)")
+    parser.add_argument("--uploaders", type=int, default=5, help="Distinct uploader ids in payloads")
+    parser.add_argument("--llm-latency", type=LatencyDistribution.parse,
+                        help="Mock LLM delay: seconds or kind:a,b; default 0.5")
+    parser.add_argument("--llm-profile", choices=sorted(PROFILES), help="Mock LLM failure profile")
+    parser.add_argument("--drive-latency", type=float, default=0.05, help="Fake Drive response delay in seconds")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between queue depth samples")
+    parser.add_argument("-o", "--output", type=Path, help="Write the report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    counts = parse_counts(args.counts) if isinstance(args.counts, str) else args.counts
+    if not (args.corpus / "manifest.json").exists():
+        print(f"Generating corpus in {args.corpus} (seed {args.seed})", file=sys.stderr)
+        files = generate_corpus(args.corpus, counts, args.seed)
+    else:
+        files = load_corpus(args.corpus)
+
+    report = run_load(args, files)
+    print(
+        f"finished {report['jobs']['finished']}/{report['jobs']['inserted']} jobs, "
+        f"throughput {report['throughputJobsPerSecond']}/s, "
+        f"e2e p50={report['endToEndMs']['p50']:.0f}ms p95={report['endToEndMs']['p95']:.0f}ms, "
+        f"claim p95={report['claimQueryMs']['p95']:.1f}ms, "
+        f"max lock waiters={report['lockContention']['maxSessionsWaiting']}",
+        file=sys.stderr
+    )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Local stand-in for the Groq / OpenAI-compatible chat-completions API.
+Parses the invoice text embedded in the extraction prompt and answers with
+InvoiceData JSON, so benchmarks and load tests exercise the real
+LLMExtractor without spending Groq quota.
+
+Latency follows a configurable distribution, and failures can be injected:
+rate limiting (a requests-per-minute budget and/or random 429s, both with
+retry-after), truncated JSON, 5xx errors and requests that never answer.
+
+Any path ending in /chat/completions is served, so both provider kinds work:
+    openai provider: base_url=http://HOST:PORT/v1
+    groq provider:   base_url=http://HOST:PORT  (the SDK adds /openai/v1)
+
+Standalone (from the worker directory):
+    python -m benchmarks.mock_llm --port 8080 --profile production
+    python -m benchmarks.mock_llm --latency lognormal:0.7,0.5 --rpm 30 --truncate 0.02
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, asdict, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+AMOUNT = r"\$?([\d,]+\.?\d*)"
+
+
+# ─── Latency and failure profiles ───
+
+@dataclass
+class LatencyDistribution:
+    """
+    Response delay in seconds.
+    kind: fixed (a), uniform (a..b), normal (mean a, stddev b),
+    lognormal (median a, sigma b), exponential (mean a).
+    per_kchar adds seconds per 1000 prompt characters, as real models do.
+    """
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+    per_kchar: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """Parse 'kind:a,b' (e.g. 'lognormal:0.8,0.4') or a bare number of seconds."""
+        kind, _, params = spec.partition(":")
+        try:
+            return cls("fixed", float(kind))
+        except ValueError:
+            pass
+        values = [float(v) for v in params.split(",") if v] + [0.0, 0.0]
+        if kind not in ("fixed", "uniform", "normal", "lognormal", "exponential"):
+            raise ValueError(f"Unknown latency distribution '{kind}'")
+        return cls(kind, values[0], values[1])
+
+    def sample(self, rng: random.Random, prompt_chars: int = 0) -> float:
+        if self.kind == "uniform":
+            delay = rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            delay = rng.gauss(self.a, self.b)
+        elif self.kind == "lognormal":
+            delay = rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        elif self.kind == "exponential":
+            delay = rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+        else:
+            delay = self.a
+        return max(0.0, delay + self.per_kchar * prompt_chars / 1000)
+
+
+@dataclass
+class FailureProfile:
+    """Probabilities (0..1) and limits for injected failures."""
+    rpm: Optional[int] = None          # Requests per minute before answering 429
+    rate_limit: float = 0.0            # Random 429s on top of the rpm budget
+    retry_after: float = 2.0           # retry-after seconds for random 429s
+    truncate: float = 0.0              # 200 with the JSON content cut short
+    server_error: float = 0.0          # 503 Service unavailable
+    timeout: float = 0.0               # Never answer; the connection is held for hang_seconds
+    hang_seconds: float = 300.0
+
+
+PROFILES = {
+    "clean": (LatencyDistribution("fixed", 0.0), FailureProfile()),
+    "production": (
+        LatencyDistribution("lognormal", 1.2, 0.45, per_kchar=0.15),
+        FailureProfile(rate_limit=0.02, truncate=0.005, server_error=0.005, timeout=0.002)
+    ),
+    "throttled": (
+        LatencyDistribution("lognormal", 1.2, 0.45, per_kchar=0.15),
+        FailureProfile(rpm=30, retry_after=5.0)
+    ),
+    "degraded": (
+        LatencyDistribution("lognormal", 6.0, 0.8, per_kchar=0.5),
+        FailureProfile(rate_limit=0.1, truncate=0.05, server_error=0.05, timeout=0.02)
+    ),
+}
+
+
+class RateLimiter:
+    """Sliding one-minute window; returns seconds until the next slot when over budget."""
+
+    def __init__(self, rpm: int):
+        self.rpm = rpm
+        self.window: list = []
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        now = time.monotonic()
+        with self.lock:
+            self.window = [t for t in self.window if now - t < 60]
+            if len(self.window) >= self.rpm:
+                return 60 - (now - self.window[0])
+            self.window.append(now)
+            return 0.0
+
+
+# ─── Response content ───
+
+def _money(value: str) -> float:
+    return float(value.replace(",", "").replace("$", "") or 0)
+
+
+def _field(text: str, pattern: str, default=None):
+    match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+    return match.group(1).strip() if match else default
+
+
+def invoice_from_text(text: str, placeholder_item: bool = True) -> dict:
+    """
+    Build plausible InvoiceData JSON from invoice text.
+    Understands the layout produced by benchmarks.corpus; anything else
+    still yields a valid single-line-item invoice (no line items when
+    placeholder_item is False, as for a chunk of a long invoice).
+    """
+    line_items = []
+    for row in re.finditer(r"^(.+?) \| (\S+) \| (.+?) \| (\d+) \| " + AMOUNT + r" \| " + AMOUNT + r"\s*$",
+                           text, re.MULTILINE):
+        name, sku, category, quantity, rate, amount = row.groups()
+        line_items.append({
+            "ProductName": name.strip(),
+            "Category": category.strip(),
+            "ProductId": sku,
+            "Quantity": float(quantity),
+            "UnitRate": _money(rate),
+            "Amount": _money(amount)
+        })
+
+    total = _field(text, r"^Total:?\s*" + AMOUNT)
+    if not line_items and placeholder_item:
+        amount = _money(total) if total else 100.0
+        line_items = [{"ProductName": "Unspecified item", "Category": None, "ProductId": "UNKNOWN",
+                       "Quantity": 1, "UnitRate": amount or 1.0, "Amount": amount}]
+
+    subtotal = _field(text, r"^Subtotal:?\s*" + AMOUNT)
+    shipping = _field(text, r"^Shipping:?\s*" + AMOUNT)
+    ship_to = [part.strip() for part in (_field(text, r"^Ship To:?\s*(.+)$", "") or "").split(",")]
+    vendor = text.strip().splitlines()[0].strip() if text.strip() else None
+
+    return {
+        "InvoiceNumber": _field(text, r"INVOICE\s*#?\s*:?\s*(\S+)", "UNKNOWN"),
+        "InvoiceDate": _field(text, r"^Date:?\s*(.+)$", "1970-01-01"),
+        "OrderId": _field(text, r"^Order ID:?\s*(\S+)"),
+        "VendorName": vendor,
+        "BillTo": {"Name": _field(text, r"^Bill To:?\s*(.+)$", "Unknown")},
+        "ShipTo": {
+            "City": ship_to[0] or None,
+            "State": ship_to[1] if len(ship_to) > 1 else None,
+            "Country": ship_to[2] if len(ship_to) > 2 else None
+        },
+        "ShipMode": _field(text, r"^Ship Mode:?\s*(.+)$"),
+        "LineItems": line_items,
+        "Subtotal": _money(subtotal) if subtotal else None,
+        "Discount": None,
+        "ShippingCost": _money(shipping) if shipping else None,
+        "TotalAmount": _money(total) if total else sum(item["Amount"] for item in line_items),
+        "BalanceDue": None,
+        "Currency": "USD",
+        "Notes": None,
+        "Terms": None
+    }
+
+
+def _prompt_text(messages: list) -> str:
+    """The document text from the user message of an extraction request."""
+    content = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    match = re.search(r"Extract invoice data from this text:\s*\n(.*)\n\s*Return only valid JSON", content, re.DOTALL)
+    return match.group(1) if match else content
+
+
+def invoice_for_prompt(messages: list) -> dict:
+    """Answer an extraction request, whole-document or one chunk of a long invoice."""
+    content = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    return invoice_from_text(_prompt_text(messages), placeholder_item="only the line items" not in content)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str, error_type: str, headers: dict = None):
+        self._send_json(status, {"error": {"message": message, "type": error_type}}, headers)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.server.mock.stats())
+        else:
+            self._error(404, f"Unknown path {self.path}", "not_found")
+
+    def do_POST(self):
+        mock = self.server.mock
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.endswith("/chat/completions"):
+            self._error(404, f"Unknown path {self.path}", "not_found")
+            return
+
+        messages = request.get("messages", [])
+        prompt_chars = sum(len(m.get("content", "")) for m in messages)
+        outcome, delay, wait = mock.decide(prompt_chars)
+
+        if outcome == "rate_limited":
+            self._error(429, f"Rate limit reached for model {request.get('model')}. "
+                             f"Please try again in {wait:.2f}s.", "rate_limit_exceeded",
+                        {"retry-after": str(max(1, math.ceil(wait)))})
+            return
+
+        time.sleep(delay)
+
+        if outcome == "timeout":
+            # Hold the connection without answering, then drop it
+            time.sleep(mock.failures.hang_seconds)
+            self.close_connection = True
+            return
+        if outcome == "server_error":
+            self._error(503, "Service unavailable", "server_error")
+            return
+
+        content = json.dumps(invoice_for_prompt(messages))
+        if outcome == "truncated":
+            content = content[:mock.rng_int(1, max(1, len(content) - 1))]
+
+        self._send_json(200, {
+            "id": f"mock-{mock.counts['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "length" if outcome == "truncated" else "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_chars // 4 + len(content) // 4
+            }
+        })
+
+
+class MockLLMServer:
+    """Threaded mock chat-completions server, started in the background."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency=0.0,
+        failures: Optional[FailureProfile] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            latency: Seconds (fixed) or a LatencyDistribution
+            failures: Injected failure rates (none by default)
+            seed: Seed for latency and failure sampling (reproducible runs)
+        """
+        self.latency = latency if isinstance(latency, LatencyDistribution) else LatencyDistribution("fixed", latency)
+        self.failures = failures or FailureProfile()
+        self.limiter = RateLimiter(self.failures.rpm) if self.failures.rpm else None
+        self.counts: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), MockLLMHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self._thread = None
+
+    @property
+    def requests(self) -> int:
+        return self.counts["requests"]
+
+    def rng_int(self, low: int, high: int) -> int:
+        with self._lock:
+            return self._rng.randint(low, high)
+
+    def decide(self, prompt_chars: int):
+        """Pick the outcome for one request: (outcome, delay seconds, retry-after seconds)."""
+        failures = self.failures
+        with self._lock:
+            self.counts["requests"] += 1
+
+            wait = self.limiter.acquire() if self.limiter else 0.0
+            if wait == 0.0 and self._rng.random() < failures.rate_limit:
+                wait = failures.retry_after
+            if wait > 0:
+                self.counts["rate_limited"] += 1
+                return "rate_limited", 0.0, wait
+
+            delay = self.latency.sample(self._rng, prompt_chars)
+            roll = self._rng.random()
+            if roll < failures.timeout:
+                outcome = "timeout"
+            elif roll < failures.timeout + failures.server_error:
+                outcome = "server_error"
+            elif roll < failures.timeout + failures.server_error + failures.truncate:
+                outcome = "truncated"
+            else:
+                outcome = "ok"
+            self.counts[outcome] += 1
+            return outcome, delay, 0.0
+
+    def stats(self) -> dict:
+        return {
+            "counts": dict(self.counts),
+            "latency": asdict(self.latency),
+            "failures": asdict(self.failures)
+        }
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Groq/OpenAI-compatible chat-completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="clean",
+                        help="Preset latency/failure profile; the options below override it")
+    parser.add_argument("--latency", type=LatencyDistribution.parse,
+                        help="Seconds, or kind:a,b with kind in fixed, uniform, normal, lognormal, exponential")
+    parser.add_argument("--latency-per-kchar", type=float, help="Extra seconds per 1000 prompt characters")
+    parser.add_argument("--rpm", type=int, help="Requests per minute before answering 429")
+    parser.add_argument("--rate-limit", type=float, help="Probability of a random 429")
+    parser.add_argument("--retry-after", type=float, help="retry-after seconds for random 429s")
+    parser.add_argument("--truncate", type=float, help="Probability of truncated JSON content")
+    parser.add_argument("--server-error", type=float, help="Probability of a 503")
+    parser.add_argument("--timeout", type=float, help="Probability of never answering")
+    parser.add_argument("--hang-seconds", type=float, help="How long an unanswered request holds its connection")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible runs")
+    args = parser.parse_args()
+
+    latency, failures = PROFILES[args.profile]
+    if args.latency:
+        latency = replace(args.latency, per_kchar=latency.per_kchar)
+    if args.latency_per_kchar is not None:
+        latency = replace(latency, per_kchar=args.latency_per_kchar)
+    overrides = {
+        field: getattr(args, field)
+        for field in ("rpm", "rate_limit", "retry_after", "truncate", "server_error", "timeout", "hang_seconds")
+        if getattr(args, field) is not None
+    }
+    failures = replace(failures, **overrides)
+
+    server = MockLLMServer(args.host, args.port, latency, failures, args.seed)
+    print(f"Mock LLM listening on {server.base_url} ({args.profile} profile)")
+    print(f"  latency:  {asdict(latency)}")
+    print(f"  failures: {asdict(failures)}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"Served: {dict(server.counts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Benchmark the worker pipeline end to end against local stand-ins.
+
+Runs InvoiceWorker's own polling loop (claims into lane slots under memory
+admission, then download, MIME detection, extraction, LLM, validation,
+callback) over a synthetic corpus with an in-memory queue, a stub Drive,
+the mock LLM server and a stub backend. Each concurrency level is a fixed
+controller limit. Reports per-stage latency percentiles, throughput, CPU
+time and peak RSS as JSON for comparing commits.
+
+Usage (from the worker directory):
+    python -m benchmarks.run --concurrency 1,4,8 -o bench.json
+    python -m benchmarks.run --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import Config, LLMProviderSettings
+from app.models.job import Job, JobPayload, JobStatus
+from app.worker import InvoiceWorker
+
+from benchmarks.corpus import KINDS, CorpusFile, generate_corpus, load_corpus
+from benchmarks.mock_llm import PROFILES, FailureProfile, LatencyDistribution, MockLLMServer
+from benchmarks.stubs import StubBackend, StubDriveService
+
+logger = logging.getLogger("benchmarks.run")
+
+DEFAULT_COUNTS = "text_pdf=20,scanned_pdf=5,png=5,jpeg=5"
+CALLBACK_SECRET = "benchmark-secret"
+
+
+def _like(pattern: str, value: str) -> bool:
+    """SQL LIKE with backslash escapes, as the claim query applies lane MIME patterns."""
+    regex = "".join(
+        ".*" if token == "%" else "." if token == "_" else re.escape(token[-1])
+        for token in re.findall(r"\\.|.", pattern, re.DOTALL)
+    )
+    return re.fullmatch(regex, value, re.DOTALL) is not None
+
+
+class StubJobClaimer:
+    """
+    In-memory stand-in for job_queues. Claims honour the lane's fileSize
+    range, MIME patterns and shortest-first order; requeued jobs are not
+    offered again (the run counts them as REQUEUED).
+    """
+
+    def __init__(self, jobs: List[Job]):
+        self.pending = list(jobs)
+        self._lock = threading.Lock()
+
+    def claim_job(self, worker_id: str, min_file_size: int = 0, max_file_size: Optional[int] = None,
+                  mime_patterns: Optional[List[str]] = None, shortest_first: bool = False) -> Optional[Job]:
+        with self._lock:
+            candidates = [
+                job for job in self.pending
+                if min_file_size <= job.payload.fileSize
+                and (max_file_size is None or job.payload.fileSize <= max_file_size)
+                and (mime_patterns is None or any(_like(p, job.payload.mimeType) for p in mime_patterns))
+            ]
+            if not candidates:
+                return None
+            job = min(candidates, key=lambda j: j.payload.fileSize) if shortest_first else candidates[0]
+            self.pending.remove(job)
+            return job
+
+    def requeue_job(self, job_id: str):
+        pass
+
+    def release_job_lock(self, job_id: str):
+        pass
+
+    def release_all_locks(self, worker_id: str) -> int:
+        return 0
+
+    def disconnect(self):
+        pass
+
+
+# ─── Measurement helpers ───
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values: List[float]) -> dict:
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(max(values), 2) if values else 0.0
+    }
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's high-water mark (Linux only) so each run reports its own peak."""
+    try:
+        with open("/proc/self/clear_refs", "w") as handle:
+            handle.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux, bytes on macOS
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--", "."],
+                                    capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+# ─── Benchmark ───
+
+def build_config(llm_url: str, backend_url: str) -> Config:
+    """Worker configuration pointing every external service at the local stand-ins."""
+    return Config(
+        db_host="localhost",
+        db_name="benchmark",
+        db_user="benchmark",
+        db_password="benchmark",
+        backend_url=backend_url,
+        callback_secret=CALLBACK_SECRET,
+        google_service_account_key="unused",
+        groq_api_key="unused",
+        worker_id="benchmark-worker",
+        max_retries=0,
+        # Bounds how long the loop idles after the last job before the level ends
+        poll_interval=1,
+        # Corpus files repeat and share templates; every job must run the full pipeline
+        result_index_enabled=False,
+        near_duplicate_enabled=False,
+        # Extract in this process so CPU time and peak RSS cover the whole pipeline
+        extraction_processes=0,
+        llm_providers=[
+            LLMProviderSettings(name="mock-small", kind="openai", tier="small", model="mock-small", base_url=llm_url),
+            LLMProviderSettings(name="mock-large", kind="openai", tier="large", model="mock-large", base_url=llm_url)
+        ]
+    )
+
+
+def build_job(corpus_file: CorpusFile) -> Job:
+    now = datetime.now(timezone.utc)
+    return Job(
+        id=str(uuid.uuid4()),
+        jobType="INVOICE_EXTRACTION",
+        status=JobStatus.PROCESSING,
+        payload=JobPayload(
+            fileId=corpus_file.fileId,
+            originalName=corpus_file.originalName,
+            mimeType=corpus_file.mimeType,
+            fileSize=corpus_file.fileSize,
+            uploader="benchmark",
+            idempotencyKey=corpus_file.fileId,
+            detectedAt=now.isoformat()
+        ),
+        createdAt=now,
+        updatedAt=now
+    )
+
+
+async def run_level(config: Config, drive: StubDriveService, files: List[CorpusFile],
+                    concurrency: int, repeat: int) -> dict:
+    """
+    Process the corpus `repeat` times through a fresh worker's polling loop,
+    with the concurrency limit fixed at `concurrency`. Lane slots and memory
+    admission still apply, so peakInFlight can stay below the limit.
+    """
+    jobs = [(build_job(corpus_file), corpus_file.kind) for _ in range(repeat) for corpus_file in files]
+    kinds = {job.id: kind for job, kind in jobs}
+    worker = InvoiceWorker(
+        config.model_copy(update={"concurrency_adaptive": False, "concurrency_initial": concurrency}),
+        job_claimer=StubJobClaimer([job for job, _ in jobs]),
+        drive_service=drive
+    )
+
+    results = []
+    handle_job = worker._handle_job
+
+    async def recorded(job, trace, deadline=None):
+        status = await handle_job(job, trace, deadline)
+        results.append((kinds[job.id], status, trace))
+        return status
+
+    worker._handle_job = recorded
+
+    reset_peak_rss()
+    cpu_started = cpu_seconds()
+    started = time.perf_counter()
+
+    loop = asyncio.create_task(worker.start())
+    peak_in_flight = 0
+    while len(results) < len(jobs) and not loop.done():
+        peak_in_flight = max(peak_in_flight, len(worker._tasks))
+        await asyncio.sleep(0.01)
+    wall = time.perf_counter() - started
+    cpu_used = cpu_seconds() - cpu_started
+    worker.is_running = False
+    await loop
+
+    stages: Dict[str, List[float]] = defaultdict(list)
+    by_kind: Dict[str, List[float]] = defaultdict(list)
+    statuses = Counter()
+
+    for kind, status, trace in results:
+        statuses[status] += 1
+        for stage, ms in trace.timings.items():
+            stages[stage].append(ms)
+        by_kind[kind].append(trace.elapsed_ms)
+
+    return {
+        "concurrency": concurrency,
+        "jobs": len(results),
+        "peakInFlight": peak_in_flight,
+        "wallSeconds": round(wall, 3),
+        "throughputJobsPerSecond": round(len(results) / wall, 3) if wall else 0.0,
+        "cpuSeconds": round(cpu_used, 3),
+        "peakRssMb": peak_rss_mb(),
+        "statuses": dict(statuses),
+        "jobLatencyMs": summarize([ms for values in by_kind.values() for ms in values]),
+        "jobLatencyMsByKind": {kind: summarize(values) for kind, values in sorted(by_kind.items())},
+        "stageLatencyMs": {stage: summarize(values) for stage, values in sorted(stages.items())}
+    }
+
+
+def run_benchmark(corpus_dir: Path, files: List[CorpusFile], levels: List[int], repeat: int,
+                  llm_latency: LatencyDistribution, drive_latency: float,
+                  llm_failures: Optional[FailureProfile] = None, warmup: bool = True) -> dict:
+    llm = MockLLMServer(latency=llm_latency, failures=llm_failures, seed=0).start()
+    backend = StubBackend(CALLBACK_SECRET).start()
+    try:
+        config = build_config(llm.base_url, backend.url)
+        drive = StubDriveService(corpus_dir, files, drive_latency)
+
+        if warmup and files:
+            # Import-time and first-call costs should not land in the first level
+            asyncio.run(run_level(config, drive, files[:1], 1, 1))
+
+        runs = []
+        for concurrency in levels:
+            result = asyncio.run(run_level(config, drive, files, concurrency, repeat))
+            runs.append(result)
+            print(
+                f"concurrency={concurrency:<3} jobs={result['jobs']:<4} in_flight<={result['peakInFlight']:<3} "
+                f"throughput={result['throughputJobsPerSecond']:.2f}/s "
+                f"p50={result['jobLatencyMs']['p50']:.0f}ms p95={result['jobLatencyMs']['p95']:.0f}ms "
+                f"rss={result['peakRssMb']}MB statuses={result['statuses']}",
+                file=sys.stderr
+            )
+
+        return {
+            "benchmark": "invoice-worker-pipeline",
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "git": git_revision(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpuCount": os.cpu_count()
+            },
+            "settings": {
+                "repeat": repeat,
+                "llmLatency": asdict(llm.latency),
+                "llmFailures": asdict(llm.failures),
+                "llmRequests": dict(llm.counts),
+                "driveLatencySeconds": drive_latency,
+                "callbacksRejected": backend.rejected
+            },
+            "corpus": {
+                "files": len(files),
+                "bytes": sum(f.fileSize for f in files),
+                "pages": sum(f.pages for f in files),
+                "kinds": dict(Counter(f.kind for f in files))
+            },
+            "runs": runs,
+            "peakRssMb": peak_rss_mb()
+        }
+    finally:
+        llm.stop()
+        backend.stop()
+
+
+def compare(current: dict, baseline: dict) -> str:
+    """Human-readable throughput and latency deltas against a previous result file."""
+    previous = {run["concurrency"]: run for run in baseline.get("runs", [])}
+    lines = [f"baseline {baseline.get('git', {}).get('commit')} -> current {current.get('git', {}).get('commit')}"]
+
+    def delta(new: float, old: float) -> str:
+        return f"{new:.2f} ({(new - old) / old * 100:+.1f}%)" if old else f"{new:.2f}"
+
+    for run in current["runs"]:
+        old = previous.get(run["concurrency"])
+        if not old:
+            continue
+        lines.append(
+            f"concurrency={run['concurrency']}: "
+            f"throughput {delta(run['throughputJobsPerSecond'], old['throughputJobsPerSecond'])}/s, "
+            f"p95 {delta(run['jobLatencyMs']['p95'], old['jobLatencyMs']['p95'])}ms, "
+            f"rss {delta(run['peakRssMb'], old['peakRssMb'])}MB"
+        )
+        for stage, stats in run["stageLatencyMs"].items():
+            if stage in old["stageLatencyMs"]:
+                lines.append(f"    {stage:<20} p50 {delta(stats['p50'], old['stageLatencyMs'][stage]['p50'])}ms")
+    return "\n".join(lines)
+
+
+def parse_counts(value: str) -> Dict[str, int]:
+    counts = {}
+    for item in value.split(","):
+        kind, _, count = item.partition("=")
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(f"Unknown document kind '{kind}' (expected one of {', '.join(KINDS)})")
+        counts[kind] = int(count)
+    return counts
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the invoice worker pipeline against local stand-ins.")
+    parser.add_argument("--corpus", type=Path, default=Path("benchmark_corpus"),
+                        help="Corpus directory (generated if it has no manifest.json)")
+    parser.add_argument("--regenerate", action="store_true", help="Regenerate the corpus even if it exists")
+    parser.add_argument("--counts", type=parse_counts, default=DEFAULT_COUNTS,
+                        help=f"Documents per kind (default: {DEFAULT_COUNTS})")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus random seed")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the corpus per level")
+    parser.add_argument("--llm-latency", type=LatencyDistribution.parse,
+                        help="Mock LLM delay: seconds or kind:a,b (see benchmarks.mock_llm); default 0.5")
+    parser.add_argument("--llm-profile", choices=sorted(PROFILES),
+                        help="Mock LLM failure profile (its latency applies unless --llm-latency is given)")
+    parser.add_argument("--drive-latency", type=float, default=0.05, help="Stub Drive download delay in seconds")
+    parser.add_argument("-o", "--output", type=Path, help="Write results JSON here (default: stdout)")
+    parser.add_argument("--compare", type=Path, help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    counts = parse_counts(args.counts) if isinstance(args.counts, str) else args.counts
+    if args.regenerate or not (args.corpus / "manifest.json").exists():
+        print(f"Generating corpus in {args.corpus} (seed {args.seed})", file=sys.stderr)
+        files = generate_corpus(args.corpus, counts, args.seed)
+    else:
+        files = load_corpus(args.corpus)
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    latency, failures = LatencyDistribution("fixed", 0.5), None
+    if args.llm_profile:
+        latency, failures = PROFILES[args.llm_profile]
+    latency = args.llm_latency or latency
+    results = run_benchmark(args.corpus, files, levels, args.repeat, latency, args.drive_latency, failures)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        print(compare(results, json.loads(args.compare.read_text())), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
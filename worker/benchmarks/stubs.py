@@ -0,0 +1,231 @@
+"""
+In-process stand-ins for Google Drive and the backend callback endpoint.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.corpus import CorpusFile
+
+
+class StubDriveService:
+    """Serves corpus files by fileId with an optional fixed delay (same interface as DriveService)."""
+
+    def __init__(self, corpus_dir: Path, files: List[CorpusFile], latency: float = 0.0):
+        self.paths = {f.fileId: corpus_dir / f.path for f in files}
+        self.latency = latency
+
+    def connect(self):
+        pass
+
+    def _read(self, file_id: str) -> bytes:
+        if file_id not in self.paths:
+            raise Exception(f"Failed to download file {file_id}: not found")
+        time.sleep(self.latency)
+        return self.paths[file_id].read_bytes()
+
+    def get_metadata(self, file_id: str) -> dict:
+        return _metadata(file_id, self._read(file_id))
+
+    def download_prefix(self, file_id: str, size: int) -> Tuple[bytes, Optional[int]]:
+        data = self._read(file_id)
+        return data[:size], len(data)
+
+    def download_file(self, file_id: str, prefix: bytes = b"", total_size: Optional[int] = None) -> bytes:
+        if prefix and total_size is not None and len(prefix) >= total_size:
+            return prefix
+        return self._read(file_id)
+
+
+def _metadata(file_id: str, data: bytes) -> dict:
+    """Drive v3 files.get fields for a file's content."""
+    return {"id": file_id, "md5Checksum": hashlib.md5(data).hexdigest(), "size": str(len(data))}
+
+
+def _slice(data: bytes, byte_range: str) -> Tuple[bytes, str]:
+    """Apply a single HTTP byte range ("a-b", "a-" or "-n"); returns (body, Content-Range)."""
+    start, _, end = byte_range.partition("-")
+    if not start:
+        start, end = max(0, len(data) - int(end)), len(data) - 1
+    else:
+        start, end = int(start), min(int(end), len(data) - 1) if end else len(data) - 1
+    return data[start:end + 1], f"bytes {start}-{end}/{len(data)}"
+
+
+class _DriveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        # Drive v3 media download path: /drive/v3/files/{fileId}?alt=media
+        file_id = self.path.split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+        path = self.server.drive.paths.get(file_id)
+        time.sleep(self.server.drive.latency)
+
+        content_range = None
+        if path is None:
+            body, status = b'{"error": {"code": 404, "message": "File not found"}}', 404
+            content_type = "application/json"
+        elif "alt=media" not in self.path:
+            # Metadata request (files.get without alt=media)
+            body, status = json.dumps(_metadata(file_id, path.read_bytes())).encode(), 200
+            content_type = "application/json"
+        else:
+            body, status, content_type = path.read_bytes(), 200, "application/octet-stream"
+            byte_range = self.headers.get("Range")
+            if byte_range and byte_range.startswith("bytes="):
+                body, content_range = _slice(body, byte_range[len("bytes="):])
+                status = 206
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if content_range:
+            self.send_header("Content-Range", content_range)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeDriveServer:
+    """Serves corpus files over HTTP at /drive/v3/files/{fileId}?alt=media."""
+
+    def __init__(self, corpus_dir: Path, files: List[CorpusFile], latency: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.paths = {f.fileId: corpus_dir / f.path for f in files}
+        self.latency = latency
+        self.httpd = ThreadingHTTPServer((host, port), _DriveHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.drive = self
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeDriveServer":
+        threading.Thread(target=self.httpd.serve_forever, name="fake-drive", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class HttpDriveClient:
+    """DriveService stand-in that downloads from a FakeDriveServer over HTTP."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.client = httpx.Client(timeout=timeout)
+
+    def connect(self):
+        pass
+
+    def _get(self, file_id: str, byte_range: Optional[str] = None) -> httpx.Response:
+        headers = {"Range": f"bytes={byte_range}"} if byte_range else {}
+        response = self.client.get(
+            f"{self.base_url}/drive/v3/files/{file_id}", params={"alt": "media"}, headers=headers
+        )
+        if response.status_code not in (200, 206):
+            raise Exception(f"Failed to download file {file_id}: HTTP {response.status_code}")
+        return response
+
+    def get_metadata(self, file_id: str) -> dict:
+        response = self.client.get(f"{self.base_url}/drive/v3/files/{file_id}")
+        if response.status_code != 200:
+            raise Exception(f"Failed to get metadata for file {file_id}: HTTP {response.status_code}")
+        return response.json()
+
+    def download_prefix(self, file_id: str, size: int) -> Tuple[bytes, Optional[int]]:
+        response = self._get(file_id, f"0-{size - 1}")
+        return response.content, int(response.headers["Content-Range"].rsplit("/", 1)[1])
+
+    def download_file(self, file_id: str, prefix: bytes = b"", total_size: Optional[int] = None) -> bytes:
+        if prefix and total_size is not None:
+            if len(prefix) >= total_size:
+                return prefix
+            return prefix + self._get(file_id, f"{len(prefix)}-").content
+        return self._get(file_id).content
+
+
+def _valid_signature(body: bytes, signature: str, secret: str) -> bool:
+    """Check X-Callback-HMAC the way the backend does (base64 HMAC-SHA256 of the raw body)."""
+    expected = base64.b64encode(hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()).decode()
+    return hmac.compare_digest(expected, signature)
+
+
+class _CallbackHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        backend = self.server.backend
+
+        status = 404
+        if self.path == "/api/callback":
+            signature = self.headers.get("X-Callback-HMAC", "")
+            if _valid_signature(body, signature, backend.secret):
+                status = 200
+                payload = json.loads(body)
+                if backend.on_callback:
+                    backend.on_callback(payload)
+                with backend.lock:
+                    backend.statuses[payload.get("status")] += 1
+                    backend.received.append(payload)
+            else:
+                status = 401
+                with backend.lock:
+                    backend.rejected += 1
+
+        response = b'{"ok": true}' if status == 200 else b'{"ok": false}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+
+class StubBackend:
+    """
+    Accepts HMAC-signed callbacks on /api/callback and counts them by status.
+    on_callback, if given, is called with each accepted payload (e.g. to
+    update job_queues the way the real backend does).
+    """
+
+    def __init__(self, secret: str, host: str = "127.0.0.1", port: int = 0,
+                 on_callback: Optional[Callable[[dict], None]] = None):
+        self.secret = secret
+        self.on_callback = on_callback
+        self.lock = threading.Lock()
+        self.statuses: Counter = Counter()
+        self.received: list = []
+        self.rejected = 0
+        self.httpd = ThreadingHTTPServer((host, port), _CallbackHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.backend = self
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubBackend":
+        threading.Thread(target=self.httpd.serve_forever, name="stub-backend", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,96 @@
+"""
+Tests for memory-budget admission control
+"""
+import multiprocessing
+import sys
+sys.path.insert(0, '../')
+
+from app.utils import admission
+from app.utils.admission import MB, NORMAL_LANE, OVERSIZE_LANE, MemoryAdmission
+from app.utils.process_tree import rss_bytes
+
+# make_admission() stubs the module function out
+measured_rss = admission.current_rss
+
+
+def make_admission(budget_mb=1000):
+    admission.current_rss = lambda: 0
+    return MemoryAdmission(
+        budget_mb * MB, job_overhead_bytes=50 * MB, pdf_factor=6.0, image_factor=12.0,
+        per_page_bytes=4 * MB, oversize_bytes=500 * MB, oversize_concurrency=1
+    )
+
+
+def test_estimate_depends_on_mime_and_pages():
+    gate = make_admission()
+    assert gate.estimate(10 * MB, "application/pdf") == 110 * MB
+    assert gate.estimate(10 * MB, "image/jpeg") == 170 * MB
+    assert gate.estimate(10 * MB, "application/pdf", pages=20) == 190 * MB
+
+
+def test_normal_lane_shrinks_with_reservations():
+    gate = make_admission()
+    assert gate.claim_lanes()[0][0] == OVERSIZE_LANE
+    normal = gate.claim_lanes()[-1]
+    assert normal[0] == NORMAL_LANE
+    # Normal lane never takes what could be oversize
+    assert normal[2] == gate.oversize_file_size - 1
+
+    gate.reserve("a", 100 * MB, "application/pdf", OVERSIZE_LANE)
+    lanes = gate.claim_lanes()
+    # 650 MB reserved: the oversize lane is busy, normal takes up to (350 - 50) / 12 MB
+    assert [lane for lane, _, _ in lanes] == [NORMAL_LANE]
+    assert lanes[0][2] == 25 * MB
+
+    gate.release("a")
+    assert [lane for lane, _, _ in gate.claim_lanes()] == [OVERSIZE_LANE, NORMAL_LANE]
+
+
+def test_nothing_admitted_when_budget_is_spent():
+    gate = make_admission(budget_mb=300)
+    gate.reserve("a", 35 * MB, "application/pdf")
+    assert gate.claim_lanes() == []
+
+
+def test_one_job_admitted_when_idle_despite_high_rss(monkeypatch):
+    gate = make_admission(budget_mb=300)
+    # The allocator kept memory from an earlier large job
+    monkeypatch.setattr(admission, "current_rss", lambda: 290 * MB)
+
+    lanes = gate.claim_lanes()
+
+    assert [lane for lane, _, _ in lanes] == [NORMAL_LANE, OVERSIZE_LANE]
+    assert lanes[0][1:] == (0, gate.oversize_file_size - 1)
+    gate.reserve("a", 1 * MB, "application/pdf", NORMAL_LANE)
+    assert gate.claim_lanes() == []
+
+
+def test_page_count_refines_reservation():
+    gate = make_admission()
+    gate.reserve("a", 10 * MB, "application/pdf")
+    gate.update("a", 10 * MB, "application/pdf", pages=50)
+    assert gate.reserved_bytes == 310 * MB
+    gate.release("a")
+    assert gate.reserved_bytes == 0
+
+
+def hold_memory(ready, done):
+    block = bytearray(200 * MB)
+    # Touch every page so it is resident
+    block[::4096] = b"x" * (200 * MB // 4096)
+    ready.set()
+    done.wait(30)
+    return block
+
+
+def test_rss_includes_child_processes():
+    context = multiprocessing.get_context("spawn")
+    ready, done = context.Event(), context.Event()
+    child = context.Process(target=hold_memory, args=(ready, done))
+    child.start()
+    try:
+        assert ready.wait(30)
+        assert measured_rss() - rss_bytes() >= 200 * MB
+    finally:
+        done.set()
+        child.join()
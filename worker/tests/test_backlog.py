@@ -0,0 +1,59 @@
+"""
+Tests for backlog reporting
+"""
+import sys
+sys.path.insert(0, '../')
+
+from app.database.backlog_monitor import BacklogMonitor, ThroughputTracker
+
+
+class FakeBacklogMonitor(BacklogMonitor):
+    def __init__(self, counts, **kwargs):
+        super().__init__("unused", **kwargs)
+        self.counts = counts
+        self.queries = 0
+
+    def _query(self):
+        self.queries += 1
+        return dict(self.counts)
+
+
+COUNTS = {
+    "pending": 120,
+    "ready": 100,
+    "processing": 4,
+    "oldest_pending_age_seconds": 900.0,
+    "oldest_ready_age_seconds": 600.0
+}
+
+
+def test_snapshot_is_cached_within_ttl():
+    monitor = FakeBacklogMonitor(COUNTS, throughput=ThroughputTracker(), ttl_seconds=60)
+
+    first = monitor.get()
+    second = monitor.get()
+
+    assert first is second
+    assert monitor.queries == 1
+
+
+def test_drain_estimate_uses_recent_throughput():
+    throughput = ThroughputTracker(window_seconds=60)
+    throughput._started -= 60
+    throughput.record(30)  # 0.5 jobs/s
+    monitor = FakeBacklogMonitor(COUNTS, throughput=throughput, ttl_seconds=0, drain_target_seconds=60)
+
+    snapshot = monitor.get()
+
+    assert snapshot.worker_throughput_per_second == 0.5
+    assert snapshot.estimated_drain_seconds == 240.0
+    assert snapshot.desired_workers == 4
+
+
+def test_drain_unknown_without_throughput():
+    monitor = FakeBacklogMonitor(COUNTS, throughput=ThroughputTracker(), ttl_seconds=0)
+
+    snapshot = monitor.get()
+
+    assert snapshot.estimated_drain_seconds is None
+    assert snapshot.desired_workers is None
@@ -0,0 +1,94 @@
+"""
+Tests for the benchmark corpus and mock LLM
+"""
+import json
+import random
+import sys
+sys.path.insert(0, '../')
+
+import httpx
+import pytest
+
+from app.models.invoice import InvoiceData
+from app.utils.consistency import score_invoice_consistency
+from benchmarks.corpus import CorpusFile, invoice_lines
+from benchmarks.mock_llm import FailureProfile, LatencyDistribution, MockLLMServer, invoice_from_text
+from benchmarks.run import StubJobClaimer, build_job, percentile
+
+
+def test_mock_llm_parses_corpus_invoice():
+    text = "\n".join(invoice_lines(random.Random(7), 12, line_items=4))
+
+    invoice = InvoiceData(**invoice_from_text(text))
+
+    assert invoice.InvoiceNumber == "INV-00012"
+    assert len(invoice.LineItems) == 4
+    assert score_invoice_consistency(invoice).score == 1.0
+
+
+def test_mock_llm_handles_unknown_text():
+    invoice = InvoiceData(**invoice_from_text("Some receipt\nTotal: $12.50"))
+
+    assert invoice.TotalAmount == 12.5
+    assert len(invoice.LineItems) == 1
+
+
+def test_percentile_nearest_rank():
+    values = [5.0, 1.0, 3.0, 2.0, 4.0]
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 95) == 5.0
+    assert percentile([], 50) == 0.0
+
+
+def test_stub_claimer_applies_lane_filters():
+    def job(file_id, mime, size):
+        return build_job(CorpusFile(file_id, f"{file_id}.bin", mime, size, "png", 1, 1, f"{file_id}.bin"))
+
+    claimer = StubJobClaimer([job("big", "application/pdf", 900), job("img", "image/png", 500),
+                              job("small", "application/pdf", 100)])
+
+    assert claimer.claim_job("w", mime_patterns=["image/%"]).payload.fileId == "img"
+    assert claimer.claim_job("w", max_file_size=200, mime_patterns=["application/pdf"]).payload.fileId == "small"
+    assert claimer.claim_job("w", min_file_size=1000) is None
+    assert claimer.claim_job("w").payload.fileId == "big"
+    assert claimer.claim_job("w") is None
+
+
+def _extraction_request(url):
+    return httpx.post(f"{url}/chat/completions", json={
+        "model": "mock",
+        "messages": [{"role": "user", "content": "Extract invoice data from this text:\nTotal: $5.00\n"
+                                                 "Return only valid JSON"}]
+    })
+
+
+def test_mock_llm_server_rate_limits_with_retry_after():
+    server = MockLLMServer(failures=FailureProfile(rpm=1), seed=1).start()
+    try:
+        assert _extraction_request(server.base_url).status_code == 200
+        limited = _extraction_request(server.base_url)
+    finally:
+        server.stop()
+
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) >= 1
+    assert server.counts["rate_limited"] == 1
+
+
+def test_mock_llm_server_truncates_json():
+    server = MockLLMServer(failures=FailureProfile(truncate=1.0), seed=1).start()
+    try:
+        response = _extraction_request(server.base_url)
+    finally:
+        server.stop()
+
+    content = response.json()["choices"][0]["message"]["content"]
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(content)
+
+
+def test_latency_distribution_parsing():
+    assert LatencyDistribution.parse("0.25").sample(random.Random(0)) == 0.25
+    lognormal = LatencyDistribution.parse("lognormal:1.0,0.5")
+    samples = sorted(lognormal.sample(random.Random(i)) for i in range(101))
+    assert 0.7 < samples[50] < 1.4
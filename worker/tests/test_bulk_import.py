@@ -0,0 +1,130 @@
+"""
+End-to-end test for the offline bulk-import CLI
+"""
+import json
+import sys
+sys.path.insert(0, '../')
+
+import fitz
+
+from app import bulk_import
+from app.config import Config, LLMProviderSettings
+from app.extractors.llm_extractor import ExtractionResult
+from app.models.invoice import InvoiceData
+
+
+def text_pdf(lines):
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_text((50, 60), "\n".join(lines), fontsize=9)
+    return document.tobytes()
+
+
+INVOICE_LINES = [
+    "Acme Supplies", "Invoice number INV-0007  Date 2024-03-14",
+    "Pen  P1  2 x 5.00  10.00", "Pad  P2  1 x 10.00  10.00", "Total 20.00"
+]
+
+
+class StubExtractor:
+    """Reads the invoice number off the extracted text, as the LLM would."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def extract_invoice_with_metadata(self, raw_text):
+        self.calls += 1
+        number = "INV-0007" if "INV-0007" in raw_text else "unknown"
+        invoice = InvoiceData(
+            InvoiceNumber=number, InvoiceDate="2024-03-14", VendorName="Acme Supplies",
+            BillTo={"Name": "Customer"}, ShipTo={},
+            LineItems=[
+                {"ProductName": "Pen", "ProductId": "P1", "Quantity": 2, "UnitRate": 5, "Amount": 10},
+                {"ProductName": "Pad", "ProductId": "P2", "Quantity": 1, "UnitRate": 10, "Amount": 10}
+            ],
+            Subtotal=20, TotalAmount=20
+        )
+        return ExtractionResult(invoice=invoice, tier="large", provider="stub", model="stub", score=1.0)
+
+
+def make_config():
+    return Config(
+        db_host="localhost", db_name="test", db_user="test", db_password="test",
+        backend_url="http://localhost:5000", callback_secret="secret",
+        google_service_account_key="unused", groq_api_key="unused",
+        llm_providers=[LLMProviderSettings(name="mock", kind="openai", model="m", base_url="http://localhost:1/v1")]
+    )
+
+
+def test_bulk_import_writes_a_row_per_invoice_and_resumes(tmp_path, monkeypatch):
+    source = tmp_path / "archive"
+    (source / "2024").mkdir(parents=True)
+    (source / "2024" / "a.pdf").write_bytes(text_pdf(INVOICE_LINES))
+    (source / "b.pdf").write_bytes(b"%PDF-1.4 truncated")
+    (source / "notes.txt").write_text("not an invoice")
+    extractor = StubExtractor()
+    monkeypatch.setattr(bulk_import.LLMExtractor, "from_config", lambda config, max_jobs=None: extractor)
+    output = tmp_path / "results.jsonl"
+    checkpoint = str(tmp_path / "checkpoint.sqlite")
+
+    counts = bulk_import.run_bulk_import(
+        make_config(), str(source), str(output), workers=1, llm_concurrency=2, checkpoint_path=checkpoint
+    )
+
+    rows = {row["file"]: row for row in map(json.loads, output.read_text().splitlines())}
+    # Unsupported extensions are skipped, not reported
+    assert set(rows) == {"2024/a.pdf", "b.pdf"}
+    assert rows["2024/a.pdf"]["status"] == "COMPLETED"
+    assert rows["2024/a.pdf"]["result"]["InvoiceNumber"] == "INV-0007"
+    assert rows["2024/a.pdf"]["extraction"]["provider"] == "stub"
+    assert rows["b.pdf"]["status"] == "FAILED"
+    assert "PDF extraction failed" in rows["b.pdf"]["reason"]
+    assert counts["COMPLETED"] == 1 and extractor.calls == 1
+
+    # A second run reuses the finished invoice from the checkpoint
+    counts = bulk_import.run_bulk_import(
+        make_config(), str(source), str(output), workers=1, llm_concurrency=2, checkpoint_path=checkpoint
+    )
+
+    # Totals match a clean run; the broken file is retried
+    assert counts["COMPLETED"] == 1 and counts["FAILED"] == 1
+    assert "resumed" not in counts
+    assert extractor.calls == 1
+    rows = {row["file"]: row for row in map(json.loads, output.read_text().splitlines())}
+    assert rows["2024/a.pdf"]["status"] == "COMPLETED"
+    assert "resumed" not in rows["2024/a.pdf"]
+
+
+class RecordingCallbacks:
+    sent = []
+
+    def __init__(self, backend_url, secret):
+        pass
+
+    async def send_callback(self, data):
+        RecordingCallbacks.sent.append(data)
+        return True
+
+
+def test_resumed_run_does_not_post_callbacks_again(tmp_path, monkeypatch):
+    source = tmp_path / "archive"
+    source.mkdir()
+    (source / "a.pdf").write_bytes(text_pdf(INVOICE_LINES))
+    monkeypatch.setattr(bulk_import.LLMExtractor, "from_config", lambda config, max_jobs=None: StubExtractor())
+    monkeypatch.setattr(bulk_import, "CallbackService", RecordingCallbacks)
+    RecordingCallbacks.sent = []
+    output = tmp_path / "results.jsonl"
+    checkpoint = str(tmp_path / "checkpoint.sqlite")
+
+    def run():
+        return bulk_import.run_bulk_import(
+            make_config(), str(source), str(output), workers=1, llm_concurrency=1,
+            job_map={"a.pdf": "job-a"}, post_callbacks=True, checkpoint_path=checkpoint
+        )
+
+    assert run()["posted"] == 1
+    counts = run()
+
+    assert counts["already_posted"] == 1 and counts["posted"] == 0
+    assert counts["COMPLETED"] == 1
+    assert [callback["jobId"] for callback in RecordingCallbacks.sent] == ["job-a"]
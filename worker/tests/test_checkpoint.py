@@ -0,0 +1,22 @@
+"""Test checkpoint journal persistence and resume lookups."""
+import sys
+sys.path.insert(0, '../')
+
+from app.utils.checkpoint import CheckpointJournal, STAGE_TEXT, STAGE_LLM
+
+
+def test_stages_survive_reopen(tmp_path):
+    path = str(tmp_path / "run.checkpoint.sqlite")
+
+    journal = CheckpointJournal(path)
+    journal.put("abc", STAGE_TEXT, {"text": "INVOICE 1"})
+    journal.put("abc", STAGE_LLM, {"invoice": {"InvoiceNumber": "1"}})
+    journal.put("abc", STAGE_TEXT, {"text": "INVOICE 1 (re-extracted)"})
+    journal.close()
+
+    reopened = CheckpointJournal(path, read_only=True)
+
+    assert reopened.get("abc", STAGE_TEXT) == {"text": "INVOICE 1 (re-extracted)"}
+    assert set(reopened.get_stages("abc")) == {STAGE_TEXT, STAGE_LLM}
+    assert reopened.get("missing", STAGE_TEXT) is None
+    assert reopened.count(STAGE_TEXT) == 1
@@ -0,0 +1,80 @@
+"""
+Tests for chunked (map-reduce) extraction of long invoices
+"""
+import json
+import random
+import sys
+sys.path.insert(0, '../')
+
+from app.config import LLMProviderSettings
+from app.extractors.llm_extractor import LLMExtractor, merge_line_items, split_text
+from app.models.invoice import LineItem
+from app.services.llm_router import ChatResponse, LLMProvider, LLMRouter
+from benchmarks.corpus import invoice_lines
+from benchmarks.mock_llm import _prompt_text, invoice_for_prompt, invoice_from_text
+
+
+class ParsingProvider(LLMProvider):
+    """Answers like the benchmark mock LLM: parses the prompt text back into an invoice."""
+
+    def __init__(self):
+        super().__init__(LLMProviderSettings(name="parser", model="parser-model"))
+        self.prompts = []
+
+    def complete(self, messages, **params):
+        text = _prompt_text(messages)
+        self.prompts.append(text)
+        return ChatResponse(content=json.dumps(invoice_for_prompt(messages)), prompt_tokens=len(text) // 4)
+
+
+def long_invoice(items=200):
+    return "\n".join(invoice_lines(random.Random(7), 1, items))
+
+
+def test_split_text_keeps_rows_whole_and_labels_table_parts():
+    text = "Header\n\n[Table]\nItem\tQty\n" + "\n".join(f"Row {i}\t{i}" for i in range(100)) + "\n\nTotal 1"
+    chunks = split_text(text, 200)
+
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    rows = [line for chunk in chunks for line in chunk.split("\n") if line.startswith("Row ")]
+    assert rows == [f"Row {i}\t{i}" for i in range(100)]
+    assert all(chunk.startswith("[Table]\nItem\tQty\n") for chunk in chunks[1:-1])
+    assert split_text("short", 200) == ["short"]
+
+
+def test_merge_drops_only_rows_carried_over_a_chunk_boundary():
+    a = LineItem(ProductName="Pen", ProductId="P1", Quantity=1, UnitRate=2, Amount=2)
+    b = LineItem(ProductName="Pad", ProductId="P2", Quantity=1, UnitRate=3, Amount=3)
+
+    assert merge_line_items([[a, a], [a, b], [b]]) == [a, a, b]
+    # The same line bought again later in the document is kept
+    assert merge_line_items([[a, b], [], [a, b]]) == [a, b, a, b]
+
+
+def test_long_invoice_is_extracted_in_chunks():
+    text = long_invoice()
+    provider = ParsingProvider()
+    extractor = LLMExtractor(router=LLMRouter([provider]), chunk_chars=3000)
+
+    result = extractor.extract_invoice_with_metadata(text)
+    whole = invoice_from_text(text)
+
+    assert result.chunks > 2
+    assert result.metadata()["chunks"] == result.chunks
+    assert len(provider.prompts) == result.chunks + 1
+    assert max(len(prompt) for prompt in provider.prompts) < 3000 * 2 + 20
+    assert [item.ProductId for item in result.invoice.LineItems] == [item["ProductId"] for item in whole["LineItems"]]
+    assert result.invoice.TotalAmount == whole["TotalAmount"]
+    assert result.invoice.VendorName == whole["VendorName"]
+    assert result.prompt_tokens == sum(len(prompt) // 4 for prompt in provider.prompts)
+
+
+def test_short_invoice_uses_one_request():
+    provider = ParsingProvider()
+    extractor = LLMExtractor(router=LLMRouter([provider]), chunk_chars=3000)
+
+    result = extractor.extract_invoice_with_metadata(long_invoice(items=5))
+
+    assert result.chunks == 1
+    assert "chunks" not in result.metadata()
+    assert len(provider.prompts) == 1
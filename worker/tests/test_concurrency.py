@@ -0,0 +1,101 @@
+"""
+Tests for the adaptive (AIMD) concurrency controller
+"""
+import multiprocessing
+import sys
+import time
+sys.path.insert(0, '../')
+
+from app.utils.concurrency import AdaptiveConcurrency
+
+
+def make_controller(**kwargs):
+    controller = AdaptiveConcurrency(min_limit=1, max_limit=6, initial_limit=2, **kwargs)
+    controller._cpu_utilisation = lambda: 0.1
+    return controller
+
+
+def saturate(controller):
+    controller.observe_in_flight(controller.limit)
+
+
+def test_increases_when_saturated_and_healthy():
+    controller = make_controller()
+    for expected in (3, 4, 5, 6, 6):
+        saturate(controller)
+        controller.adjust()
+        assert controller.limit == expected
+    assert controller.last_decision == "hold:at_max"
+
+
+def test_holds_when_slots_are_idle():
+    controller = make_controller()
+    controller.observe_in_flight(1)
+    assert controller.adjust() == "hold"
+    assert controller.limit == 2
+
+
+def test_rate_limiting_cuts_limit_to_floor():
+    controller = make_controller()
+    controller._limit = 6.0
+    for _ in range(3):
+        controller.observe_llm(0.5, "success")
+    controller.observe_llm(0.5, "rate_limited")
+    saturate(controller)
+    assert controller.adjust() == "decrease"
+    assert controller.limit == 4
+    assert controller.last_decision == "decrease:rate_limited"
+
+    for _ in range(10):
+        controller.observe_llm(0.5, "rate_limited")
+        controller.adjust()
+    assert controller.limit == 1
+
+
+def test_llm_latency_above_baseline_decreases():
+    controller = make_controller()
+    for latency in (1.0, 1.1, 0.9):
+        controller.observe_llm(latency, "success")
+    saturate(controller)
+    controller.adjust()
+    assert controller.limit == 3
+    assert controller.latency_baseline == 1.0
+
+    for latency in (3.0, 3.2, 2.9):
+        controller.observe_llm(latency, "success")
+    saturate(controller)
+    assert controller.adjust() == "decrease"
+    assert controller.last_decision == "decrease:llm_latency"
+
+
+def test_cpu_and_loop_lag_are_overload_signals():
+    controller = make_controller()
+    controller._cpu_utilisation = lambda: 0.97
+    saturate(controller)
+    controller.adjust()
+    assert controller.last_decision == "decrease:cpu"
+
+    controller = make_controller()
+    controller.observe_loop_lag(1.5)
+    saturate(controller)
+    controller.adjust()
+    assert controller.last_decision == "decrease:loop_lag"
+
+
+def busy(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def test_cpu_utilisation_includes_child_processes():
+    controller = AdaptiveConcurrency()
+    controller._cores = 1
+    child = multiprocessing.get_context("spawn").Process(target=busy, args=(1.0,))
+    child.start()
+    try:
+        time.sleep(0.8)
+        # The parent only sleeps; the child's busy loop is what shows up
+        assert controller._cpu_utilisation() > 0.4
+    finally:
+        child.join()
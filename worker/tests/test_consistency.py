@@ -0,0 +1,78 @@
+"""Test arithmetic consistency scoring of extracted invoices."""
+import sys
+sys.path.insert(0, '../')
+
+from app.models.invoice import InvoiceData
+from app.utils.consistency import score_invoice_consistency
+
+
+def make_invoice(**overrides):
+    data = {
+        "InvoiceNumber": "INV-1",
+        "InvoiceDate": "2024-01-01",
+        "VendorName": "SuperStore",
+        "BillTo": {"Name": "Jane"},
+        "ShipTo": {},
+        "LineItems": [
+            {"ProductName": "Chair", "ProductId": "C-1", "Quantity": 2, "UnitRate": 50.0, "Amount": 100.0},
+            {"ProductName": "Desk", "ProductId": "D-1", "Quantity": 1, "UnitRate": 199.99, "Amount": 199.99},
+        ],
+        "Subtotal": 299.99,
+        "Discount": {"Percentage": 10, "Amount": 30.0},
+        "ShippingCost": 15.0,
+        "TotalAmount": 284.99,
+    }
+    data.update(overrides)
+    return InvoiceData(**data)
+
+
+def test_consistent_invoice_scores_full_confidence():
+    report = score_invoice_consistency(make_invoice())
+
+    assert report.score == 1.0
+    assert report.flags == {}
+    assert report.checks_run == 5
+
+
+def test_inconsistent_fields_are_flagged():
+    # Above the total plus any plausible tax
+    invoice = make_invoice(TotalAmount=400.0)
+    invoice.LineItems[0].Amount = 120.0
+
+    report = score_invoice_consistency(invoice)
+
+    assert "LineItems[0].Amount" in report.flags
+    assert "Subtotal" in report.flags
+    assert "TotalAmount" in report.flags
+    assert report.score < 0.5
+
+
+def test_total_checked_against_line_sum_without_subtotal():
+    invoice = make_invoice(Subtotal=None, Discount=None, ShippingCost=None, TotalAmount=299.99)
+
+    report = score_invoice_consistency(invoice)
+
+    assert report.is_consistent
+
+
+def test_total_above_expected_is_read_as_tax():
+    # 20% VAT on 100.00, no tax field in InvoiceData
+    invoice = make_invoice(
+        LineItems=[{"ProductName": "Chair", "ProductId": "C-1", "Quantity": 2, "UnitRate": 50.0, "Amount": 100.0}],
+        Subtotal=100.0, Discount=None, ShippingCost=None, TotalAmount=120.0
+    )
+
+    report = score_invoice_consistency(invoice)
+
+    assert report.score == 1.0
+    assert report.to_dict()["impliedTax"] == 20.0
+    # A total below Subtotal - Discount + Shipping is never tax
+    assert "TotalAmount" in score_invoice_consistency(make_invoice(TotalAmount=250.0)).flags
+
+
+def test_taxed_invoice_is_accepted_by_the_small_tier():
+    from app.utils.validator import score_invoice_extraction
+
+    invoice = make_invoice(Subtotal=299.99, Discount=None, ShippingCost=None, TotalAmount=359.99)
+
+    assert score_invoice_extraction(invoice) >= 0.8
@@ -0,0 +1,155 @@
+"""
+Tests for job deadlines, stage budgets and the cancellable extraction pool
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+sys.path.insert(0, '../')
+
+import pytest
+
+from app.config import Config, LaneSettings, LLMProviderSettings
+from app.models.job import Job, JobPayload, JobStatus
+from app.utils.deadline import JobDeadline, StageTimeoutError
+from app.utils.extraction_pool import ExtractionInterruptedError, ExtractionPool, ExtractionQueueTimeoutError
+from app.utils.failures import Failure, classify_failure
+from app.utils.job_trace import JobTrace
+from app.worker import InvoiceWorker
+
+
+def make_config(**overrides):
+    return Config(
+        db_host="localhost", db_name="test", db_user="test", db_password="test",
+        backend_url="http://localhost:5000", callback_secret="secret",
+        google_service_account_key="unused", groq_api_key="unused",
+        llm_providers=[LLMProviderSettings(name="mock", kind="openai", model="m", base_url="http://localhost:1/v1")],
+        result_index_enabled=False, near_duplicate_enabled=False,
+        **overrides
+    )
+
+
+def test_stage_budget_stops_slow_step_and_is_charged():
+    deadline = JobDeadline(10, {"download": 0.2})
+
+    async def scenario():
+        assert await deadline.run("download", asyncio.sleep(0.05, "ok")) == "ok"
+        with pytest.raises(StageTimeoutError) as error:
+            await deadline.run("download", asyncio.sleep(5))
+        return error.value
+
+    error = asyncio.run(scenario())
+
+    assert error.stage == "download"
+    assert error.budget_seconds < 0.2
+    assert deadline.spent["download"] >= 0.2
+    # An exhausted stage fails at once
+    with pytest.raises(StageTimeoutError):
+        asyncio.run(deadline.run("download", asyncio.sleep(0)))
+
+
+def test_overall_deadline_caps_stage_budgets():
+    deadline = JobDeadline(0.1, {"llm": 60})
+
+    assert deadline.budget("llm") <= 0.1
+    assert deadline.budget("llm", within_deadline=False) == 60
+    with pytest.raises(StageTimeoutError):
+        asyncio.run(deadline.run("llm", asyncio.sleep(5)))
+    # The callback keeps its own budget after the job ran out of time
+    assert asyncio.run(deadline.run("callback", asyncio.sleep(0, True), within_deadline=False))
+
+
+def test_lane_overrides_deadline_and_budgets():
+    config = make_config(job_deadline_seconds=300, stage_budgets={"download": 60, "extract": 120})
+    lane = LaneSettings(name="small", deadline_seconds=30, stage_budgets={"extract": 10})
+
+    deadline = JobDeadline.from_config(config, lane)
+
+    assert deadline.total_seconds == 30
+    assert deadline.stage_budgets == {"download": 60, "extract": 10}
+    assert JobDeadline.from_config(make_config(job_deadline_seconds=0)).remaining() == float("inf")
+
+
+def test_cancelled_extraction_kills_its_process():
+    pool = ExtractionPool(max_workers=2)
+
+    async def scenario():
+        # Start both processes so the hanging call is running when cancelled
+        await asyncio.gather(pool.run(time.sleep, 0.1), pool.run(time.sleep, 0.1))
+        # Another job's call, running in the pool that gets killed, is resubmitted
+        other = asyncio.create_task(pool.run(time.sleep, 1))
+        await asyncio.sleep(0.1)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.run(time.sleep, 60), 0.5)
+        return await other, await pool.run(len, b"abc")
+
+    started = time.monotonic()
+    try:
+        assert asyncio.run(scenario()) == (None, 3)
+    finally:
+        pool.shutdown()
+
+    assert pool.restarts == 1
+    assert time.monotonic() - started < 30
+
+
+def test_extract_budget_starts_when_a_process_is_free():
+    config = make_config(extraction_processes=1)
+    worker = InvoiceWorker(config, job_claimer=object(), drive_service=object())
+
+    async def scenario():
+        await worker._extract(JobDeadline(), len, b"")
+        # Each call needs 1s of a 1.5s budget; the second waits 1s for the process first
+        deadlines = [JobDeadline(None, {"extract": 1.5}) for _ in range(2)]
+        return await asyncio.gather(*(worker._extract(deadline, time.sleep, 1) for deadline in deadlines))
+
+    try:
+        assert asyncio.run(scenario()) == [None, None]
+
+        # Waiting is bounded by the job's deadline, and is not the document's fault
+        async def queued_past_deadline():
+            async with worker.extraction_pool.slot():
+                await worker._extract(JobDeadline(0.2), time.sleep, 0)
+
+        with pytest.raises(ExtractionQueueTimeoutError) as error:
+            asyncio.run(queued_past_deadline())
+        assert classify_failure(error.value, "extract") == Failure("transient", None)
+    finally:
+        worker.extraction_pool.shutdown()
+
+
+def test_pool_is_sized_from_lane_slots():
+    assert make_config().extraction_pool_size == 7
+    assert make_config(concurrency_max=4).extraction_pool_size == 4
+    assert make_config(extraction_processes=0).extraction_pool_size == 0
+
+
+def test_timeouts_are_classified_by_stage():
+    assert classify_failure(StageTimeoutError("download", 1)) == Failure("timeout", "drive")
+    assert classify_failure(StageTimeoutError("llm", 1), "llm") == Failure("timeout", "llm")
+    assert classify_failure(StageTimeoutError("extract", 1), "extract") == Failure("timeout", None)
+    assert classify_failure(ExtractionInterruptedError("killed"), "extract") == Failure("transient", None)
+
+
+class SlowDrive:
+    def download_file(self, file_id, prefix=b"", total_size=None):
+        time.sleep(1)
+        return b"%PDF-1.4"
+
+
+def test_download_timeout_reports_timeout_outcome():
+    config = make_config(drive_sniff_bytes=0, stage_budgets={"download": 0.2})
+    worker = InvoiceWorker(config, job_claimer=object(), drive_service=SlowDrive())
+    job = Job(
+        id="job-1", jobType="INVOICE_EXTRACTION", status=JobStatus.PROCESSING,
+        payload=JobPayload(fileId="f", originalName="a.pdf", mimeType="application/pdf", fileSize=1,
+                           idempotencyKey="k", detectedAt="2026-01-01T00:00:00Z"),
+        createdAt=datetime.now(timezone.utc), updatedAt=datetime.now(timezone.utc)
+    )
+
+    callback = asyncio.run(worker._process_job(job, JobTrace(job.id)))
+
+    assert callback["status"] == "FAILED"
+    assert callback["failure"] == {"kind": "timeout", "dependency": "drive"}
+    assert callback["timeout"]["stage"] == "download"
+    assert worker.breakers["drive"].failures == 1
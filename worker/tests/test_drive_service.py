@@ -0,0 +1,53 @@
+"""
+Tests for DriveService connection handling
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, '../')
+
+from google.auth.credentials import AnonymousCredentials
+
+from app.services.drive_service import DriveService
+
+
+def connected_service():
+    drive = DriveService("unused.json")
+    drive.credentials = AnonymousCredentials()
+    return drive
+
+
+def test_each_thread_gets_its_own_http_connection():
+    drive = connected_service()
+    barrier = threading.Barrier(4)
+
+    def service_twice(_):
+        # Hold every thread until all four have started
+        barrier.wait()
+        return drive.service, drive.service
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        pairs = list(pool.map(service_twice, range(4)))
+
+    assert len({id(first._http) for first, _ in pairs}) == 4
+    # A thread keeps its service across calls
+    assert all(first is second for first, second in pairs)
+
+
+def test_not_connected_without_credentials():
+    assert DriveService("unused.json").service is None
+
+
+def test_rest_of_file_is_fetched_with_one_range_request(monkeypatch):
+    drive = connected_service()
+    data = bytes(range(256)) * 20_000
+    ranges = []
+
+    def get_range(file_id, byte_range):
+        ranges.append(byte_range)
+        return data[int(byte_range.rstrip("-")):], len(data)
+
+    monkeypatch.setattr(drive, "_get_range", get_range)
+
+    assert drive.download_file("f", prefix=data[:65536], total_size=len(data)) == data
+    assert ranges == ["65536-"]
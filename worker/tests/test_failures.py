@@ -0,0 +1,195 @@
+"""
+Tests for failure classification and upstream circuit breakers
+"""
+import asyncio
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+sys.path.insert(0, '../')
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from pytesseract import TesseractNotFoundError
+
+from app.config import Config, LLMProviderSettings
+from app.models.job import Job, JobPayload, JobStatus
+from app.pipeline import DocumentParseError, extract_text
+from app.services.mime_detector import ProcessingPipeline
+from app.services.llm_router import LLMUnavailableError, ProviderHTTPError
+from app.utils.extraction_pool import ExtractionPool
+from app.utils.failures import CircuitBreaker, Failure, classify_failure
+from app.utils.job_trace import JobTrace
+from app.worker import InvoiceWorker
+
+
+def llm_error(*statuses):
+    return LLMUnavailableError([
+        (f"p{i}", ProviderHTTPError(f"p{i}", status, "") if status else TimeoutError("timed out"))
+        for i, status in enumerate(statuses)
+    ])
+
+
+def drive_error(status, content=b"{}"):
+    return HttpError(httplib2.Response({"status": status}), content, uri="https://www.googleapis.com/drive/v3/files/x")
+
+
+def wrapped(error):
+    """Raise error and wrap it the way the extractors and DriveService do."""
+    try:
+        try:
+            raise error
+        except Exception as e:
+            raise Exception(f"LLM extraction failed: {e}")
+    except Exception as outer:
+        return outer
+
+
+def test_llm_failures():
+    assert classify_failure(wrapped(llm_error(429, 429)), "llm") == Failure("rate_limited", "llm")
+    assert classify_failure(wrapped(llm_error(503, None)), "llm") == Failure("transient", "llm")
+    assert classify_failure(wrapped(llm_error(400)), "llm") == Failure("permanent")
+    # No provider accepts the input size
+    assert classify_failure(wrapped(llm_error()), "llm") == Failure("permanent")
+    # Unparseable answers are retried but say nothing about availability
+    assert classify_failure(Exception("LLM returned invalid JSON"), "llm") == Failure("transient")
+
+
+def test_drive_and_content_failures():
+    assert classify_failure(wrapped(drive_error(404)), "drive") == Failure("permanent")
+    assert classify_failure(wrapped(drive_error(500)), "drive") == Failure("transient", "drive")
+    throttled = drive_error(403, b'{"reason": "userRateLimitExceeded"}')
+    assert classify_failure(throttled) == Failure("rate_limited", "drive")
+    assert classify_failure(wrapped(ConnectionResetError()), "drive") == Failure("transient", "drive")
+    assert classify_failure(DocumentParseError("PDF extraction failed: broken xref"), "extract") == Failure("permanent")
+    assert classify_failure(Exception("Validation failed")) == Failure("transient")
+
+
+def test_only_parse_errors_blame_the_document():
+    # A truncated PDF is the document's fault, also when extracted in a pool process
+    pool = ExtractionPool(max_workers=1)
+    try:
+        with pytest.raises(DocumentParseError) as error:
+            asyncio.run(pool.run(extract_text, b"%PDF-1.4 truncated", ProcessingPipeline.PDF))
+    finally:
+        pool.shutdown()
+    assert "PDF extraction failed" in str(error.value)
+    assert classify_failure(error.value, "extract") == Failure("permanent")
+
+    # The environment's faults are retried
+    missing_tesseract = wrapped(TesseractNotFoundError())
+    assert classify_failure(missing_tesseract, "extract") == Failure("transient")
+    assert classify_failure(wrapped(OSError("disk full")), "extract") == Failure("transient")
+    assert classify_failure(BrokenProcessPool(), "extract") == Failure("transient")
+    assert classify_failure(MemoryError(), "extract") == Failure("transient")
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker("llm", failure_threshold=3, open_seconds=0.05, max_open_seconds=0.2)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow() == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow() is None
+
+    # After the cool-down exactly one probe is let through
+    time.sleep(0.06)
+    assert breaker.allow() == "probe"
+    assert breaker.allow() is None
+
+    # A failed probe opens the circuit for twice as long
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.open_seconds == 0.1
+
+    time.sleep(0.11)
+    assert breaker.allow() == "probe"
+    # The probe finished without reaching the dependency: the next job probes instead
+    breaker.probe_done()
+    assert breaker.allow() == "probe"
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.open_seconds == 0.05
+    assert breaker.allow() == "closed"
+
+
+class FakeClaimer:
+    def __init__(self):
+        self.calls = []
+
+    def release_job_lock(self, job_id):
+        self.calls.append(("release", job_id))
+
+    def requeue_job(self, job_id):
+        self.calls.append(("requeue", job_id))
+
+
+class FakeCallbacks:
+    def __init__(self):
+        self.sent = []
+
+    async def send_callback(self, data):
+        self.sent.append(data)
+        return True
+
+
+def run_failed_job(error, stage):
+    config = Config(
+        db_host="localhost", db_name="test", db_user="test", db_password="test",
+        backend_url="http://localhost:5000", callback_secret="secret",
+        google_service_account_key="unused", groq_api_key="unused",
+        llm_providers=[LLMProviderSettings(name="mock", kind="openai", model="m", base_url="http://localhost:1/v1")],
+        circuit_failure_threshold=1
+    )
+    worker = InvoiceWorker(config, job_claimer=FakeClaimer(), callback_service=FakeCallbacks())
+    job = Job(
+        id="job-1", jobType="INVOICE_EXTRACTION", status=JobStatus.PROCESSING,
+        payload=JobPayload(fileId="f", originalName="a.pdf", mimeType="application/pdf", fileSize=1,
+                           idempotencyKey="k", detectedAt="2026-01-01T00:00:00Z"),
+        createdAt=datetime.now(timezone.utc), updatedAt=datetime.now(timezone.utc)
+    )
+
+    async def failing_process(job, trace, deadline=None):
+        failure = classify_failure(error, stage)
+        if failure.dependency:
+            worker.breakers[failure.dependency].record_failure()
+        return worker._create_failed_callback(job.id, str(error), failure.to_dict())
+
+    worker._process_job = failing_process
+    return worker, asyncio.run(worker._handle_job(job, JobTrace(job.id)))
+
+
+def test_permanent_failure_is_quarantined_without_retry():
+    worker, status = run_failed_job(DocumentParseError("PDF extraction failed"), "extract")
+
+    assert status == "FAILED"
+    assert worker.stats["jobs_quarantined"] == 1
+    assert worker.callback_service.sent[0]["failure"] == {"kind": "permanent", "dependency": None, "quarantined": True}
+
+
+def test_outage_requeues_and_pauses_claiming():
+    worker, status = run_failed_job(wrapped(llm_error(503)), "llm")
+
+    assert status == "REQUEUED"
+    assert worker.job_claimer.calls == [("requeue", "job-1")]
+    assert worker.callback_service.sent == []
+    assert worker._admit_claim() is None
+
+
+def test_stats_endpoint_reports_circuit_states(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import app.main
+
+    worker, _ = run_failed_job(wrapped(llm_error(503)), "llm")
+    monkeypatch.setattr(app.main, "worker", worker)
+
+    circuits = TestClient(app.main.app).get("/stats").json()["circuits"]
+
+    assert set(circuits) == {"drive", "llm"}
+    assert circuits["llm"]["state"] == CircuitBreaker.OPEN
+    assert circuits["llm"]["times_opened"] == 1
+    assert circuits["drive"] == worker.breakers["drive"].snapshot()
@@ -0,0 +1,80 @@
+"""
+Tests for the fair-share bookkeeping in JobClaimer (the SQL itself needs PostgreSQL).
+"""
+import sys
+sys.path.insert(0, '../')
+
+from app.database import job_claimer
+from app.database.job_claimer import JobClaimer, claim_sql
+
+
+def serve(claimer, backlog, claims):
+    """Simulate the claim ordering: lowest pass wins, ties go to the oldest uploader."""
+    served = []
+    for _ in range(claims):
+        ready = [u for u in backlog if backlog[u]]
+        uploader = min(ready, key=lambda u: (max(claimer.passes.get(u, claimer.virtual_time), claimer.virtual_time),
+                                             list(backlog).index(u)))
+        backlog[uploader] -= 1
+        claimer.charge(uploader)
+        served.append(uploader)
+    return served
+
+
+def test_small_uploader_not_starved_by_bulk():
+    claimer = JobClaimer("", fair_share=True)
+    served = serve(claimer, {"bulk": 5000, "small": 2}, 4)
+    assert served == ["bulk", "small", "bulk", "small"]
+
+
+def test_weights_set_share():
+    claimer = JobClaimer("", fair_share=True, uploader_weights={"bulk": 3.0})
+    served = serve(claimer, {"bulk": 100, "small": 100}, 40)
+    assert served.count("bulk") == 30
+    assert served.count("small") == 10
+
+
+def test_idle_uploader_does_not_bank_credit():
+    claimer = JobClaimer("", fair_share=True)
+    serve(claimer, {"bulk": 50}, 50)
+    # A newcomer starts at the current virtual time, not at zero
+    served = serve(claimer, {"bulk": 10, "small": 10}, 6)
+    assert served.count("small") == 3
+    assert set(claimer.passes) <= {"bulk", "small"}
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+        self.autocommit = False
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def execute(self, sql, params=None):
+                connection.statements.append((sql, connection.autocommit))
+
+            def close(self):
+                pass
+
+        return Cursor()
+
+
+def test_uploader_index_is_opt_in_and_built_concurrently(monkeypatch):
+    monkeypatch.setattr(job_claimer.psycopg2, "connect", lambda dsn: RecordingConnection())
+
+    claimer = JobClaimer("", fair_share=True)
+    claimer.connect()
+    assert claimer.connection.statements == []
+
+    claimer = JobClaimer("", fair_share=True, create_uploader_index=True)
+    claimer.connect()
+    [(sql, autocommit)] = claimer.connection.statements
+    assert "CREATE INDEX CONCURRENTLY" in sql and autocommit
+    assert claimer.connection.autocommit is False
+
+
+def test_fifo_claim_orders_by_priority_first():
+    order_by = claim_sql(fair_share=False, shortest_first=False).split("ORDER BY")[1]
+    assert order_by.index("'priority'") < order_by.index('"CreatedAt" ASC')
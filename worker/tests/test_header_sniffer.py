@@ -0,0 +1,70 @@
+"""
+Tests for header sniffing before the full download
+"""
+import io
+import struct
+import sys
+sys.path.insert(0, '../')
+
+import fitz
+import pytest
+from PIL import Image
+
+from app.pipeline import InvalidDocumentError, extract_text, sniff_document
+from app.services.header_sniffer import image_dimensions, pdf_declared_pages
+from app.services.mime_detector import ProcessingPipeline
+
+
+def image_bytes(fmt, size=(640, 480)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def raises_invalid(*args, **kwargs):
+    try:
+        sniff_document(*args, **kwargs)
+    except InvalidDocumentError as e:
+        return str(e)
+    return None
+
+
+def test_image_dimensions_from_headers():
+    assert image_dimensions(image_bytes("PNG")[:64]) == (640, 480)
+    assert image_dimensions(image_bytes("JPEG", (1200, 900))[:4096]) == (1200, 900)
+    assert image_dimensions(image_bytes("GIF")[:16]) == (640, 480)
+    assert image_dimensions(b"not an image") is None
+
+
+def test_pdf_checks():
+    linearized = b"%PDF-1.7\n1 0 obj\n<< /Linearized 1 /L 12345 /H [ 600 120 ] /O 3 /E 900 /N 0 /T 1200 >>\nendobj\n"
+    assert pdf_declared_pages(linearized) == 0
+    assert pdf_declared_pages(b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog >>") is None
+
+
+def test_sniff_rejects_cheaply():
+    png = image_bytes("PNG")
+    assert sniff_document(png[:4096], "image/png")[1] == ProcessingPipeline.IMAGE
+    assert "mismatch" in raises_invalid(png[:4096], "application/pdf")
+    assert "too large" in raises_invalid(png[:4096], "image/png", max_image_pixels=100_000)
+
+    zero_height = png[:16] + struct.pack(">II", 640, 0) + png[24:]
+    assert "no pixels" in raises_invalid(zero_height[:4096], "image/png")
+
+    pdf = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n" + b" " * 2048
+    assert sniff_document(pdf, "application/pdf")[1] == ProcessingPipeline.PDF
+    # Encryption is left to the extractor, which can open owner-password-only files
+    assert sniff_document(pdf + b"trailer << /Encrypt 5 0 R >>", "application/pdf")[1] == ProcessingPipeline.PDF
+
+
+def encrypted_pdf(user_pw=None) -> bytes:
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 60), "Invoice INV-1001 from ACME Supplies Ltd, total 245.00", fontsize=10)
+    return doc.tobytes(encryption=fitz.PDF_ENCRYPT_AES_256, owner_pw="owner", user_pw=user_pw)
+
+
+def test_owner_password_pdf_extracts_and_user_password_pdf_is_invalid():
+    assert "INV-1001" in extract_text(encrypted_pdf(), ProcessingPipeline.PDF)
+
+    with pytest.raises(InvalidDocumentError, match="user password"):
+        extract_text(encrypted_pdf(user_pw="secret"), ProcessingPipeline.PDF)
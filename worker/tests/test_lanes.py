@@ -0,0 +1,41 @@
+"""
+Tests for size-aware scheduling lanes
+"""
+import sys
+sys.path.insert(0, '../')
+
+from app.config import LaneSettings, default_lanes
+from app.utils.lanes import LaneScheduler
+
+MB = 1024 * 1024
+
+
+def test_plans_follow_lane_order_and_free_slots():
+    scheduler = LaneScheduler(default_lanes())
+    assert [plan.lane.name for plan in scheduler.plans([("normal", 0, None)])] == ["small", "image", "large"]
+
+    for job in range(4):
+        scheduler.start(f"small-{job}", "small")
+    assert [plan.lane.name for plan in scheduler.plans([("normal", 0, None)])] == ["image", "large"]
+
+    scheduler.finish("small-0")
+    assert scheduler.snapshot()["small"] == {"in_flight": 3, "slots": 4}
+
+
+def test_plans_intersect_memory_ranges():
+    scheduler = LaneScheduler(default_lanes())
+    plans = list(scheduler.plans([("oversize", 40 * MB, None), ("normal", 0, 10 * MB)]))
+
+    # The small lane (up to 2 MB) cannot take oversize documents
+    assert [(p.lane.name, p.memory_lane) for p in plans] == [
+        ("small", "normal"), ("image", "oversize"), ("image", "normal"), ("large", "oversize"), ("large", "normal")
+    ]
+    assert (plans[0].min_file_size, plans[0].max_file_size) == (0, 2 * MB)
+    assert (plans[1].min_file_size, plans[1].max_file_size) == (40 * MB, None)
+
+
+def test_mime_patterns():
+    lanes = [LaneSettings(name="images", mime_types=["image/*", "application/x_y"]), LaneSettings(name="any")]
+    plans = list(LaneScheduler(lanes).plans([("normal", 0, None)]))
+    assert plans[0].mime_patterns == ["image/%", r"application/x\_y"]
+    assert plans[1].mime_patterns is None
@@ -0,0 +1,90 @@
+"""
+Tests for the small-to-large model cascade
+"""
+import json
+import sys
+sys.path.insert(0, '../')
+
+from app.config import LLMProviderSettings
+from app.extractors.llm_extractor import LLMExtractor
+from app.services.llm_router import ChatResponse, LLMProvider, LLMRouter
+
+
+def invoice(amount=10.0, total=20.0):
+    return {
+        "InvoiceNumber": "INV-1", "InvoiceDate": "2026-01-01", "VendorName": "Acme",
+        "BillTo": {"Name": "Customer"}, "ShipTo": {},
+        "LineItems": [
+            {"ProductName": "Pen", "ProductId": "P1", "Quantity": 2, "UnitRate": 5, "Amount": amount},
+            {"ProductName": "Pad", "ProductId": "P2", "Quantity": 1, "UnitRate": 10, "Amount": 10}
+        ],
+        "Subtotal": 20.0, "TotalAmount": total
+    }
+
+
+class ScriptedProvider(LLMProvider):
+    """Returns a fixed invoice (or fails) and reports fixed token usage."""
+
+    def __init__(self, name, answer=None, prompt_tokens=100, completion_tokens=50):
+        super().__init__(LLMProviderSettings(name=name, model=f"{name}-model"))
+        self.answer = answer
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.calls = 0
+
+    def complete(self, messages, **params):
+        self.calls += 1
+        if self.answer is None:
+            raise Exception(f"{self.name} unavailable")
+        return ChatResponse(json.dumps(self.answer), self.prompt_tokens, self.completion_tokens)
+
+
+def make_extractor(small, large):
+    return LLMExtractor(router=LLMRouter([large]), small_router=LLMRouter([small]), cascade_threshold=0.8)
+
+
+def test_small_tier_answer_above_threshold_is_accepted():
+    small, large = ScriptedProvider("small", invoice()), ScriptedProvider("large", invoice())
+    extractor = make_extractor(small, large)
+
+    result = extractor.extract_invoice_with_metadata("text")
+
+    assert (result.tier, result.provider, result.escalated) == ("small", "small", False)
+    assert result.score == 1.0
+    assert large.calls == 0
+    assert extractor.tier_counts == {"small": 1, "large": 0}
+
+
+def test_low_score_escalates_and_sums_tokens_of_both_calls():
+    # First line does not add up: 2 x 5 != 7, and the lines no longer sum to the subtotal
+    small = ScriptedProvider("small", invoice(amount=7.0), prompt_tokens=100, completion_tokens=40)
+    large = ScriptedProvider("large", invoice(), prompt_tokens=120, completion_tokens=60)
+    extractor = make_extractor(small, large)
+
+    result = extractor.extract_invoice_with_metadata("text")
+
+    assert (result.tier, result.provider, result.escalated) == ("large", "large", True)
+    assert result.invoice.LineItems[0].Amount == 10.0
+    assert (result.prompt_tokens, result.completion_tokens) == (220, 100)
+    assert extractor.escalations == 1
+
+
+def test_small_tier_error_falls_back_to_large_tier():
+    small, large = ScriptedProvider("small"), ScriptedProvider("large", invoice())
+    extractor = make_extractor(small, large)
+
+    result = extractor.extract_invoice_with_metadata("text")
+
+    assert (result.tier, result.escalated) == ("large", True)
+    assert (result.prompt_tokens, result.completion_tokens) == (100, 50)
+    assert small.calls == 1
+
+
+def test_large_tier_error_keeps_low_scoring_small_answer():
+    small, large = ScriptedProvider("small", invoice(amount=7.0)), ScriptedProvider("large")
+    extractor = make_extractor(small, large)
+
+    result = extractor.extract_invoice_with_metadata("text")
+
+    assert result.tier == "small"
+    assert 0 < result.score < 0.8
@@ -0,0 +1,90 @@
+"""Test LLM router ranking, failover and hedging."""
+import sys
+import time
+sys.path.insert(0, '../')
+
+from app.config import LLMProviderSettings
+from app.services.llm_router import ChatResponse, LLMProvider, LLMRouter, ProviderHTTPError
+
+
+class FakeProvider(LLMProvider):
+    """Provider that sleeps and then answers (or fails) without network access."""
+
+    def __init__(self, name, delay=0.0, fail=False, expected_latency=1.0, max_input_chars=None):
+        super().__init__(LLMProviderSettings(
+            name=name, model=f"{name}-model",
+            expected_latency=expected_latency, max_input_chars=max_input_chars
+        ))
+        self.delay = delay
+        self.fail = fail
+
+    def complete(self, messages, **params):
+        time.sleep(self.delay)
+        if self.fail == 429:
+            raise ProviderHTTPError(self.name, 429, "slow down")
+        if self.fail:
+            raise Exception(f"{self.name} unavailable")
+        return ChatResponse(content=self.name)
+
+
+def test_ranking_prefers_low_latency_and_respects_size():
+    fast = FakeProvider("fast", expected_latency=0.5, max_input_chars=1000)
+    slow = FakeProvider("slow", expected_latency=3.0)
+    router = LLMRouter([slow, fast])
+
+    assert [p.name for p in router.rank(500)] == ["fast", "slow"]
+    assert [p.name for p in router.rank(5000)] == ["slow"]
+
+
+def test_failover_to_next_provider():
+    broken = FakeProvider("broken", fail=True, expected_latency=0.1)
+    backup = FakeProvider("backup", expected_latency=1.0)
+    router = LLMRouter([broken, backup])
+
+    result = router.complete([], text_length=100)
+
+    assert result.provider == "backup"
+    assert broken.stats.failures == 1
+    assert broken.stats.ewma_error_rate > 0
+
+
+def test_hedged_request_wins_when_primary_is_slow():
+    slow = FakeProvider("slow", delay=1.0, expected_latency=0.05)
+    quick = FakeProvider("quick", delay=0.0, expected_latency=0.5)
+    router = LLMRouter([slow, quick], hedge_enabled=True, hedge_min_delay=0.05)
+
+    result = router.complete([], text_length=100)
+
+    assert result.provider == "quick"
+    assert result.hedged
+    assert router.hedges_fired == 1
+
+
+def test_observers_see_latency_and_rate_limits():
+    throttled = FakeProvider("throttled", fail=429, expected_latency=0.1)
+    backup = FakeProvider("backup", expected_latency=1.0)
+    router = LLMRouter([throttled, backup])
+    seen = []
+    router.observers.append(lambda latency, outcome: seen.append(outcome))
+
+    router.complete([{"role": "user", "content": "hi"}], text_length=2)
+
+    assert seen == ["rate_limited", "success"]
+
+
+def test_hedge_pool_is_sized_for_every_job_in_flight():
+    from app.config import Config
+    from app.services.llm_router import build_llm_router
+
+    config = Config(
+        db_host="localhost", db_name="test", db_user="test", db_password="test",
+        backend_url="http://localhost:5000", callback_secret="secret",
+        google_service_account_key="unused", groq_api_key="unused",
+        llm_providers=[LLMProviderSettings(name=n, kind="openai", model="m", base_url="http://localhost:1/v1")
+                       for n in ("a", "b")],
+        llm_hedge_enabled=True, concurrency_max=8, llm_chunk_concurrency=4
+    )
+
+    # A primary and a hedge for each of 8 jobs plus 4 chunk requests
+    assert build_llm_router(config)._executor._max_workers == 24
+    assert build_llm_router(config, max_jobs=16)._executor._max_workers == 40
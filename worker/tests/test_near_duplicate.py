@@ -0,0 +1,233 @@
+"""
+Tests for MinHash/LSH near-duplicate detection
+"""
+import asyncio
+import re
+import sys
+from datetime import datetime, timezone
+sys.path.insert(0, '../')
+
+from app.config import Config, LLMProviderSettings
+from app.extractors.llm_extractor import ExtractionResult
+from app.models.invoice import InvoiceData
+from app.models.job import Job, JobPayload, JobStatus
+from app.utils.job_trace import JobTrace
+from app.utils.near_duplicate import NearDuplicateIndex, identifiers_match
+from app.worker import InvoiceWorker
+from benchmarks.corpus import build_text_pdf
+
+INVOICE = """
+ACME Office Supplies Ltd, 12 Harbour Road, Bristol BS1 4XY
+Invoice number INV-2024-0317  Date 14/03/2024  Due 13/04/2024
+Bill to: Northwind Traders, 4 Market Street, Leeds
+Description                     Qty   Unit price   Amount
+A4 copier paper, 80gsm box        10        24.50   245.00
+Black toner cartridge TN-2420      2        61.99   123.98
+Ring binders, pack of 10           5         8.75    43.75
+Subtotal 412.73  VAT 20% 82.55  Total due 495.28
+Payment by bank transfer to sort code 20-45-77 account 41230987 within 30 days.
+Thank you for your business. Questions about this invoice: accounts@acme-supplies.example
+"""
+
+
+def rescan(text):
+    """OCR-style noise: a few misread characters and different line breaks."""
+    return text.replace("copier", "cop1er").replace("Thank you", "Thank  you").replace("\n", " \n")
+
+
+def next_month(text):
+    """Same template, different invoice."""
+    return (text.replace("0317", "0412").replace("14/03/2024", "12/04/2024").replace("13/04/2024", "12/05/2024")
+            .replace("245.00", "196.00").replace("    10        24.50", "     8        24.50")
+            .replace("412.73", "363.73").replace("82.55", "72.75").replace("495.28", "436.48"))
+
+
+RECURRING = """
+Northwind Facilities Services, Unit 7 Riverside Park, Reading RG1 8AB
+Invoice number NFS-10231  Date 01/03/2024
+Bill to: Contoso Ltd, 99 King Street, Manchester M2 4WU
+Monthly service charges for the period shown above, billed in advance under contract C-5531.
+Description                              Qty   Unit price   Amount
+Office cleaning, weekday evenings          1       850.00   850.00
+Window cleaning, external, monthly         1       120.00   120.00
+Washroom consumables and hygiene units     1        95.00    95.00
+Plant care, reception and floors 1-3       1        60.00    60.00
+Waste collection, general and recycling    1       140.00   140.00
+Security patrol, nightly                   1       720.00   720.00
+Reception cover, weekdays 08:00-18:00      1      1900.00  1900.00
+Pest control inspection                    1        45.00    45.00
+Subtotal 3930.00  VAT 20% 786.00  Total due 4716.00
+Payment by direct debit on the 15th of the month from account ending 7781.
+Service queries: helpdesk@northwind-facilities.example or call 0118 496 0000.
+"""
+
+
+def renumbered(text):
+    """Recurring bill: same lines, new invoice number and date."""
+    return text.replace("NFS-10231", "NFS-10498").replace("01/03/2024", "01/04/2024")
+
+
+def test_rescan_matches_and_other_invoice_does_not():
+    index = NearDuplicateIndex(store_payloads=True)
+    index.add("job-1", index.signature(INVOICE), {"jobId": "job-1"})
+
+    match = index.query(index.signature(rescan(INVOICE)))
+    assert match is not None
+    assert match.key == "job-1"
+    assert match.payload == {"jobId": "job-1"}
+    assert match.similarity >= index.threshold
+
+    # Same wording, different numbers: not a duplicate
+    assert index.query(index.signature(next_month(INVOICE))) is None
+
+
+def test_shared_boilerplate_needs_matching_numbers():
+    terms = """
+    Terms and conditions of sale. Goods remain the property of the seller until paid in full.
+    Any dispute about this invoice must be raised in writing with our accounts team before the due date.
+    Late payments accrue interest under the Late Payment of Commercial Debts Act at the statutory rate.
+    Returns are accepted only in original packaging and require a returns authorisation from customer service.
+    Delivery charges are non refundable unless the goods arrived damaged or were supplied in error by us.
+    Prices include standard delivery to mainland addresses; islands and highlands are quoted separately.
+    Our liability is limited to the invoice value of the goods concerned and excludes indirect losses.
+    Orders placed through the online portal are covered by the portal agreement accepted at registration.
+    """
+    # The wording alone is similar enough to match
+    index = NearDuplicateIndex(threshold=0.7)
+    index.add("job-1", index.signature(INVOICE + terms), {"jobId": "job-1"})
+    assert index.query(index.signature(next_month(INVOICE) + terms)) is None
+
+    lenient = NearDuplicateIndex(threshold=0.7, number_threshold=0.0)
+    lenient.add("job-1", lenient.signature(INVOICE + terms), {"jobId": "job-1"})
+    assert lenient.query(lenient.signature(next_month(INVOICE) + terms)) is not None
+
+
+def test_matches_stay_within_scope_and_payloads_are_opt_in(tmp_path):
+    index = NearDuplicateIndex()
+    index.add("job-1", index.signature(INVOICE), {"jobId": "job-1"}, scope="alice")
+
+    signature = index.signature(rescan(INVOICE))
+    assert index.query(signature, "bob") is None
+    assert index.query(signature) is None
+    match = index.query(signature, "alice")
+    assert match.key == "job-1"
+    # Flagging needs only the key
+    assert match.payload is None
+
+    path = str(tmp_path / "near_duplicates.sqlite")
+    stored = NearDuplicateIndex(path, store_payloads=True)
+    stored.add("job-1", stored.signature(INVOICE), {"jobId": "job-1"}, scope="alice")
+    stored.close()
+
+    reopened = NearDuplicateIndex(path, store_payloads=True)
+    assert reopened.query(reopened.signature(rescan(INVOICE)), "alice").payload == {"jobId": "job-1"}
+    assert reopened.query(reopened.signature(rescan(INVOICE)), "bob") is None
+    reopened.close()
+
+
+def test_short_texts_are_not_indexed():
+    assert NearDuplicateIndex().signature("Invoice 42 total 10.00") is None
+
+
+def test_signatures_persist_and_evict(tmp_path):
+    path = str(tmp_path / "near_duplicates.sqlite")
+    index = NearDuplicateIndex(path, max_entries=1)
+    index.add("job-1", index.signature(INVOICE), {"jobId": "job-1"})
+    index.close()
+
+    reopened = NearDuplicateIndex(path, max_entries=1)
+    assert len(reopened) == 1
+    assert reopened.query(reopened.signature(rescan(INVOICE))).key == "job-1"
+
+    # Over max_entries the oldest signature goes, in memory and on disk
+    reopened.add("job-2", reopened.signature(next_month(INVOICE)), {"jobId": "job-2"})
+    assert reopened.query(reopened.signature(INVOICE)) is None
+    reopened.close()
+    assert len(NearDuplicateIndex(path)) == 1
+
+
+def test_recurring_bill_matches_but_identifiers_differ():
+    index = NearDuplicateIndex()
+    index.add("job-1", index.signature(RECURRING), {"jobId": "job-1"})
+
+    # Same lines clear both thresholds...
+    signature = index.signature(renumbered(RECURRING))
+    assert index.query(signature) is not None
+    # ...but the earlier invoice number and date are not in the new text
+    assert not identifiers_match(signature[1], "NFS-10231", "01/03/2024")
+    assert identifiers_match(index.signature(rescan(RECURRING))[1], "NFS-10231", "01/03/2024")
+    assert not identifiers_match(signature[1], "NFS-10498", None)
+
+
+class TextDrive:
+    """Serves each file id as a one-page text PDF."""
+
+    def __init__(self, texts):
+        self.files = {file_id: build_text_pdf([text.strip().splitlines()]) for file_id, text in texts.items()}
+
+    def get_metadata(self, file_id):
+        return {"id": file_id}
+
+    def download_prefix(self, file_id, size):
+        return self.files[file_id][:size], len(self.files[file_id])
+
+    def download_file(self, file_id, prefix=b"", total_size=None):
+        return self.files[file_id]
+
+
+class HeaderExtractor:
+    """Reads the invoice number and date off the text, as the LLM would."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def extract_invoice_with_metadata(self, raw_text):
+        self.calls += 1
+        number, date = re.search(r"Invoice number (\S+)\s+Date (\S+)", raw_text).groups()
+        invoice = InvoiceData(
+            InvoiceNumber=number, InvoiceDate=date, VendorName="Northwind Facilities Services",
+            BillTo={"Name": "Contoso Ltd"}, ShipTo={},
+            LineItems=[{"ProductName": "Services", "ProductId": "S1", "Quantity": 1, "UnitRate": 3930.0,
+                        "Amount": 3930.0}],
+            Subtotal=3930.0, TotalAmount=4716.0
+        )
+        return ExtractionResult(invoice=invoice, tier="large", provider="stub", model="stub", score=1.0)
+
+
+def process(worker, job_id, file_id):
+    job = Job(
+        id=job_id, jobType="INVOICE_EXTRACTION", status=JobStatus.PROCESSING,
+        payload=JobPayload(fileId=file_id, originalName=f"{file_id}.pdf", mimeType="application/pdf",
+                           fileSize=1, idempotencyKey=job_id, detectedAt="2026-01-01T00:00:00Z"),
+        createdAt=datetime.now(timezone.utc), updatedAt=datetime.now(timezone.utc)
+    )
+    return asyncio.run(worker._process_job(job, JobTrace(job_id)))
+
+
+def test_recurring_bill_is_extracted_again_even_with_reuse():
+    config = Config(
+        db_host="localhost", db_name="test", db_user="test", db_password="test",
+        backend_url="http://localhost:5000", callback_secret="secret",
+        google_service_account_key="unused", groq_api_key="unused",
+        llm_providers=[LLMProviderSettings(name="mock", kind="openai", model="m", base_url="http://localhost:1/v1")],
+        result_index_enabled=False, extraction_processes=0, near_duplicate_action="reuse"
+    )
+    drive = TextDrive({"march": RECURRING, "april": renumbered(RECURRING), "march-rescan": rescan(RECURRING)})
+    worker = InvoiceWorker(config, job_claimer=object(), drive_service=drive)
+    worker.llm_extractor = HeaderExtractor()
+    worker.near_duplicates = NearDuplicateIndex(store_payloads=True)
+
+    process(worker, "job-1", "march")
+    april = process(worker, "job-2", "april")
+
+    assert april["result"]["InvoiceNumber"] == "NFS-10498"
+    assert april["result"]["InvoiceDate"] == "01/04/2024"
+    assert april["nearDuplicate"]["ofJobId"] == "job-1"
+    assert april["nearDuplicate"]["reused"] is False
+    assert worker.llm_extractor.calls == 2
+
+    # A re-scan of the March bill still reuses its extraction
+    rescanned = process(worker, "job-3", "march-rescan")
+    assert rescanned["nearDuplicate"]["reused"] is True
+    assert rescanned["result"]["InvoiceNumber"] == "NFS-10231"
+    assert worker.llm_extractor.calls == 2
@@ -0,0 +1,66 @@
+"""
+Tests for layout-aware PDF table extraction
+"""
+import sys
+sys.path.insert(0, '../')
+
+import fitz
+
+from app.extractors.pdf_extractor import extract_text_from_pdf, format_table
+
+ROWS = [
+    ["Description", "Qty", "Unit", "Amount"],
+    ["Copier paper A4", "10", "24.50", "245.00"],
+    ["Toner cartridge", "2", "61.99", "123.98"]
+]
+
+
+def invoice_pdf(ruled=True) -> bytes:
+    """Header text, a line-item table (ruled or not) and a total below it."""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((50, 60), "ACME Supplies Ltd\nInvoice INV-1001   Date 2024-03-14", fontsize=10)
+    xs, top = [50, 250, 330, 420, 520], 120
+    for r, row in enumerate(ROWS):
+        for c, cell in enumerate(row):
+            page.insert_text((xs[c] + 4, top + r * 20 + 14), cell, fontsize=9)
+    if ruled:
+        for r in range(len(ROWS) + 1):
+            page.draw_line((xs[0], top + r * 20), (xs[-1], top + r * 20))
+        for x in xs:
+            page.draw_line((x, top), (x, top + len(ROWS) * 20))
+    page.insert_text((330, 210), "Total due 368.98", fontsize=10)
+    return doc.tobytes()
+
+
+def test_ruled_table_becomes_tsv_rows_in_reading_order():
+    text = extract_text_from_pdf(invoice_pdf(), "tsv")
+
+    assert text.split("\n") == [
+        "ACME Supplies Ltd",
+        "Invoice INV-1001 Date 2024-03-14",
+        "[Table]",
+        "Description\tQty\tUnit\tAmount",
+        "Copier paper A4\t10\t24.50\t245.00",
+        "Toner cartridge\t2\t61.99\t123.98",
+        "Total due 368.98"
+    ]
+
+
+def test_plain_mode_and_unruled_tables_keep_page_text():
+    plain = extract_text_from_pdf(invoice_pdf())
+    assert "[Table]" not in plain
+    assert "Copier paper A4 10 24.50 245.00" in plain
+
+    assert extract_text_from_pdf(invoice_pdf(ruled=False), "tsv") == extract_text_from_pdf(invoice_pdf(ruled=False))
+
+
+def test_format_table_markdown_drops_empty_rows_and_columns():
+    rows = [["Item", None, "Total"], [None, None, None], ["Multi\nline | name", "", "9.99"]]
+
+    assert format_table(rows, "markdown") == "\n".join([
+        "| Item | Total |",
+        "|---|---|",
+        "| Multi line \\| name | 9.99 |"
+    ])
+    assert format_table([[None], [""]], "tsv") == ""
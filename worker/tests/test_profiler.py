@@ -0,0 +1,62 @@
+"""
+Tests for the sampling profiler
+"""
+import sys
+import threading
+import time
+sys.path.insert(0, '../')
+
+import pytest
+
+from app.utils import profiler
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_cpu_captures_named_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(stop,), name="profiled-busy")
+    thread.start()
+    try:
+        output = profiler.profile_cpu(0.2, interval=0.005, thread_prefix="profiled-")
+    finally:
+        stop.set()
+        thread.join()
+
+    lines = output.strip().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert stack.startswith("profiled-busy;")
+        assert int(count) > 0
+    assert any("busy_loop" in line for line in lines)
+
+
+def test_profile_rejects_concurrent_runs():
+    runner = threading.Thread(target=profiler.profile_cpu, args=(0.3,))
+    runner.start()
+    time.sleep(0.05)
+    try:
+        with pytest.raises(profiler.ProfilerBusyError):
+            profiler.profile_cpu(0.1)
+    finally:
+        runner.join()
+
+
+def test_profile_memory_reports_growth():
+    retained = []
+
+    def allocate():
+        time.sleep(0.05)
+        retained.append([bytearray(1024) for _ in range(200)])
+
+    thread = threading.Thread(target=allocate)
+    thread.start()
+    growth = profiler.profile_memory(0.2, top=5)
+    thread.join()
+
+    assert growth
+    assert growth[0]["sizeDiffBytes"] > 0
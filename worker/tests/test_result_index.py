@@ -0,0 +1,88 @@
+"""
+Tests for reusing prior results by Drive md5Checksum
+"""
+import asyncio
+import sys
+from datetime import datetime, timezone
+sys.path.insert(0, '../')
+
+from app.config import Config, LLMProviderSettings
+from app.utils.checkpoint import CheckpointJournal
+from app.utils.job_trace import JobTrace
+from app.models.job import Job, JobPayload, JobStatus
+from app.worker import InvoiceWorker
+
+
+class FakeDrive:
+    def __init__(self, md5="d41d8cd98f00b204e9800998ecf8427e"):
+        self.md5 = md5
+        self.downloads = 0
+
+    def get_metadata(self, file_id):
+        return {"id": file_id, "md5Checksum": self.md5, "size": "12"} if self.md5 else {"id": file_id}
+
+    def download_prefix(self, file_id, size):
+        self.downloads += 1
+        return b"not a document", 14
+
+    def download_file(self, file_id, prefix=b"", total_size=None):
+        self.downloads += 1
+        return prefix
+
+
+def make_worker(tmp_path, drive):
+    config = Config(
+        db_host="localhost", db_name="test", db_user="test", db_password="test",
+        backend_url="http://localhost:5000", callback_secret="secret",
+        google_service_account_key="unused", groq_api_key="unused",
+        llm_providers=[LLMProviderSettings(name="mock", kind="openai", model="m", base_url="http://localhost:1/v1")],
+        worker_id="test-worker"
+    )
+    worker = InvoiceWorker(config, job_claimer=object(), drive_service=drive)
+    worker.result_index = CheckpointJournal(str(tmp_path / "result_index.sqlite"))
+    return worker
+
+
+def make_job(job_id, mime="application/pdf"):
+    return Job(
+        id=job_id, jobType="INVOICE_EXTRACTION", status=JobStatus.PROCESSING,
+        payload=JobPayload(fileId="file-1", originalName="a.pdf", mimeType=mime, fileSize=12, uploader="u",
+                           idempotencyKey=job_id, detectedAt="2026-01-01T00:00:00Z"),
+        createdAt=datetime.now(timezone.utc), updatedAt=datetime.now(timezone.utc)
+    )
+
+
+def process(worker, job):
+    return asyncio.run(worker._process_job(job, JobTrace(job.id)))
+
+
+def test_unchanged_content_reuses_prior_result(tmp_path):
+    drive = FakeDrive()
+    worker = make_worker(tmp_path, drive)
+
+    first = process(worker, make_job("job-1"))
+    assert first["status"] == "INVALID"
+    assert drive.downloads == 1
+
+    second = process(worker, make_job("job-2"))
+    assert drive.downloads == 1
+    assert second["status"] == "INVALID"
+    assert second["reason"] == first["reason"]
+    assert second["jobId"] == "job-2"
+    assert second["reused"] == {"md5Checksum": drive.md5, "fromJobId": "job-1"}
+
+
+def test_reuse_requires_same_mime_and_a_checksum(tmp_path):
+    drive = FakeDrive()
+    worker = make_worker(tmp_path, drive)
+    process(worker, make_job("job-1"))
+
+    other_mime = process(worker, make_job("job-2", mime="image/png"))
+    assert "reused" not in other_mime
+    assert drive.downloads == 2
+
+    # Google Docs and other native files have no md5Checksum
+    drive.md5 = None
+    assert "reused" not in process(worker, make_job("job-3"))
+    assert drive.downloads == 3
+
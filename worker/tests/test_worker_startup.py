@@ -0,0 +1,92 @@
+"""
+Tests for deferred worker initialization and readiness
+"""
+import asyncio
+import sys
+import time
+sys.path.insert(0, '../')
+
+from app.config import Config, LLMProviderSettings
+from app.worker import InvoiceWorker
+
+
+class FakeService:
+    def __init__(self):
+        self.connected = False
+
+    def connect(self):
+        self.connected = True
+
+
+def make_config(**overrides):
+    overrides.setdefault("result_index_enabled", False)
+    overrides.setdefault("near_duplicate_enabled", False)
+    return Config(
+        db_host="localhost", db_name="test", db_user="test", db_password="test",
+        backend_url="http://localhost:5000", callback_secret="secret",
+        google_service_account_key="unused", groq_api_key="unused",
+        llm_providers=[LLMProviderSettings(name="mock", kind="openai", model="m", base_url="http://localhost:1/v1")],
+        **overrides
+    )
+
+
+def test_construction_does_not_connect():
+    worker = InvoiceWorker(make_config(), job_claimer=FakeService(), drive_service=FakeService())
+
+    assert not worker.ready
+    assert worker.llm_extractor is None
+
+
+def test_initialize_builds_services_and_records_startup():
+    worker = InvoiceWorker(make_config(), job_claimer=FakeService(), drive_service=FakeService())
+
+    asyncio.run(worker.initialize())
+
+    assert worker.ready
+    assert worker.llm_extractor is not None
+    assert {"llm", "services", "processToReady"} <= set(worker.startup)
+    # Injected services are used as-is
+    assert not worker.job_claimer.connected
+
+
+def test_stats_endpoint_includes_worker_state(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import app.main
+
+    worker = InvoiceWorker(make_config(), job_claimer=FakeService(), drive_service=FakeService())
+    monkeypatch.setattr(app.main, "worker", worker)
+
+    stats = TestClient(app.main.app).get("/stats").json()
+
+    assert stats["jobs_completed"] == 0
+    assert stats["concurrency"] == worker.concurrency.snapshot()
+    assert {"memory", "lanes", "jobs_in_flight"} <= set(stats)
+
+
+class SlowClaimer(FakeService):
+    def claim_job(self, worker_id, *lane):
+        time.sleep(0.3)
+        return None
+
+
+def test_claim_does_not_block_the_event_loop():
+    worker = InvoiceWorker(make_config(), job_claimer=SlowClaimer(), drive_service=FakeService())
+    worker.is_running = True
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        assert await worker._fill_slots() is None
+        ticker.cancel()
+        return ticks
+
+    # Other coroutines keep running while the claim query is in flight
+    assert asyncio.run(scenario()) >= 10